@@ -8,6 +8,8 @@ import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
 import { Textarea } from '@/components/ui/textarea';
 import { Badge } from '@/components/ui/badge';
+import { Label } from '@/components/ui/label';
+import { Switch } from '@/components/ui/switch';
 import { cn } from '@/lib/utils';
 
 const Courses = () => {
@@ -21,6 +23,7 @@ const Courses = () => {
     // Form Inputs
     const [textInput, setTextInput] = useState('');
     const [urlInput, setUrlInput] = useState('');
+    const [crawlSite, setCrawlSite] = useState(false);
     const [fileInput, setFileInput] = useState(null);
     const [manualName, setManualName] = useState('');
     const [manualCode, setManualCode] = useState('');
@@ -106,7 +109,7 @@ const Courses = () => {
             if (activeTab === 'text') {
                 res = await addSyllabusText(textInput, semesterStart);
             } else if (activeTab === 'url') {
-                res = await addSyllabusUrl(urlInput, semesterStart);
+                res = await addSyllabusUrl(urlInput, semesterStart, crawlSite);
             } else if (activeTab === 'pdf') {
                 if (!fileInput) { alert("Please select a file"); setLoading(false); return; }
                 res = await addSyllabusFile(fileInput, semesterStart);
@@ -453,6 +456,10 @@ const Courses = () => {
                                             required
                                             className="rounded-lg"
                                         />
+                                        <div className="flex items-center justify-between pt-2">
+                                            <Label className="text-sm text-muted-foreground">Also scan linked pages on this site</Label>
+                                            <Switch checked={crawlSite} onCheckedChange={setCrawlSite} />
+                                        </div>
                                     </motion.div>
                                 )}
 
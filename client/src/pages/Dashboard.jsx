@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import { getState } from '../services/api';
+import { getSummary, getAssignments } from '../services/api';
 import { Search, Bell, BookOpen, Clock, Users, ArrowRight, User as UserIcon, Calendar as CalendarIcon, ChevronRight, Check, AlertCircle, Plus, Zap, Target, TrendingUp, Brain } from 'lucide-react';
 import { motion } from 'framer-motion';
 import { Link, useNavigate } from 'react-router-dom';
@@ -142,7 +142,7 @@ const CourseCard = ({ course, index }) => {
 
                     <div className="flex items-center gap-3 text-xs font-medium text-muted-foreground">
                         <div className="flex items-center gap-1 bg-slate-100 dark:bg-slate-800 px-2 py-1 rounded-md">
-                            <BookOpen size={12} /> {course.assignments?.length || 0} Tasks
+                            <BookOpen size={12} /> {course.assignment_count || 0} Tasks
                         </div>
                         <div className="flex items-center gap-1 bg-slate-100 dark:bg-slate-800 px-2 py-1 rounded-md">
                             <Clock size={12} /> 4 weeks
@@ -171,6 +171,7 @@ const CourseCard = ({ course, index }) => {
 
 const Dashboard = () => {
     const [state, setState] = useState(null);
+    const [upcoming, setUpcoming] = useState([]);
     const [loading, setLoading] = useState(true);
 
     // Daily motivation for the dashboard only
@@ -200,8 +201,13 @@ const Dashboard = () => {
 
     const loadData = async () => {
         try {
-            const data = await getState();
+            // Totals come from the summary; the upcoming list is the only page of assignments loaded
+            const [data, next] = await Promise.all([
+                getSummary(),
+                getAssignments({ status: 'pending', sort: 'due_date', limit: 5 }),
+            ]);
             setState(data);
+            setUpcoming(next.data.assignments || []);
         } catch (e) {
             console.error(e);
         } finally {
@@ -215,55 +221,21 @@ const Dashboard = () => {
         </div>
     );
 
-    const { courses, assignments } = state;
-    const upcoming = assignments.filter(a => (a.progress || 0) < 100).slice(0, 5);
-    const completed = assignments.filter(a => a.progress === 100).length;
-    const total = assignments.length;
+    const { courses, stats, completion_dates } = state;
+    const completed = stats.completed_assignments;
+    const total = stats.total_assignments;
     const completionRate = total > 0 ? Math.round((completed / total) * 100) : 0;
-    const overdue = assignments.filter(a => {
-        const dueDate = new Date(a.due_date);
-        return dueDate < new Date() && a.progress < 100;
-    }).length;
-
-    // Calculate course progress properly from assignments
-    const coursesWithProgress = courses.map(course => {
-        const courseAssignments = assignments.filter(a => a.course === course.course_name);
-        const courseCompleted = courseAssignments.filter(a => a.progress === 100).length;
-        const progress = courseAssignments.length > 0
-            ? Math.round((courseCompleted / courseAssignments.length) * 100)
-            : 0;
-        return { ...course, progress, assignments: courseAssignments };
-    });
-
-    // Calculate dynamic stats
-    const avgProgress = total > 0
-        ? Math.round(assignments.reduce((acc, a) => acc + (a.progress || 0), 0) / total)
-        : 0;
-
-    const hoursTracked = Math.round(
-        assignments.reduce((acc, a) => acc + ((a.estimated_hours || 1) * (a.progress || 0) / 100), 0)
-    );
+    const overdue = stats.overdue_assignments;
+    const avgProgress = stats.average_progress;
+    const hoursTracked = stats.hours_tracked;
 
-    // Calculate Streak based on completed_at dates
+    // Calculate Streak based on the days something was completed
     const getStreakData = () => {
-        if (!assignments) return { streak: 0, dates: new Set() };
-
-        // Get all unique completed dates
         const dates = new Set();
-        assignments.forEach(a => {
-            let dateStr = null;
-            if (a.completed_at) {
-                dateStr = a.completed_at;
-            } else if (a.progress === 100 && a.due_date) {
-                // Fallback for pre-existing completions: use due_date
-                dateStr = a.due_date;
-            }
-
-            if (dateStr) {
-                const date = new Date(dateStr);
-                if (!isNaN(date)) {
-                    dates.add(date.toDateString());
-                }
+        (completion_dates || []).forEach(day => {
+            const date = new Date(`${day}T00:00:00`);
+            if (!isNaN(date)) {
+                dates.add(date.toDateString());
             }
         });
 
@@ -401,7 +373,7 @@ const Dashboard = () => {
                             </Card>
                         ) : (
                             <div className="grid grid-cols-1 md:grid-cols-2 gap-5">
-                                {coursesWithProgress.slice(0, 4).map((c, i) => <CourseCard key={i} course={c} index={i} />)}
+                                {courses.slice(0, 4).map((c, i) => <CourseCard key={i} course={c} index={i} />)}
                             </div>
                         )}
                     </section>
@@ -7,12 +7,47 @@ const api = axios.create({
     baseURL: API_URL,
 });
 
+// Multi-user deployments identify the student with X-User-Id; single-user setups leave it unset
+api.interceptors.request.use((config) => {
+    const userId = localStorage.getItem('coursesync_user_id');
+    if (userId) {
+        config.headers['X-User-Id'] = userId;
+    }
+    return config;
+});
+
 export const getRoot = () => api.get('/');
 
-export const getState = async () => {
+// Rebuild the regular state shape from /api/state?compact=true, where courses are sent
+// once and assignments refer to them by course_id
+export const expandState = (data) => {
+    if (data?.format !== 'compact-v1') return data;
+    const courses = data.courses.map(course => ({ ...course, assignments: [] }));
+    const assignments = data.assignments.map(({ course_id, ...assignment }) => {
+        if (course_id === undefined) return assignment;
+        const course = courses[course_id];
+        const expanded = { course_code: course.course_code || '', ...assignment, course: course.course_name };
+        course.assignments.push(expanded);
+        return expanded;
+    });
+    return { courses, assignments, settings: data.settings, stats: data.stats };
+};
+
+// Courses, totals and completion dates only, for the dashboard
+export const getSummary = async () => {
     try {
-        const res = await api.get('/api/state');
+        const res = await api.get('/api/state', { params: { summary: true } });
         return res.data;
+    } catch (error) {
+        console.error("Error fetching summary", error);
+        return null;
+    }
+};
+
+export const getState = async () => {
+    try {
+        const res = await api.get('/api/state', { params: { compact: true } });
+        return expandState(res.data);
     } catch (error) {
         console.error("Error fetching state", error);
         return null;
@@ -29,8 +64,8 @@ export const updateProgress = (assignment_index, progress) =>
 export const addSyllabusText = (syllabus_text, semester_start) =>
     api.post('/api/syllabus/text', { syllabus_text, semester_start });
 
-export const addSyllabusUrl = (url, semester_start) =>
-    api.post('/api/syllabus/url', { url, semester_start });
+export const addSyllabusUrl = (url, semester_start, crawl = false) =>
+    api.post('/api/syllabus/url', { url, semester_start, crawl });
 
 export const addSyllabusFile = (file, semester_start) => {
     const formData = new FormData();
@@ -42,13 +77,21 @@ export const addSyllabusFile = (file, semester_start) => {
 
 export const addCourseManual = (courseData) => api.post('/api/course/manual', courseData);
 
+// params: course, status (all|pending|completed|overdue), type, due_from, due_to, sort, cursor, limit
+export const getAssignments = (params = {}) => api.get('/api/assignments', { params });
+
 export const addAssignment = (courseName, assignmentData) =>
     api.post('/api/assignments', { course_name: courseName, assignment: assignmentData });
 
+// Ordered mutations applied atomically with one save, e.g.
+// [{ op: 'progress', assignment_index: 3, progress: 100 }, { op: 'update_assignment', assignment_index: 5, changes: { due_date: '2025-10-20' } }]
+export const applyBatch = (operations) => api.post('/api/batch', { operations });
+
 export const getSettings = () => api.get('/api/settings');
 export const updateSettings = (settings) => api.post('/api/settings', settings);
 export const deleteCourse = (index) => api.delete(`/api/course/${index}`);
 export const getWorkload = () => api.get('/api/workload');
+export const getInsights = (hours_per_day) => api.get('/api/insights', { params: { hours_per_day } });
 
 export const chatWithAI = (question, history = []) => api.post('/api/chat', { question, history });
 
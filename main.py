@@ -1,31 +1,76 @@
 """Entrypoint for CourseSync-Agent Web UI.
 
 Usage:
-    python main.py         # Run web UI
+    python main.py                      # Development: auto-reload on code changes
+    python main.py --prod --workers 4   # Production: no reloader, several workers
+
+``--prod`` (or ``COURSESYNC_ENV=production``) turns off the reloader and
+terminal spinners; ``--workers`` defaults to ``WEB_CONCURRENCY`` (1). The
+default ``data.json`` store is single-process, so several workers use the
+shared SQLite store (``STATE_BACKEND=sqlite``).
 """
 
-from server.app import app
-from server.agent.utils import console
+import argparse
+import os
+
+
+def __getattr__(name):
+    # ``uvicorn main:app`` still works, without importing the app just to launch uvicorn
+    if name == "app":
+        from server.app import app
+        return app
+    raise AttributeError(name)
+
 
-try:
-    # Load environment variables from a .env file if python-dotenv is available.
-    from dotenv import load_dotenv
-    
-    load_dotenv()
-    console.print("[green]Environment variables loaded from .env file.[/green]")
-except Exception:
-    # If python-dotenv isn't installed, continue silently; environment vars may still be set externally.
-    console.print("[yellow]python-dotenv not installed. Skipping .env loading.[/yellow]")
-    pass
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the CourseSync web UI")
+    parser.add_argument("--prod", action="store_true", default=os.getenv("COURSESYNC_ENV") == "production",
+                        help="production mode: no reloader (also COURSESYNC_ENV=production)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")),
+                        help="worker processes (default: WEB_CONCURRENCY or 1)")
+    parser.add_argument("--reload", action=argparse.BooleanOptionalAction, default=None,
+                        help="reload on code changes (default: on, off with --prod or several workers)")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    return parser.parse_args(argv)
+
+
+def state_backend(workers: int) -> str:
+    """The ``STATE_BACKEND`` to run ``workers`` processes with; several need the shared SQLite store."""
+    backend = os.getenv("STATE_BACKEND", "").lower()
+    if workers > 1 and backend not in ("", "sqlite"):
+        raise SystemExit(f"--workers {workers} needs STATE_BACKEND=sqlite: the {backend} store is single-process")
+    return "sqlite" if workers > 1 else backend or "json"
 
 
 if __name__ == "__main__":
+    # Importing the agent package loads .env, so its settings apply to the defaults below
+    from server.agent.utils import console
+
+    args = parse_args()
+    if args.prod:
+        # Read by the server modules (logging levels, spinners) in every worker
+        os.environ["COURSESYNC_ENV"] = "production"
+    # Each worker logs to its own file when there are several (see server/logging_config.py)
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    backend = state_backend(args.workers)
+    if backend != os.getenv("STATE_BACKEND", "json").lower():
+        console.print(f"[yellow]{args.workers} workers share state: using STATE_BACKEND={backend}[/yellow]")
+    os.environ["STATE_BACKEND"] = backend
+    reload = args.reload if args.reload is not None else not args.prod and args.workers == 1
+
     # Run web UI
     try:
         import uvicorn
         console.print("\n[bold cyan]Starting CourseSync Web UI...[/bold cyan]")
-        console.print("[green]Open your browser to: http://localhost:8000[/green]\n")
-        uvicorn.run("server.app:app", host="0.0.0.0", port=8000, reload=True)
+        console.print(f"[green]Open your browser to: http://localhost:{args.port}[/green]\n")
+        uvicorn.run(
+            "server.app:app",
+            host=args.host,
+            port=args.port,
+            reload=reload,
+            workers=None if reload else args.workers,
+        )
     except ImportError:
         console.print("[red]Error: uvicorn not installed. Install with: pip install uvicorn[/red]")
     except KeyboardInterrupt:
@@ -1,4 +1,16 @@
-"""CourseSync Agent package initializer"""
+"""CourseSync Agent package initializer
+
+Loads ``.env`` once, before any module reads its configuration.
+"""
+
+try:
+    from dotenv import load_dotenv
+except ImportError:  # optional: pip install python-dotenv
+    load_dotenv = None
+
+if load_dotenv is not None:
+    load_dotenv()
+
 __all__ = [
     "clients",
     "utils",
@@ -1,21 +1,43 @@
+import contextvars
+import copy
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict
-from rich.progress import Progress, SpinnerColumn, TextColumn
+from typing import List, Dict, Optional
 
 import json
-from dotenv import load_dotenv
-
-load_dotenv()  # Load environment variables from .env file
 
 from .clients import GroqClient, FirecrawlClient
 from .prompts import (
     SYLLABUS_PARSER_PROMPT,
+    SYLLABUS_PATCH_PROMPT,
     WORKLOAD_ANALYZER_PROMPT,
     SCHEDULE_OPTIMIZER_PROMPT,
     NOTIFICATION_PROMPT,
     AI_ASSISTANT_PROMPT,
+    CHAT_ACTION_PROMPT,
+    QUICK_ANSWER_PROMPT,
 )
-from .utils import console, extract_json
+from .utils import console, extract_json, get_data_dir, spinner
+from .tracing import span
+from .metrics import LLM_QUOTA_DEGRADED, SYLLABUS_PREEXTRACT, SYLLABUS_REUSE
+from .preextract import preextract_syllabus, merge_parsed
+from .similarity import SyllabusIndex, diff_lines, is_cosmetic
+from .crawler import crawl_course_site
+from .context import compact_context, schedule_digest
+from .resilience import ServiceUnavailable
+from .quota import soft_limited
+from .local_plans import local_notifications, local_schedule, local_workload
+from ..model import json_default
+
+# Set SYLLABUS_PREEXTRACT=0 to always send the whole syllabus to the LLM
+PREEXTRACT_ENABLED = os.getenv("SYLLABUS_PREEXTRACT", "1") != "0"
+# Set SYLLABUS_DIFF_PATCH=0 to re-parse near-duplicates with content changes instead of patching
+DIFF_PATCH_ENABLED = os.getenv("SYLLABUS_DIFF_PATCH", "1") != "0"
+
+# Runs the independent stages of ``insights`` alongside the request thread
+_stage_pool = ThreadPoolExecutor(max_workers=int(os.getenv("INSIGHTS_POOL_SIZE", "4")), thread_name_prefix="insights")
 
 
 class CourseSyncAgent:
@@ -24,9 +46,46 @@ class CourseSyncAgent:
     def __init__(self):
         self.groq = GroqClient()
         self.firecrawl = FirecrawlClient()
+        self.syllabus_index = SyllabusIndex(
+            os.path.join(get_data_dir(), "syllabus_index.jsonl"),
+            max_entries=int(os.getenv("SYLLABUS_INDEX_SIZE", "500")),
+            threshold=float(os.getenv("SYLLABUS_SIMILARITY_THRESHOLD", "0.8")),
+        )
 
     def parse_syllabus(self, syllabus_text: str, semester_start: str) -> Dict:
-        """Parse syllabus and extract assignments"""
+        """Parse syllabus and extract assignments.
+
+        Past the tenant's soft token budget a locally extracted partial
+        result is returned instead of asking the LLM for the rest.
+        """
+        pre = None
+        if PREEXTRACT_ENABLED:
+            with span("preextract"):
+                pre = preextract_syllabus(syllabus_text, semester_start)
+            if pre.complete:
+                # Every assignment resolved locally: no LLM call needed
+                SYLLABUS_PREEXTRACT.inc(outcome="complete")
+                return pre.course
+
+        degraded = soft_limited()
+        reused = self._reuse_parse(syllabus_text, semester_start, patch=not degraded)
+        if reused is not None:
+            return reused
+
+        if degraded and pre is not None and pre.partial:
+            LLM_QUOTA_DEGRADED.inc(operation="parse_syllabus")
+            return pre.course
+        if pre is not None and pre.partial:
+            SYLLABUS_PREEXTRACT.inc(outcome="partial")
+            parsed = self._parse_unresolved(pre, syllabus_text, semester_start)
+        else:
+            if pre is not None:
+                SYLLABUS_PREEXTRACT.inc(outcome="none")
+            parsed = self._parse_full(syllabus_text, semester_start)
+        self.syllabus_index.add(syllabus_text, semester_start, parsed)
+        return parsed
+
+    def _parse_full(self, syllabus_text: str, semester_start: str) -> Dict:
         user_prompt = f"""Semester starts on: {semester_start}
 
 Syllabus content:
@@ -34,74 +93,232 @@ Syllabus content:
 
 Extract all assignments in JSON format."""
 
-        with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), console=console) as progress:
-            progress.add_task("🔍 Parsing syllabus...", total=None)
-            response = self.groq.call(SYLLABUS_PARSER_PROMPT, user_prompt)
+        with spinner("🔍 Parsing syllabus..."):
+            with span("llm"):
+                response = self.groq.call(SYLLABUS_PARSER_PROMPT, user_prompt, operation="parse_syllabus")
+
+        with span("extract_json"):
+            return extract_json(response, operation="parse_syllabus")
+
+    def _reuse_parse(self, syllabus_text: str, semester_start: str, patch: bool = True) -> Optional[Dict]:
+        """Reuse the parse of a near-duplicate syllabus seen before, patching it if needed.
+
+        Returns None when there is no close enough match (or the patch fails,
+        or is needed with ``patch=False``), in which case the caller parses
+        from scratch.
+        """
+        with span("similarity"):
+            match = self.syllabus_index.lookup(syllabus_text, semester_start)
+            if match is None:
+                SYLLABUS_REUSE.inc(outcome="miss")
+                return None
+            entry, score = match
+            diff = diff_lines(entry["text"], syllabus_text)
+
+        if not diff or is_cosmetic(diff, entry["parsed"]):
+            # Only footers, typos or layout changed: the earlier parse still holds
+            SYLLABUS_REUSE.inc(outcome="exact" if not diff else "cosmetic")
+            return copy.deepcopy(entry["parsed"])
+        if not DIFF_PATCH_ENABLED or not patch:
+            SYLLABUS_REUSE.inc(outcome="miss")
+            return None
+
+        diff_text = "\n".join(diff)
+        user_prompt = f"""Semester starts on: {semester_start}
+
+Earlier parse:
+{json.dumps(entry["parsed"])}
+
+Syllabus diff:
+{diff_text}
 
-        return extract_json(response)
+Return the updated JSON."""
+
+        with spinner(f"🩹 Patching a {score:.0%} similar syllabus..."):
+            with span("llm"):
+                response = self.groq.call(SYLLABUS_PATCH_PROMPT, user_prompt, operation="patch_syllabus")
+
+        with span("extract_json"):
+            parsed = extract_json(response, operation="patch_syllabus")
+        if not isinstance(parsed, dict) or "assignments" not in parsed:
+            SYLLABUS_REUSE.inc(outcome="miss")
+            return None
+        SYLLABUS_REUSE.inc(outcome="patched")
+        self.syllabus_index.add(syllabus_text, semester_start, parsed)
+        return parsed
+
+    def _parse_unresolved(self, pre, syllabus_text: str, semester_start: str) -> Dict:
+        """Send only the sections the local extractor could not resolve to the LLM."""
+        # With every assignment resolved, only the course details are missing: send the top of the page
+        sections = "\n\n".join(pre.unresolved) or syllabus_text[:2000]
+        user_prompt = f"""Semester starts on: {semester_start}
 
-    def scrape_course_page(self, url: str) -> str:
-        """Scrape course webpage for syllabus"""
+Already extracted (do not repeat these assignments):
+{json.dumps(pre.course)}
+
+Unresolved syllabus sections:
+{sections}
+
+Extract the assignments from the unresolved sections in JSON format."""
+
+        with spinner("🔍 Parsing remaining syllabus sections..."):
+            with span("llm"):
+                response = self.groq.call(SYLLABUS_PARSER_PROMPT, user_prompt, operation="parse_syllabus")
+
+        with span("extract_json"):
+            parsed = extract_json(response, operation="parse_syllabus")
+        return merge_parsed(pre.course, parsed or {})
+
+    def scrape_course_page(self, url: str, crawl: bool = False) -> str:
+        """Scrape course webpage for syllabus.
+
+        With ``crawl`` the linked pages on the same site are scraped too and
+        the most relevant ones are combined with the start page.
+        """
         if not self.firecrawl:
             console.print("[yellow]⚠️  Firecrawl not configured. Using manual input.[/yellow]")
             return ""
 
-        with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), console=console) as progress:
-            progress.add_task("🌐 Scraping course page...", total=None)
-            content = self.firecrawl.scrape(url)
+        if crawl:
+            with spinner("🕸️  Crawling course site..."), span("crawl"):
+                content = crawl_course_site(url, self.firecrawl.scrape)
+        else:
+            with spinner("🌐 Scraping course page..."), span("scrape"):
+                content = self.firecrawl.scrape(url)
 
         return content
 
     def analyze_workload(self, assignments: List[Dict]) -> Dict:
         """Analyze workload distribution"""
+        if soft_limited():
+            LLM_QUOTA_DEGRADED.inc(operation="analyze_workload")
+            return local_workload(assignments)
+        with spinner("📊 Analyzing workload..."):
+            return self._analyze_workload(json.dumps(assignments, indent=2, default=json_default))
+
+    def _analyze_workload(self, context: str) -> Dict:
         user_prompt = f"""Current date: {datetime.now().strftime('%Y-%m-%d')}
 
         Assignments:
-        {json.dumps(assignments, indent=2)}
+        {context}
 
         Analyze the workload and identify risk periods."""
 
-        with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), console=console) as progress:
-            progress.add_task("📊 Analyzing workload...", total=None)
-            response = self.groq.call(WORKLOAD_ANALYZER_PROMPT, user_prompt)
+        with span("llm"):
+            response = self.groq.call(WORKLOAD_ANALYZER_PROMPT, user_prompt, operation="analyze_workload")
 
-        return extract_json(response)
+        with span("extract_json"):
+            return extract_json(response, operation="analyze_workload")
 
     def create_schedule(self, assignments: List[Dict], hours_per_day=4) -> Dict:
         """Create optimized study schedule"""
+        if soft_limited():
+            LLM_QUOTA_DEGRADED.inc(operation="create_schedule")
+            return local_schedule(assignments, hours_per_day)
+        with spinner("📅 Creating schedule..."):
+            return self._create_schedule(json.dumps(assignments, indent=2, default=json_default), hours_per_day)
+
+    def _create_schedule(self, context: str, hours_per_day=4) -> Dict:
         user_prompt = f"""Current date: {datetime.now().strftime('%Y-%m-%d')}
         Available study hours per day: {hours_per_day}
 
         Assignments:
-        {json.dumps(assignments, indent=2)}
+        {context}
 
         Create a detailed study schedule."""
 
-        with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), console=console) as progress:
-            progress.add_task("📅 Creating schedule...", total=None)
-            response = self.groq.call(SCHEDULE_OPTIMIZER_PROMPT, user_prompt, temperature=0.5)
+        with span("llm"):
+            response = self.groq.call(SCHEDULE_OPTIMIZER_PROMPT, user_prompt, temperature=0.5, operation="create_schedule")
 
-        return extract_json(response)
+        with span("extract_json"):
+            return extract_json(response, operation="create_schedule")
 
     def generate_notifications(self, schedule: Dict, assignments: List[Dict]) -> List[Dict]:
         """Generate smart notifications"""
+        if soft_limited():
+            LLM_QUOTA_DEGRADED.inc(operation="generate_notifications")
+            return local_notifications(assignments)
+        with spinner("🔔 Generating notifications..."):
+            return self._generate_notifications(json.dumps(schedule, indent=2, default=json_default), json.dumps(assignments, indent=2, default=json_default))
+
+    def _generate_notifications(self, schedule: str, context: str) -> List[Dict]:
         user_prompt = f"""Current date: {datetime.now().strftime('%Y-%m-%d')}
 
         Schedule:
-        {json.dumps(schedule, indent=2)}
+        {schedule}
 
         Assignments:
-        {json.dumps(assignments, indent=2)}
+        {context}
 
         Generate strategic notifications."""
 
-        with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), console=console) as progress:
-            progress.add_task("🔔 Generating notifications...", total=None)
-            response = self.groq.call(NOTIFICATION_PROMPT, user_prompt, temperature=0.7)
+        with span("llm"):
+            response = self.groq.call(NOTIFICATION_PROMPT, user_prompt, temperature=0.7, operation="generate_notifications")
 
-        result = extract_json(response)
+        with span("extract_json"):
+            result = extract_json(response, operation="generate_notifications")
         return result if isinstance(result, list) else result.get("notifications", [])
 
+    def insights(self, courses: List[Dict], assignments: List[Dict], hours_per_day=4) -> Dict:
+        """Workload analysis, schedule and notifications in one pass.
+
+        The compact context is built once and shared by every stage. Workload
+        and schedule run concurrently; notifications start as soon as the
+        schedule is ready and get a digest of it rather than the full JSON.
+        A failed stage is reported under ``errors`` without failing the others,
+        except ``ServiceUnavailable`` (circuit open, deadline passed), which
+        propagates. Past the soft token budget all three are computed locally.
+        """
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        errors: Dict[str, str] = {}
+        if soft_limited():
+            LLM_QUOTA_DEGRADED.inc(operation="insights")
+            schedule = local_schedule(assignments, hours_per_day)
+            return {
+                "analysis": local_workload(assignments),
+                "schedule": schedule,
+                "notifications": local_notifications(assignments),
+                "errors": errors,
+                "timings_ms": {"total": round((time.perf_counter() - started) * 1000, 1)},
+            }
+
+        def stage(name, run, *args):
+            stage_started = time.perf_counter()
+            try:
+                with span(name):
+                    return run(*args)
+            except ServiceUnavailable:
+                # Groq is down or the request is out of time: fail the whole call fast
+                raise
+            except Exception as e:
+                console.print(f"[red]❌ Insights stage {name} failed: {str(e)}[/red]")
+                errors[name] = str(e)
+                return None
+            finally:
+                timings[name] = round((time.perf_counter() - stage_started) * 1000, 1)
+
+        with span("context"):
+            context = compact_context(courses, assignments)
+        timings["context"] = round((time.perf_counter() - started) * 1000, 1)
+
+        # Each stage runs in a copy of this context so its spans land on the request's trace
+        workload = _stage_pool.submit(contextvars.copy_context().run, stage, "workload", self._analyze_workload, context)
+        schedule = stage("schedule", self._create_schedule, context, hours_per_day)
+        notifications = None
+        if schedule is not None:
+            notifications = stage("notifications", self._generate_notifications, schedule_digest(schedule), context)
+        analysis = workload.result()
+
+        timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+        return {
+            "analysis": analysis,
+            "schedule": schedule,
+            "notifications": notifications,
+            "errors": errors,
+            "timings_ms": timings,
+        }
+
     def chat(self, question: str, courses: List[Dict], assignments: List[Dict], history: List[Dict] = []) -> Dict:
         """Answer student questions about their courses"""
         
@@ -116,18 +333,20 @@ Extract all assignments in JSON format."""
         {history_str}
 
         Context:
-        Courses: {json.dumps(courses, indent=2)}
-        Assignments: {json.dumps(assignments, indent=2)}
+        Courses: {json.dumps(courses, indent=2, default=json_default)}
+        Assignments: {json.dumps(assignments, indent=2, default=json_default)}
 
         Answer the student's question based on the context."""
 
-        with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), console=console) as progress:
-            progress.add_task("🤖 Thinking...", total=None)
-            response = self.groq.call(AI_ASSISTANT_PROMPT, user_prompt, temperature=0.7)
+        with spinner("🤖 Thinking..."):
+            with span("llm"):
+                response = self.groq.call(AI_ASSISTANT_PROMPT, user_prompt, temperature=0.7, operation="chat")
 
         # Try to parse as JSON action
         try:
-            parsed = extract_json(response)
+            # Plain-text answers are expected here, so only parse when JSON is present
+            with span("extract_json"):
+                parsed = extract_json(response, operation="chat") if "{" in response else {}
             if parsed and "action" in parsed:
                 return parsed
         except:
@@ -135,3 +354,39 @@ Extract all assignments in JSON format."""
             
         # Fallback to chat
         return {"action": "chat", "content": response}
+
+    def extract_action(self, question: str, courses: List[Dict], assignments: List[Dict], history: List[Dict] = []) -> Dict:
+        """Turn a change request into an action, with only a compact context and no advice."""
+        history_str = "\n".join(f"{msg.get('role', 'user')}: {msg.get('content', '')}" for msg in history[-4:])
+        user_prompt = f"""Today: {datetime.now().strftime('%Y-%m-%d')}
+
+Request: {question}
+
+Recent messages:
+{history_str}
+
+{compact_context(courses, assignments)}"""
+
+        with span("llm"):
+            response = self.groq.call(CHAT_ACTION_PROMPT, user_prompt, temperature=0.2, operation="chat_action")
+        with span("extract_json"):
+            parsed = extract_json(response, operation="chat_action") if "{" in response else {}
+        if isinstance(parsed, dict) and parsed.get("action"):
+            return parsed
+        return {"action": "chat", "content": response}
+
+    def answer(self, question: str, courses: List[Dict], assignments: List[Dict], history: List[Dict] = []) -> Dict:
+        """Answer a plain factual question from the compact context."""
+        history_str = "\n".join(f"{msg.get('role', 'user')}: {msg.get('content', '')}" for msg in history[-4:])
+        user_prompt = f"""Today: {datetime.now().strftime('%Y-%m-%d')}
+
+Question: {question}
+
+Recent messages:
+{history_str}
+
+{compact_context(courses, assignments)}"""
+
+        with span("llm"):
+            response = self.groq.call(QUICK_ANSWER_PROMPT, user_prompt, temperature=0.3, operation="chat_answer")
+        return {"action": "chat", "content": response.strip()}
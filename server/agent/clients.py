@@ -1,27 +1,115 @@
 import os
 import time
 import random
+from typing import Dict, List, Optional
+
 import requests
 from .utils import console
+from .metrics import (
+    LLM_REQUEST_DURATION, LLM_TOKENS, LLM_RETRIES, LLM_BACKOFF_SECONDS, LLM_SERVED, LLM_REJECTED, SCRAPE_DURATION,
+    SCRAPE_CACHE,
+)
+from .hedging import HEDGE_FALLBACK, budget as hedge_budget, hedged_post, should_hedge
+from .quota import check_quota, record_usage
+from .resilience import CircuitBreaker, DeadlineExceeded, check_deadline, remaining
+from .scraping import BlockedURL, FetchResult, USER_AGENT, check_url, fetch_page, scrape_cache
 
 # Configuration from environment
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+GROQ_FAST_MODEL = os.getenv("GROQ_FAST_MODEL", "llama-3.1-8b-instant")
+# Short, latency-sensitive prompts that default to the fast model
+FAST_OPERATIONS = ("generate_notifications", "chat_action", "chat_answer")
+# Tried in order when the operation's model is rate limited
+GROQ_FALLBACK_MODELS = [m.strip() for m in os.getenv("GROQ_FALLBACK_MODELS", GROQ_FAST_MODEL).split(",") if m.strip()]
+
+# Consecutive failed Groq calls that open the circuit, and seconds before a probe
+GROQ_BREAKER_FAILURES = int(os.getenv("GROQ_BREAKER_FAILURES", "5"))
+GROQ_BREAKER_RESET = float(os.getenv("GROQ_BREAKER_RESET", "30"))
+GROQ_TIMEOUT = 30.0
 
 FIRECRAWL_API_KEY = os.getenv("FIRECRAWL_API_KEY")
-FIRECRAWL_API_URL = "https://api.firecrawl.dev/v0/scrape"
+FIRECRAWL_API_URL = os.getenv("FIRECRAWL_API_URL", "https://api.firecrawl.dev/v0/scrape")
+# Past this many seconds Firecrawl is treated as down and the page is fetched locally
+FIRECRAWL_TIMEOUT = float(os.getenv("FIRECRAWL_TIMEOUT", "15"))
+
+
+# Model -> monotonic time its last 429 asked us to wait until
+_rate_limited_until: Dict[str, float] = {}
+
+groq_breaker = CircuitBreaker("groq", GROQ_BREAKER_FAILURES, GROQ_BREAKER_RESET)
+
+
+class GroqRequestError(requests.exceptions.HTTPError):
+    """Groq rejected the request itself (a 4xx other than 429); retrying cannot help."""
+
+
+def model_tiers(operation: str) -> List[str]:
+    """Models to try for ``operation``, primary first.
+
+    ``GROQ_MODEL_<OPERATION>`` (e.g. ``GROQ_MODEL_PARSE_SYLLABUS``) overrides
+    the primary model and ``GROQ_FALLBACK_<OPERATION>`` the comma-separated
+    fallbacks; an empty ``GROQ_FALLBACK_<OPERATION>`` disables them.
+    """
+    key = operation.upper()
+    primary = os.getenv(f"GROQ_MODEL_{key}") or (GROQ_FAST_MODEL if operation in FAST_OPERATIONS else GROQ_MODEL)
+    fallbacks = os.getenv(f"GROQ_FALLBACK_{key}")
+    if fallbacks is not None:
+        fallbacks = [m.strip() for m in fallbacks.split(",") if m.strip()]
+    tiers = [primary]
+    for model in GROQ_FALLBACK_MODELS if fallbacks is None else fallbacks:
+        if model not in tiers:
+            tiers.append(model)
+    return tiers
+
+
+def tier_name(tier: int) -> str:
+    return "primary" if tier == 0 else f"fallback{tier}"
+
+
+def _backoff(wait: float, operation: str):
+    """Sleep before a retry, unless the circuit opened or the request deadline would pass first."""
+    groq_breaker.check(operation)
+    left = remaining()
+    if left is not None and wait >= left:
+        LLM_REJECTED.inc(operation=operation, reason="deadline")
+        raise DeadlineExceeded(f"Groq retry for {operation} would outlive the request deadline", wait)
+    LLM_BACKOFF_SECONDS.inc(wait, operation=operation)
+    time.sleep(wait)
 
 
 class GroqClient:
     """Groq LLM API Client"""
 
     @staticmethod
-    def call(system_prompt: str, user_prompt: str, temperature=0.3) -> str:
-        """Call Groq API with prompts"""
+    def call(system_prompt: str, user_prompt: str, temperature=0.3, operation: str = "default") -> str:
+        """Call Groq API with prompts.
+
+        ``operation`` names the prompt type (``parse_syllabus``, ``chat``...)
+        and selects the model tiers (see ``model_tiers``). A 429 moves the
+        request straight to the next tier instead of sleeping, and the
+        limited model is skipped until its Retry-After has passed; only the
+        last tier waits and retries.
+
+        A 4xx other than 429 (an oversized or invalid prompt) raises
+        ``GroqRequestError`` at once: it is not retried and doesn't count
+        against ``groq_breaker``, since the service is fine.
+
+        Calls fail fast with ``CircuitOpenError`` while ``groq_breaker`` is
+        open, and with ``DeadlineExceeded`` when the current request deadline
+        (see ``resilience.deadline``) leaves no time for another attempt or
+        backoff; request timeouts are capped at the time left.
+
+        Tokens are charged to the current tenant's ledger, and calls past its
+        hard budget raise ``QuotaExceeded`` before anything is sent (see
+        ``quota``). Operations in ``GROQ_HEDGE_OPERATIONS`` send a duplicate request when
+        the first is slower than usual (see ``hedging``).
+        """
         if not GROQ_API_KEY:
             console.print("[yellow]⚠️  GROQ_API_KEY not set! Skipping LLM call.[/yellow]")
             raise RuntimeError("GROQ_API_KEY not configured")
+        check_quota(operation)
 
         headers = {
             "Authorization": f"Bearer {GROQ_API_KEY}",
@@ -29,7 +117,6 @@ class GroqClient:
         }
 
         payload = {
-            "model": GROQ_MODEL,
             "messages": [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt},
@@ -40,55 +127,161 @@ class GroqClient:
 
         max_attempts = 5
         base_delay = 1.0
+        started = time.perf_counter()
+        outcome = "error"
 
-        for attempt in range(1, max_attempts + 1):
-            try:
-                response = requests.post(GROQ_API_URL, headers=headers, json=payload, timeout=30)
-
-                # If rate limited or server error, handle retry
-                if response.status_code == 429:
-                    retry_after = response.headers.get("Retry-After")
-                    wait = float(retry_after) if retry_after and retry_after.isdigit() else base_delay * (2 ** (attempt - 1))
-                    # add small jitter
-                    wait = wait + random.uniform(0, 0.5)
-                    console.print(f"[yellow]⚠️  Groq rate limited (429). Retry {attempt}/{max_attempts} after {wait:.1f}s[/yellow]")
-                    time.sleep(wait)
-                    continue
+        tiers = model_tiers(operation)
+        now = time.monotonic()
+        # First tier that isn't cooling down, or the one that frees up soonest
+        tier = min(range(len(tiers)), key=lambda i: max(_rate_limited_until.get(tiers[i], 0.0) - now, 0.0))
 
-                if 500 <= response.status_code < 600:
-                    # server error, retry
-                    wait = base_delay * (2 ** (attempt - 1)) + random.uniform(0, 0.5)
-                    console.print(f"[yellow]⚠️  Groq server error {response.status_code}. Retry {attempt}/{max_attempts} after {wait:.1f}s[/yellow]")
-                    time.sleep(wait)
-                    continue
+        probe = groq_breaker.allow(operation)
+        try:
+            for attempt in range(1, max_attempts + 1):
+                model = tiers[tier]
+                payload["model"] = model
+                check_deadline(operation)
+                left = remaining()
+                timeout = GROQ_TIMEOUT if left is None else min(GROQ_TIMEOUT, left)
+                try:
+                    if should_hedge(operation):
+                        hedge_tier = tier + 1 if HEDGE_FALLBACK and tier + 1 < len(tiers) else tier
 
-                response.raise_for_status()
-                result = response.json()
-                return result["choices"][0]["message"]["content"]
-            except requests.exceptions.RequestException as e:
-                # network or other request-level errors: retry a few times
-                if attempt == max_attempts:
-                    console.print(f"[red]❌ Groq API Error: {str(e)}[/red]")
+                        def send(m):
+                            return requests.post(GROQ_API_URL, headers=headers, json=dict(payload, model=m), timeout=timeout)
+
+                        response, _, won = hedged_post(
+                            operation, lambda: send(model), lambda: send(tiers[hedge_tier]), timeout
+                        )
+                        if won:
+                            tier = hedge_tier
+                            model = tiers[tier]
+                    else:
+                        response = requests.post(GROQ_API_URL, headers=headers, json=payload, timeout=timeout)
+
+                    # If rate limited or server error, handle retry
+                    if response.status_code == 429:
+                        retry_after = response.headers.get("Retry-After")
+                        wait = float(retry_after) if retry_after and retry_after.isdigit() else base_delay * (2 ** (attempt - 1))
+                        _rate_limited_until[model] = time.monotonic() + wait
+                        if tier + 1 < len(tiers):
+                            tier += 1
+                            console.print(f"[yellow]⚠️  {model} rate limited (429), falling back to {tiers[tier]}[/yellow]")
+                            LLM_RETRIES.inc(operation=operation, reason="fallback")
+                            continue
+                        # add small jitter
+                        wait = wait + random.uniform(0, 0.5)
+                        console.print(f"[yellow]⚠️  Groq rate limited (429). Retry {attempt}/{max_attempts} after {wait:.1f}s[/yellow]")
+                        LLM_RETRIES.inc(operation=operation, reason="429")
+                        _backoff(wait, operation)
+                        continue
+
+                    if 500 <= response.status_code < 600:
+                        # server error, retry
+                        groq_breaker.record_failure()
+                        wait = base_delay * (2 ** (attempt - 1)) + random.uniform(0, 0.5)
+                        console.print(f"[yellow]⚠️  Groq server error {response.status_code}. Retry {attempt}/{max_attempts} after {wait:.1f}s[/yellow]")
+                        LLM_RETRIES.inc(operation=operation, reason="5xx")
+                        _backoff(wait, operation)
+                        continue
+
+                    if 400 <= response.status_code < 500:
+                        console.print(f"[red]❌ Groq rejected the request ({response.status_code}): {response.text[:200]}[/red]")
+                        raise GroqRequestError(
+                            f"{response.status_code} Client Error from Groq for {operation}: {response.text[:500]}",
+                            response=response,
+                        )
+                    response.raise_for_status()
+                    result = response.json()
+                    groq_breaker.record_success()
+                    usage = result.get("usage") or {}
+                    LLM_TOKENS.inc(usage.get("prompt_tokens", 0), operation=operation, kind="prompt")
+                    LLM_TOKENS.inc(usage.get("completion_tokens", 0), operation=operation, kind="completion")
+                    tokens = usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+                    hedge_budget.record(operation, tokens)
+                    record_usage(operation, tokens)
+                    outcome = "success"
+                    LLM_SERVED.inc(operation=operation, model=model, tier=tier_name(tier))
+                    return result["choices"][0]["message"]["content"]
+                except GroqRequestError:
                     raise
-                wait = base_delay * (2 ** (attempt - 1)) + random.uniform(0, 0.5)
-                console.print(f"[yellow]⚠️  Groq request failed: {str(e)}. Retry {attempt}/{max_attempts} after {wait:.1f}s[/yellow]")
-                time.sleep(wait)
-                continue
+                except requests.exceptions.RequestException as e:
+                    # network or other request-level errors: retry a few times
+                    groq_breaker.record_failure()
+                    if attempt == max_attempts:
+                        console.print(f"[red]❌ Groq API Error: {str(e)}[/red]")
+                        raise
+                    wait = base_delay * (2 ** (attempt - 1)) + random.uniform(0, 0.5)
+                    console.print(f"[yellow]⚠️  Groq request failed: {str(e)}. Retry {attempt}/{max_attempts} after {wait:.1f}s[/yellow]")
+                    LLM_RETRIES.inc(operation=operation, reason="network")
+                    _backoff(wait, operation)
+                    continue
 
-        # If we exit the retry loop without returning, raise a clear error
-        raise RuntimeError("Groq API unavailable or rate limited after multiple attempts")
+            # If we exit the retry loop without returning, raise a clear error
+            raise RuntimeError("Groq API unavailable or rate limited after multiple attempts")
+        finally:
+            if probe:
+                # A probe that was only rate limited or ran out of time proves nothing
+                groq_breaker.release()
+            LLM_REQUEST_DURATION.observe(time.perf_counter() - started, operation=operation, outcome=outcome)
 
 
 class FirecrawlClient:
-    """Firecrawl Web Scraping Client"""
+    """Firecrawl Web Scraping Client, with a URL cache and a local fallback"""
 
     @staticmethod
     def scrape(url: str) -> str:
-        """Scrape webpage content"""
-        if not FIRECRAWL_API_KEY:
-            console.print("[yellow]⚠️  FIRECRAWL_API_KEY not set![/yellow]")
+        """Scrape webpage content as markdown.
+
+        Fresh cache entries are returned directly and stale ones are
+        revalidated with a conditional GET. Misses go to Firecrawl when it is
+        configured; if it is missing, fails or takes longer than
+        ``FIRECRAWL_TIMEOUT`` the page is fetched and converted locally.
+        Raises ``BlockedURL`` for URLs pointing at non-public hosts.
+        """
+        try:
+            check_url(url)
+        except BlockedURL:
+            raise
+        except requests.exceptions.RequestException as e:
+            console.print(f"[yellow]⚠️  Cannot scrape {url}: {str(e)}[/yellow]")
             return ""
+        fetched = None
+        entry = scrape_cache.get(url)
+        if entry is not None:
+            if scrape_cache.fresh(entry):
+                SCRAPE_CACHE.inc(outcome="hit")
+                return entry["markdown"]
+            try:
+                fetched = fetch_page(url, entry["etag"], entry["last_modified"])
+            except BlockedURL:
+                raise
+            except requests.exceptions.RequestException as e:
+                # Better a slightly old page than none
+                console.print(f"[yellow]⚠️  Revalidating {url} failed, serving cached copy: {str(e)}[/yellow]")
+                SCRAPE_CACHE.inc(outcome="stale")
+                return entry["markdown"]
+            if fetched.not_modified or (entry["body_hash"] and fetched.body_hash == entry["body_hash"]):
+                scrape_cache.touch(url, etag=fetched.etag, last_modified=fetched.last_modified)
+                SCRAPE_CACHE.inc(outcome="revalidated")
+                return entry["markdown"]
+            SCRAPE_CACHE.inc(outcome="changed")
+        else:
+            SCRAPE_CACHE.inc(outcome="miss")
+
+        if FIRECRAWL_API_KEY:
+            content = FirecrawlClient._firecrawl(url)
+            if content:
+                validators = fetched or FirecrawlClient._validators(url)
+                scrape_cache.put(url, content, "firecrawl", etag=validators.etag,
+                                 last_modified=validators.last_modified, body_hash=validators.body_hash)
+                return content
+        else:
+            console.print("[yellow]⚠️  FIRECRAWL_API_KEY not set, fetching the page directly.[/yellow]")
+        return FirecrawlClient._local(url, fetched)
 
+    @staticmethod
+    def _firecrawl(url: str) -> str:
         headers = {
             "Authorization": f"Bearer {FIRECRAWL_API_KEY}",
             "Content-Type": "application/json",
@@ -96,11 +289,40 @@ class FirecrawlClient:
 
         payload = {"url": url, "formats": ["markdown"]}
 
+        started = time.perf_counter()
         try:
-            response = requests.post(FIRECRAWL_API_URL, headers=headers, json=payload, timeout=30)
+            response = requests.post(FIRECRAWL_API_URL, headers=headers, json=payload, timeout=FIRECRAWL_TIMEOUT)
             response.raise_for_status()
             result = response.json()
+            SCRAPE_DURATION.observe(time.perf_counter() - started, backend="firecrawl", outcome="success")
             return result.get("data", {}).get("markdown", "")
         except Exception as e:
+            SCRAPE_DURATION.observe(time.perf_counter() - started, backend="firecrawl", outcome="error")
             console.print(f"[yellow]⚠️  Firecrawl Warning: {str(e)}[/yellow]")
             return ""
+
+    @staticmethod
+    def _local(url: str, fetched: Optional[FetchResult] = None) -> str:
+        started = time.perf_counter()
+        try:
+            if fetched is None or fetched.not_modified:
+                fetched = fetch_page(url)
+            SCRAPE_DURATION.observe(time.perf_counter() - started, backend="local", outcome="success")
+        except Exception as e:
+            SCRAPE_DURATION.observe(time.perf_counter() - started, backend="local", outcome="error")
+            console.print(f"[yellow]⚠️  Local scrape Warning: {str(e)}[/yellow]")
+            return ""
+        scrape_cache.put(url, fetched.markdown, "local", etag=fetched.etag,
+                         last_modified=fetched.last_modified, body_hash=fetched.body_hash)
+        return fetched.markdown
+
+    @staticmethod
+    def _validators(url: str) -> FetchResult:
+        """ETag/Last-Modified for a page Firecrawl scraped, so it can be revalidated later."""
+        try:
+            # Not following redirects: check_url only vetted this host
+            response = requests.head(url, headers={"User-Agent": USER_AGENT}, timeout=5, allow_redirects=False)
+            return FetchResult(response.status_code, etag=response.headers.get("ETag", ""),
+                               last_modified=response.headers.get("Last-Modified", ""))
+        except requests.exceptions.RequestException:
+            return FetchResult(0)
@@ -0,0 +1,46 @@
+"""Compact course and schedule context for prompts.
+
+The full course/assignment JSON (with descriptions, indentation and
+duplicated nested assignments) is the bulk of every chat prompt. Most
+prompts only need one line per course and per assignment.
+"""
+
+from typing import Dict, Iterable
+
+
+def compact_context(courses: Iterable[Dict], assignments: Iterable[Dict], limit: int = 200) -> str:
+    """One line per course and per open assignment, soonest due first."""
+    lines = ["Courses (name | code | instructor):"]
+    for c in courses:
+        lines.append(f"- {c.get('course_name', '')} | {c.get('course_code', '')} | {c.get('instructor') or '-'}")
+    pending = sorted(
+        (a for a in assignments if a.get("progress", 0) < 100),
+        key=lambda a: a.get("due_date") or "9999-12-31",
+    )
+    done = sum(1 for a in assignments if a.get("progress", 0) >= 100)
+    lines.append("Open assignments (name | course | type | due | weight% | est. hours | progress%):")
+    for a in pending[:limit]:
+        lines.append(
+            f"- {a.get('name', '')} | {a.get('course', '')} | {a.get('type', '')} | {a.get('due_date', '')} | "
+            f"{a.get('weight', 0)} | {a.get('estimated_hours', '')} | {a.get('progress', 0)}"
+        )
+    if len(pending) > limit:
+        lines.append(f"- ... {len(pending) - limit} more")
+    lines.append(f"Completed assignments: {done}")
+    return "\n".join(lines)
+
+
+def schedule_digest(schedule: Dict, days: int = 14) -> str:
+    """The first ``days`` scheduled days as one line per task, plus warnings."""
+    lines = []
+    daily = (schedule or {}).get("daily_schedule") or {}
+    for day in sorted(daily)[:days]:
+        for task in daily[day] or []:
+            if isinstance(task, dict):
+                lines.append(
+                    f"- {day} | {task.get('assignment', '')} | {task.get('task', '')} | "
+                    f"{task.get('hours', '')}h | {task.get('priority', '')}"
+                )
+    for warning in (schedule or {}).get("warnings") or []:
+        lines.append(f"! {warning}")
+    return "\n".join(lines) or "(empty schedule)"
@@ -0,0 +1,145 @@
+"""Bounded same-domain crawler for course websites.
+
+Course sites often spread the schedule, assignments and exam dates across
+several pages. ``crawl_course_site`` scrapes the start page, follows links
+on the same domain level by level (every page of a level is fetched at once
+on a shared thread pool), ranks the pages by how syllabus-like they are and
+joins the best ones into a single document for ``parse_syllabus``.
+Every page is fetched through ``scrape``, which refuses non-public hosts;
+the start URL is checked up front so a blocked one is an error, not an
+empty crawl.
+"""
+
+import hashlib
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import urldefrag, urljoin, urlparse
+
+from .preextract import WEIGHT, detect_type, find_dates
+from .scraping import check_url
+
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "8"))
+CRAWL_MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", "1"))
+CRAWL_MAX_CHARS = int(os.getenv("CRAWL_MAX_CHARS", "24000"))
+
+# Shared by all crawls so concurrent requests can't open unbounded connections
+_pool = ThreadPoolExecutor(max_workers=int(os.getenv("CRAWL_POOL_SIZE", "8")), thread_name_prefix="crawl")
+
+LINK = re.compile(r"\[([^\]]*)\]\((https?://[^)\s]+|/[^)\s]*|[^)\s:]+)\)")
+RELEVANT_WORDS = re.compile(
+    r"syllabus|schedule|calendar|assignment|homework|hw|exam|midterm|final|quiz|project|grading|deadline|due|course.?info|lectures?",
+    re.I,
+)
+SKIP_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".css", ".js", ".zip", ".mp4", ".mp3", ".ico", ".ppt", ".pptx")
+
+
+def _links(markdown: str, base_url: str) -> List[Tuple[str, str]]:
+    """Same-domain ``(url, anchor text)`` pairs in a scraped page."""
+    domain = urlparse(base_url).netloc
+    found, seen = [], set()
+    for text, href in LINK.findall(markdown):
+        url, _ = urldefrag(urljoin(base_url, href))
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or parsed.netloc != domain:
+            continue
+        if parsed.path.lower().endswith(SKIP_EXTENSIONS) or url in seen:
+            continue
+        seen.add(url)
+        found.append((url, text))
+    return found
+
+
+def link_score(url: str, text: str) -> int:
+    """How likely a link leads to schedule or assignment information."""
+    return 2 * len(RELEVANT_WORDS.findall(text)) + len(RELEVANT_WORDS.findall(urlparse(url).path))
+
+
+def page_score(markdown: str) -> float:
+    """Syllabus relevance of a page: dates, weights and assignment keywords per KB."""
+    if not markdown:
+        return 0.0
+    sample = markdown[:50000]
+    reference = date.today()
+    hits = 0
+    for line in sample.splitlines():
+        if not line.strip():
+            continue
+        has_type = detect_type(line) is not None
+        # Only the presence of a date matters, so any reference date will do
+        hits += 3 * bool(has_type and find_dates(line, reference)) + bool(WEIGHT.search(line)) + has_type
+    # Favor dense pages without letting a huge page win on size alone
+    return hits / (1 + len(sample) / 4000)
+
+
+def crawl_course_site(
+    url: str,
+    scrape: Callable[[str], str],
+    max_pages: int = CRAWL_MAX_PAGES,
+    max_depth: int = CRAWL_MAX_DEPTH,
+    max_chars: int = CRAWL_MAX_CHARS,
+) -> str:
+    """Scrape ``url`` and up to ``max_pages - 1`` linked pages; return the combined markdown."""
+    check_url(url)
+    pages: Dict[str, str] = {}
+    links: Dict[str, List[Tuple[str, str]]] = {}
+    level = [url]
+    visited = {url}
+    for depth in range(max_depth + 1):
+        results = list(_pool.map(_safe_scrape(scrape), level))
+        for page_url, markdown in zip(level, results):
+            if markdown:
+                pages[page_url] = markdown
+                links[page_url] = _links(markdown, page_url)
+        if depth == max_depth or len(visited) >= max_pages:
+            break
+        candidates = {}
+        for page_url in level:
+            for link, text in links.get(page_url, []):
+                if link not in visited:
+                    candidates[link] = max(candidates.get(link, 0), link_score(link, text))
+        budget = max_pages - len(visited)
+        level = [link for link, _ in sorted(candidates.items(), key=lambda item: -item[1])[:budget]]
+        if not level:
+            break
+        visited.update(level)
+
+    return combine_pages(url, pages, max_chars)
+
+
+def _safe_scrape(scrape: Callable[[str], str]) -> Callable[[str], str]:
+    def run(page_url: str) -> str:
+        try:
+            return scrape(page_url) or ""
+        except Exception:
+            return ""
+    return run
+
+
+def combine_pages(start_url: str, pages: Dict[str, str], max_chars: int = CRAWL_MAX_CHARS) -> str:
+    """Join the start page and the most relevant other pages, best first, within ``max_chars``."""
+    seen_hashes = set()
+    ranked = []
+    for page_url, markdown in pages.items():
+        digest = hashlib.sha256(markdown.strip().encode()).hexdigest()
+        if digest in seen_hashes:
+            continue
+        seen_hashes.add(digest)
+        score = page_score(markdown)
+        if page_url != start_url and score <= 0:
+            continue
+        # The start page always leads: it usually names the course and instructor
+        ranked.append((page_url != start_url, -score, page_url, markdown))
+    ranked.sort()
+
+    parts, used = [], 0
+    for _, _, page_url, markdown in ranked:
+        remaining = max_chars - used
+        if remaining <= 200:
+            break
+        chunk = f"<!-- Page: {page_url} -->\n{markdown[:remaining]}"
+        parts.append(chunk)
+        used += len(chunk)
+    return "\n\n".join(parts)
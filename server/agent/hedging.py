@@ -0,0 +1,176 @@
+"""Hedged Groq requests for the slow tail.
+
+For operations listed in ``GROQ_HEDGE_OPERATIONS``, ``hedged_post`` sends the
+request and, if it hasn't answered within the ``GROQ_HEDGE_PERCENTILE`` of
+that operation's recent latencies, sends a duplicate (to the next model
+tier with ``GROQ_HEDGE_FALLBACK=1``). The first good response wins.
+
+``requests`` can't abort a request once it is on the wire, so the loser is
+abandoned rather than cancelled: its thread finishes in the background, its
+response is closed and its tokens are charged to the hedge budget. Hedges
+are only sent while those extra tokens stay under ``GROQ_HEDGE_BUDGET``
+percent of the tokens used by regular calls.
+"""
+
+import contextvars
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from .metrics import LLM_HEDGES, LLM_HEDGE_TOKENS
+from .quota import current_ledger, record_usage
+
+# Comma-separated operations to hedge, e.g. "chat,chat_answer,chat_action"; empty disables hedging
+HEDGE_OPERATIONS = {op.strip() for op in os.getenv("GROQ_HEDGE_OPERATIONS", "").split(",") if op.strip()}
+HEDGE_PERCENTILE = float(os.getenv("GROQ_HEDGE_PERCENTILE", "95"))
+# Extra tokens allowed for hedges, as a percentage of regular usage
+HEDGE_BUDGET_PERCENT = float(os.getenv("GROQ_HEDGE_BUDGET", "5"))
+HEDGE_FALLBACK = os.getenv("GROQ_HEDGE_FALLBACK", "0") == "1"
+# Latencies needed before the percentile is trusted
+HEDGE_MIN_SAMPLES = int(os.getenv("GROQ_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_WINDOW = 200
+
+_pool = ThreadPoolExecutor(max_workers=int(os.getenv("GROQ_HEDGE_POOL_SIZE", "16")), thread_name_prefix="groq-hedge")
+
+
+def _tokens(response) -> int:
+    try:
+        usage = response.json().get("usage") or {}
+    except Exception:
+        return 0
+    return int(usage.get("prompt_tokens", 0)) + int(usage.get("completion_tokens", 0))
+
+
+class LatencyTracker:
+    """Recent successful latencies per operation."""
+
+    def __init__(self, window: int = HEDGE_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def observe(self, operation: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(operation, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, operation: str, pct: float, min_samples: int = HEDGE_MIN_SAMPLES) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(operation, ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, max(0, math.ceil(pct / 100 * len(samples)) - 1))]
+
+
+class HedgeBudget:
+    """Caps hedge tokens at ``percent`` of the tokens used by regular calls."""
+
+    def __init__(self, percent: float = HEDGE_BUDGET_PERCENT):
+        self.percent = percent
+        self._lock = threading.Lock()
+        self.regular = 0
+        self.extra = 0
+        # Per operation: (calls, tokens) for estimating a hedge's cost up front
+        self._per_call: Dict[str, Tuple[int, int]] = {}
+
+    def record(self, operation: str, tokens: int):
+        """Tokens used by a call's winning response."""
+        with self._lock:
+            self.regular += tokens
+            calls, total = self._per_call.get(operation, (0, 0))
+            self._per_call[operation] = (calls + 1, total + tokens)
+
+    def reserve(self, operation: str) -> Optional[int]:
+        """Reserve the expected cost of one hedge, or None if it would overrun the budget."""
+        with self._lock:
+            calls, total = self._per_call.get(operation, (0, 0))
+            estimate = total // calls if calls else 0
+            if not estimate or self.extra + estimate > self.regular * self.percent / 100:
+                return None
+            self.extra += estimate
+            return estimate
+
+    def settle(self, reserved: int, tokens: int):
+        """Replace a reservation with what the losing request actually cost."""
+        with self._lock:
+            self.extra += tokens - reserved
+
+
+latencies = LatencyTracker()
+budget = HedgeBudget()
+
+
+def should_hedge(operation: str) -> bool:
+    return operation in HEDGE_OPERATIONS and HEDGE_BUDGET_PERCENT > 0
+
+
+def hedged_post(operation: str, send: Callable, hedge_send: Callable, timeout: float):
+    """Run ``send()``; past the latency percentile also ``hedge_send()``.
+
+    Both return a ``requests.Response``. Returns ``(response, hedged, won)``
+    where ``won`` is True when the hedge's response is the one returned.
+    Non-2xx responses and exceptions only win when the other side did no
+    better, so the caller's retry handling still sees them.
+    """
+    started = time.perf_counter()
+
+    def timed():
+        response = send()
+        if response.status_code < 400:
+            latencies.observe(operation, time.perf_counter() - started)
+        return response
+
+    primary = _pool.submit(contextvars.copy_context().run, timed)
+    delay = latencies.percentile(operation, HEDGE_PERCENTILE)
+    if delay is None or delay >= timeout:
+        return primary.result(), False, False
+    wait([primary], timeout=delay)
+    if primary.done():
+        return primary.result(), False, False
+
+    reserved = budget.reserve(operation)
+    if reserved is None:
+        LLM_HEDGES.inc(operation=operation, outcome="over_budget")
+        return primary.result(), False, False
+    LLM_HEDGES.inc(operation=operation, outcome="sent")
+    hedge = _pool.submit(contextvars.copy_context().run, hedge_send)
+    # Callbacks run outside the request's context: the loser is charged to this tenant
+    ledger = current_ledger()
+
+    pending = {primary, hedge}
+    winner = None
+    while pending:
+        done, pending = wait(pending, timeout=max(0.0, timeout - (time.perf_counter() - started)), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            if future.exception() is None and future.result().status_code < 400:
+                winner = future
+                break
+        if winner is not None:
+            break
+    if winner is None:
+        # Neither answered well: settle the hedge and report the primary's outcome
+        hedge.add_done_callback(lambda f: _abandon(f, reserved, operation, ledger))
+        return primary.result(), True, False
+
+    loser = hedge if winner is primary else primary
+    LLM_HEDGES.inc(operation=operation, outcome="won" if winner is hedge else "lost")
+    loser.add_done_callback(lambda f: _abandon(f, reserved, operation, ledger))
+    return winner.result(), True, winner is hedge
+
+
+def _abandon(future, reserved: int, operation: str, ledger):
+    """Close a response nobody will read and charge its tokens to the hedge and tenant budgets."""
+    tokens = 0
+    if future.exception() is None:
+        response = future.result()
+        if response.status_code < 400:
+            tokens = _tokens(response)
+        response.close()
+    budget.settle(reserved, tokens)
+    LLM_HEDGE_TOKENS.inc(tokens)
+    record_usage(operation, tokens, ledger)
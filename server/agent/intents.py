@@ -0,0 +1,132 @@
+"""Local intent pre-classifier for chat messages.
+
+Runs before any LLM call and routes each message to the cheapest path that
+can handle it:
+
+``smalltalk``  greetings and thanks, answered with a canned reply
+``lookup``     questions the server answers from state ("what's due this week?");
+               only when they name no course or assignment, since the local
+               answers cover everything the student has
+``action``     add/delete/edit requests and settings changes, sent to the LLM
+               for action JSON only
+``question``   other factual questions, answered from a compact context
+``reasoning``  planning and advice, which get the full assistant prompt
+"""
+
+import re
+from typing import Dict, Optional
+
+from ..name_index import NameIndex, tokenize
+
+SMALLTALK = "smalltalk"
+LOOKUP = "lookup"
+ACTION = "action"
+QUESTION = "question"
+REASONING = "reasoning"
+
+_SMALLTALK = re.compile(
+    r"^\s*(hi|hello|hey|yo|hiya|thanks|thank you|thx|ty|ok|okay|cool|great|nice|awesome|bye|goodbye|"
+    r"good (morning|afternoon|evening|night))( there)?[\s!.,:)]*$",
+    re.I,
+)
+_ACTION_VERB = re.compile(
+    r"\b(add|create|new|insert|delete|remove|drop|rename|change|update|edit|modify|move|postpone|"
+    r"reschedule|push back|extend|mark|set|finished|completed|done with)\b",
+    re.I,
+)
+_ENTITY = re.compile(
+    r"\b(course|class|subject|assignment|homework|hw|quiz|exam|midterm|final|project|lab|essay|paper|"
+    r"presentation|deadline|due|progress|syllabus|[A-Z]{2,5}\s?\d{3}|"
+    r"hours? (per|a|each) day|daily hours|study hours|risk threshold|lead days|reminders?|notifications?|settings?)\b|%",
+    re.I,
+)
+_URL = re.compile(r"https?://\S+")
+_REASONING = re.compile(
+    r"\b(should|plan|planning|prioriti[sz]e|priority|advice|advise|help me|strategy|why|explain|study|"
+    r"recommend|suggest|how (can|do|should) i|stress|stressed|overwhelm\w*|balance|focus|tips?)\b",
+    re.I,
+)
+_QUESTION = re.compile(r"\?\s*$|^\s*(what|when|which|who|where|how many|how much|is|are|do|does|did|list|show)\b", re.I)
+
+_DUE_WINDOWS = [
+    (re.compile(r"\btoday\b", re.I), 0),
+    (re.compile(r"\btomorrow\b", re.I), 1),
+    (re.compile(r"\bnext week\b", re.I), 14),
+    (re.compile(r"\b(this|the) week\b|\bweek\b", re.I), 7),
+    (re.compile(r"\b(this|the) month\b", re.I), 30),
+]
+_DUE_QUESTION = re.compile(r"\b(due|deadlines?|upcoming|coming up|what do i have)\b", re.I)
+_IN_DAYS = re.compile(r"\b(?:next|in|within)\s+(\d{1,3})\s+days?\b", re.I)
+_LIST_COURSES = re.compile(r"\b(list|show|what are|which are|what)\b.*\b(my )?(courses|classes)\b", re.I)
+_PROGRESS = re.compile(r"\b(my progress|how am i doing|how('s| is) my progress|overall progress)\b", re.I)
+_COUNT = re.compile(r"\bhow many (assignments|courses|classes|tasks)\b", re.I)
+_CODE = re.compile(r"\b([A-Za-z]{2,5})[\s-]?(\d{3})\b")
+# Words of lookup questions that don't name a particular course or assignment
+_COMMON_WORDS = frozenset("""
+    a about all am an and any anything are at be by can classes class coming course courses day days deadline
+    deadlines did do does doing done due finished for from have how homework i in is it left list many me month
+    much my next of on or overall progress s show still task tasks that the these this those to today tomorrow
+    up upcoming week weeks what when where which who will with within assignment assignments
+""".split())
+
+
+class Intent:
+    def __init__(self, kind: str, lookup: Optional[str] = None, params: Optional[Dict] = None):
+        self.kind = kind
+        # For LOOKUP: which local answer to produce, and its parameters
+        self.lookup = lookup
+        self.params = params or {}
+
+    def __repr__(self):
+        return f"Intent({self.kind!r}, {self.lookup!r}, {self.params!r})"
+
+
+def _lookup(question: str) -> Optional[Intent]:
+    if _COUNT.search(question):
+        return Intent(LOOKUP, "count", {"what": _COUNT.search(question).group(1).lower()})
+    if _PROGRESS.search(question):
+        return Intent(LOOKUP, "progress")
+    if _LIST_COURSES.search(question) and not _DUE_QUESTION.search(question):
+        return Intent(LOOKUP, "courses")
+    if _DUE_QUESTION.search(question):
+        m = _IN_DAYS.search(question)
+        if m:
+            return Intent(LOOKUP, "due", {"days": int(m.group(1))})
+        for pattern, days in _DUE_WINDOWS:
+            if pattern.search(question):
+                return Intent(LOOKUP, "due", {"days": days})
+        return Intent(LOOKUP, "due", {"days": 7})
+    return None
+
+
+def _names_something(question: str, index: NameIndex) -> bool:
+    """Whether ``question`` mentions a course code or one of the student's courses or assignments."""
+    if any(letters.lower() not in _COMMON_WORDS for letters, _ in _CODE.findall(question)):
+        # A course code is specific even when it isn't one of the student's courses
+        return True
+    return index.mentions(t for t in tokenize(question) if t.isalpha() and t not in _COMMON_WORDS)
+
+
+def classify(question: str, index: Optional[NameIndex] = None) -> Intent:
+    """Pick the cheapest chat path for ``question``; never calls a model.
+
+    With the snapshot's ``index``, questions that name a course or assignment
+    ("when is my Math final due?") are never answered by a local lookup.
+    """
+    text = question.strip()
+    if not text or _SMALLTALK.match(text):
+        return Intent(SMALLTALK)
+    # Pasted syllabi and links are always "add this course"
+    if _URL.search(text) or len(text) > 400:
+        return Intent(ACTION)
+    # "Add Math 101", "can you move quiz 2 to Friday?", "I finished the essay"
+    if _ACTION_VERB.search(text) and _ENTITY.search(text):
+        return Intent(ACTION)
+    if _REASONING.search(text):
+        return Intent(REASONING)
+    lookup = _lookup(text) if index is None or not _names_something(text, index) else None
+    if lookup is not None:
+        return lookup
+    if _QUESTION.search(text):
+        return Intent(QUESTION)
+    return Intent(REASONING)
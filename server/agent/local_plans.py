@@ -0,0 +1,108 @@
+"""Workload, schedule and notifications computed without the LLM.
+
+Used when a tenant is past its soft token budget (see ``quota``). The
+results have the same shape as the LLM prompts' JSON and are marked with
+``"source": "local"``; they follow the same rules (risk week over 20 hours,
+start early, 20% buffer, daily hour limit) but without the prose.
+"""
+
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from ..model import due_date_of
+
+RISK_WEEK_HOURS = 20
+BUFFER = 1.2
+
+
+def _hours_left(a: Dict) -> float:
+    try:
+        hours = float(a.get("estimated_hours") or 0)
+        progress = float(a.get("progress") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+    return max(0.0, hours * (1 - progress / 100))
+
+
+def _open(assignments: List[Dict], today: date) -> List[Tuple[date, Dict]]:
+    """Unfinished assignments that aren't past due, soonest first."""
+    pending = []
+    for a in assignments:
+        due = due_date_of(a)
+        if due is not None and due >= today and (a.get("progress") or 0) < 100:
+            pending.append((due, a))
+    pending.sort(key=lambda item: item[0])
+    return pending
+
+
+def local_workload(assignments: List[Dict], today: Optional[date] = None) -> Dict:
+    today = today or date.today()
+    weekly: Dict[str, float] = {}
+    pending = _open(assignments, today)
+    for due, a in pending:
+        week = (due - timedelta(days=due.weekday())).isoformat()
+        weekly[week] = weekly.get(week, 0.0) + _hours_left(a)
+    risk_weeks = sorted(week for week, hours in weekly.items() if hours > RISK_WEEK_HOURS)
+    recommendations = [f"Week of {week} has {weekly[week]:.0f} hours due: start early." for week in risk_weeks]
+    return {
+        "total_hours": round(sum(weekly.values()), 1),
+        "weekly_breakdown": {week: round(hours, 1) for week, hours in sorted(weekly.items())},
+        "risk_weeks": risk_weeks,
+        "recommendations": recommendations,
+        "priority_assignments": [a.get("name", "") for _, a in pending[:5]],
+        "source": "local",
+    }
+
+
+def local_schedule(assignments: List[Dict], hours_per_day: float = 4, today: Optional[date] = None) -> Dict:
+    """Earliest deadline first, filling each day up to ``hours_per_day``."""
+    today = today or date.today()
+    daily: Dict[str, List[Dict]] = {}
+    used: Dict[date, float] = {}
+    warnings = []
+    scheduled = 0.0
+    for due, a in _open(assignments, today):
+        left = round(_hours_left(a) * BUFFER, 1)
+        day = today
+        # Work ends the day before it is due, when there is a day before
+        last = max(today, due - timedelta(days=1))
+        while left > 0 and day <= last:
+            free = hours_per_day - used.get(day, 0.0)
+            if free > 0:
+                hours = round(min(free, left), 1)
+                used[day] = used.get(day, 0.0) + hours
+                left = round(left - hours, 1)
+                scheduled += hours
+                daily.setdefault(day.isoformat(), []).append({
+                    "assignment": a.get("name", ""),
+                    "task": f"Work on {a.get('name', '')}",
+                    "hours": hours,
+                    "priority": "high" if (due - today).days <= 3 else "medium" if (due - today).days <= 7 else "low",
+                })
+            day += timedelta(days=1)
+        if left > 0:
+            warnings.append(f"{a.get('name', '')} needs {left:.1f} more hours than fit before {due.isoformat()}")
+    return {
+        "daily_schedule": dict(sorted(daily.items())),
+        "warnings": warnings,
+        "total_scheduled_hours": round(scheduled, 1),
+        "source": "local",
+    }
+
+
+def local_notifications(assignments: List[Dict], lead_days: int = 3, today: Optional[date] = None) -> List[Dict]:
+    today = today or date.today()
+    notifications = []
+    for due, a in _open(assignments, today):
+        days = (due - today).days
+        if days > lead_days:
+            break
+        when = "today" if days == 0 else "tomorrow" if days == 1 else f"in {days} days"
+        notifications.append({
+            "message": f"{a.get('name', '')} ({a.get('course', '')}) is due {when}",
+            "urgency": "high" if days <= 1 else "medium",
+            "action": f"Plan {_hours_left(a):.1f} hours for {a.get('name', '')}",
+            "send_at": f"{today.isoformat()} 09:00",
+            "type": "deadline",
+        })
+    return notifications
@@ -0,0 +1,267 @@
+"""Minimal Prometheus-format metrics registry.
+
+Only counters, gauges and histograms with labels are supported, which is all
+the server exposes on ``/metrics``. Kept dependency-free so the agent package
+can record LLM metrics without pulling in ``prometheus_client``.
+"""
+
+import threading
+from typing import Dict, List, Tuple
+
+_lock = threading.Lock()
+_registry: List["_Metric"] = []
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labelnames: Tuple[str, ...], labels: Dict[str, str]) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=None) -> str:
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        with _lock:
+            _registry.append(self)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def _samples(self):
+        with _lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with _lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def _samples(self):
+        with _lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label key -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with _lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def count(self, **labels) -> int:
+        data = self._values.get(_label_key(self.labelnames, labels))
+        return data[-1] if data else 0
+
+    def _samples(self):
+        with _lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = []
+        for key, data in items:
+            for i, bound in enumerate(self.buckets):
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {data[i]}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(data[-2])}")
+            lines.append(f"{self.name}_count{labels} {data[-1]}")
+        return lines
+
+
+def render_latest() -> str:
+    """Render every registered metric in the Prometheus text format."""
+    with _lock:
+        metrics = list(_registry)
+    return "\n".join(m.render() for m in metrics) + "\n"
+
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# Metrics shared by the agent and the web server
+HTTP_REQUEST_DURATION = Histogram(
+    "coursesync_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ("method", "route", "status"),
+)
+LLM_REQUEST_DURATION = Histogram(
+    "coursesync_llm_request_duration_seconds",
+    "Groq call latency by prompt type, including retries",
+    ("operation", "outcome"),
+)
+LLM_TOKENS = Counter(
+    "coursesync_llm_tokens_total",
+    "Tokens reported in the Groq usage block",
+    ("operation", "kind"),
+)
+LLM_RETRIES = Counter(
+    "coursesync_llm_retries_total",
+    "Groq call retries by cause",
+    ("operation", "reason"),
+)
+LLM_SERVED = Counter(
+    "coursesync_llm_served_total",
+    "Successful Groq calls by the model and tier (primary, fallbackN) that answered",
+    ("operation", "model", "tier"),
+)
+LLM_REJECTED = Counter(
+    "coursesync_llm_rejected_total",
+    "Groq calls failed fast by the circuit breaker or the request deadline",
+    ("operation", "reason"),
+)
+LLM_CIRCUIT_STATE = Gauge(
+    "coursesync_llm_circuit_state",
+    "Groq circuit breaker state (0 closed, 1 half-open, 2 open)",
+)
+LLM_QUOTA_REJECTED = Counter(
+    "coursesync_llm_quota_rejected_total",
+    "Groq calls refused because a tenant's hard token budget is used up",
+    ("operation", "window"),
+)
+LLM_QUOTA_DEGRADED = Counter(
+    "coursesync_llm_quota_degraded_total",
+    "Requests served from cached or local results past a soft token budget",
+    ("operation",),
+)
+LLM_HEDGES = Counter(
+    "coursesync_llm_hedges_total",
+    "Hedged Groq requests (sent, won, lost, over_budget)",
+    ("operation", "outcome"),
+)
+LLM_HEDGE_TOKENS = Counter(
+    "coursesync_llm_hedge_tokens_total",
+    "Tokens spent on the losing side of hedged Groq requests",
+)
+LLM_BACKOFF_SECONDS = Counter(
+    "coursesync_llm_backoff_seconds_total",
+    "Seconds slept between Groq retries",
+    ("operation",),
+)
+LLM_PARSE_FAILURES = Counter(
+    "coursesync_llm_parse_failures_total",
+    "LLM responses that could not be parsed as JSON",
+    ("operation",),
+)
+SYLLABUS_PREEXTRACT = Counter(
+    "coursesync_syllabus_preextract_total",
+    "Syllabus parses by how much the local extractor resolved (complete, partial, none)",
+    ("outcome",),
+)
+SYLLABUS_REUSE = Counter(
+    "coursesync_syllabus_reuse_total",
+    "Near-duplicate syllabus lookups (exact, cosmetic, patched, miss)",
+    ("outcome",),
+)
+CHAT_ROUTES = Counter(
+    "coursesync_chat_routes_total",
+    "Chat messages by classified route (smalltalk, lookup, action, question, reasoning)",
+    ("route",),
+)
+SCRAPE_DURATION = Histogram(
+    "coursesync_scrape_duration_seconds",
+    "Scrape latency by backend (firecrawl, local)",
+    ("backend", "outcome"),
+)
+SCRAPE_CACHE = Counter(
+    "coursesync_scrape_cache_total",
+    "Scrape cache lookups (hit, revalidated, changed, stale, miss)",
+    ("outcome",),
+)
+STATE_PERSIST_DURATION = Histogram(
+    "coursesync_state_persist_duration_seconds",
+    "Time spent writing data.json",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+STATE_SIZE_BYTES = Gauge(
+    "coursesync_state_size_bytes",
+    "Size of the persisted data.json state",
+)
+TENANTS_IN_MEMORY = Gauge(
+    "coursesync_tenants_in_memory",
+    "User partitions currently loaded in this process",
+)
+TENANT_EVICTIONS = Counter(
+    "coursesync_tenant_evictions_total",
+    "Idle user partitions evicted from memory",
+)
+LOG_RECORDS_DROPPED = Counter(
+    "coursesync_log_records_dropped_total",
+    "Log records dropped because the log queue was full",
+)
@@ -0,0 +1,318 @@
+"""Rule-based syllabus pre-extractor.
+
+Most syllabi list assignments on predictable lines: a name containing a type
+keyword ("Homework 2", "Midterm Exam"), a due date ("2025-09-15", "Sep 15",
+"Week 3 Friday") and a weight ("10%"). ``preextract_syllabus`` pulls those
+out locally so that a well-formed syllabus never reaches the LLM, and a
+partially understood one only sends the sections it could not resolve.
+
+Lines with a date or a weight but no type keyword ("Reflection Journal -
+Nov 2 - 10%") are never dropped: they are sent to the LLM as unresolved.
+"""
+
+import re
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# Checked in order, so "Final Project" is a project and "Project Presentation" a presentation
+TYPE_KEYWORDS = [
+    ("presentation", ("presentation", "talk", "demo")),
+    ("project", ("project", "capstone")),
+    ("quiz", ("quiz", "quizzes")),
+    ("exam", ("exam", "exams", "midterm", "midterms", "final", "test", "tests")),
+    ("homework", ("homework", "hw", "assignment", "assignments", "problem set", "pset",
+                  "lab", "labs", "essay", "paper", "report", "exercise", "worksheet")),
+]
+
+# Mirrors the estimates in SYLLABUS_PARSER_PROMPT
+ESTIMATED_HOURS = {"quiz": 2, "homework": 5, "project": 20, "exam": 8, "presentation": 10}
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+WEEKDAYS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+
+_MONTH = r"(jan|feb|mar|apr|may|jun|jul|aug|sept?|oct|nov|dec)[a-z]*\.?"
+_WEEKDAY = r"(mon|tue|wed|thu|fri|sat|sun)[a-z]*"
+
+ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+NUMERIC_DATE = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?\b")
+MONTH_DAY = re.compile(_MONTH + r"\s+(\d{1,2})(?:st|nd|rd|th)?\b(?:,?\s*(\d{4}))?", re.I)
+DAY_MONTH = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+" + _MONTH + r"(?:,?\s*(\d{4}))?", re.I)
+WEEK = re.compile(r"\bweek\s+(\d{1,2})\b(?:[\s,:(-]+" + _WEEKDAY + r")?", re.I)
+WEEKDAY_WEEK = re.compile(_WEEKDAY + r"[\s,]+(?:of\s+)?week\s+(\d{1,2})\b", re.I)
+WEIGHT = re.compile(r"(\d{1,3}(?:\.\d+)?)\s*%")
+
+ITEM_PREFIX = re.compile(r"^\s*(?:\d{1,2}[.)]|[-*•]|\(?[a-z][.)])\s+", re.I)
+FIELD_LINE = re.compile(r"^\s*(?:[-*•]\s*)?(due(?:\s+date)?|date|deadline|weight|worth|description|details|points)\s*[:=-]\s*(.*)$", re.I)
+NAME_CUT = re.compile(r"\s*(?:[-–|,:(]\s*)?(?:due\b|deadline\b|date\b|weight\b|worth\b|\d{1,3}(?:\.\d+)?\s*%).*$", re.I)
+
+COURSE_FIELD = re.compile(r"^\s*(?:course(?:\s+(?:name|title))?|title)\s*:\s*(.+)$", re.I)
+CODE_FIELD = re.compile(r"^\s*course\s+(?:code|number)\s*:\s*(.+)$", re.I)
+INSTRUCTOR_FIELD = re.compile(r"^\s*(?:instructor|professor|lecturer|teacher)\s*:\s*(.+)$", re.I)
+COURSE_CODE = re.compile(r"\b([A-Z]{2,5})\s?-?(\d{3,4}[A-Z]?)\b")
+COURSE_IN_PARENS = re.compile(r"\s*[(\[]\s*[A-Z]{2,5}\s?-?\d{3,4}[A-Z]?\s*[)\]]\s*$")
+
+
+def _keyword_pattern(words) -> re.Pattern:
+    return re.compile(r"\b(?:" + "|".join(re.escape(w) for w in words) + r")\b", re.I)
+
+
+_TYPE_PATTERNS = [(kind, _keyword_pattern(words)) for kind, words in TYPE_KEYWORDS]
+
+
+def detect_type(text: str) -> Optional[str]:
+    """Map a name to quiz|exam|project|homework|presentation, or None."""
+    for kind, pattern in _TYPE_PATTERNS:
+        if pattern.search(text):
+            return kind
+    return None
+
+
+def _infer_year(month: int, day: int, start: date) -> Optional[date]:
+    """Resolve a month/day without a year to the occurrence nearest the semester."""
+    try:
+        candidate = date(start.year, month, day)
+    except ValueError:
+        return None
+    # A January date in a semester starting in August belongs to next year
+    if (start - candidate).days > 60:
+        try:
+            candidate = date(start.year + 1, month, day)
+        except ValueError:
+            return None
+    return candidate
+
+
+def _resolve_week(week: int, weekday: Optional[str], start: date) -> Optional[date]:
+    if week < 1 or week > 30:
+        return None
+    week_start = start + timedelta(days=7 * (week - 1))
+    # Without a weekday, assume the Friday of that week
+    target = WEEKDAYS[weekday[:3].lower()] if weekday else 4
+    return week_start + timedelta(days=(target - week_start.weekday()) % 7)
+
+
+def find_dates(text: str, semester_start: date) -> List[Tuple[int, date]]:
+    """All resolvable dates in ``text`` as ``(position, date)``, in order."""
+    found = []
+    for m in ISO_DATE.finditer(text):
+        try:
+            found.append((m.start(), date(int(m.group(1)), int(m.group(2)), int(m.group(3)))))
+        except ValueError:
+            pass
+    for m in NUMERIC_DATE.finditer(text):
+        if ISO_DATE.search(text[max(0, m.start() - 5):m.end() + 3]):
+            continue
+        month, day, year = int(m.group(1)), int(m.group(2)), m.group(3)
+        try:
+            if year:
+                year = int(year) + (2000 if len(year) == 2 else 0)
+                found.append((m.start(), date(year, month, day)))
+            else:
+                resolved = _infer_year(month, day, semester_start)
+                if resolved:
+                    found.append((m.start(), resolved))
+        except ValueError:
+            pass
+    for pattern, month_group, day_group in ((MONTH_DAY, 1, 2), (DAY_MONTH, 2, 1)):
+        for m in pattern.finditer(text):
+            month = MONTHS[m.group(month_group).lower()[:3]]
+            day = int(m.group(day_group))
+            if m.group(3):
+                try:
+                    found.append((m.start(), date(int(m.group(3)), month, day)))
+                except ValueError:
+                    pass
+            else:
+                resolved = _infer_year(month, day, semester_start)
+                if resolved:
+                    found.append((m.start(), resolved))
+    for m in WEEKDAY_WEEK.finditer(text):
+        resolved = _resolve_week(int(m.group(2)), m.group(1), semester_start)
+        if resolved:
+            found.append((m.start(), resolved))
+    for m in WEEK.finditer(text):
+        if any(pos <= m.start() < pos + 20 for pos, _ in found):
+            continue
+        resolved = _resolve_week(int(m.group(1)), m.group(2), semester_start)
+        if resolved:
+            found.append((m.start(), resolved))
+    found.sort(key=lambda item: item[0])
+    return found
+
+
+class PreExtraction:
+    """Result of the local pass."""
+
+    def __init__(self, course: Dict, unresolved: List[str]):
+        self.course = course
+        # Raw text of item blocks the rules could not fully resolve
+        self.unresolved = unresolved
+
+    @property
+    def complete(self) -> bool:
+        """True when the LLM has nothing left to add."""
+        return bool(self.course.get("course_name")) and bool(self.course["assignments"]) and not self.unresolved
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.course["assignments"]) and not self.complete
+
+
+def _is_heading(line: str) -> bool:
+    stripped = line.strip()
+    return stripped.endswith(":") and not any(ch.isdigit() for ch in stripped)
+
+
+def _split_blocks(lines: List[str]) -> List[List[str]]:
+    """Group lines into item blocks: an item line plus its indented/field lines.
+
+    An item line has a date, a weight or a list prefix; it need not have a
+    type keyword (see ``preextract_syllabus``).
+    """
+    blocks: List[List[str]] = []
+    current: Optional[List[str]] = None
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            continue
+        is_field = bool(FIELD_LINE.match(stripped))
+        typed = detect_type(stripped) is not None
+        starts_item = (
+            not is_field
+            and not _is_heading(stripped)
+            and (WEIGHT.search(stripped) or any(
+                p.search(stripped) for p in (ISO_DATE, MONTH_DAY, DAY_MONTH, WEEK, NUMERIC_DATE))
+                 or (typed and ITEM_PREFIX.match(line)))
+            # An indented line without a type keyword continues the current item
+            and (typed or current is None or not line[:1].isspace())
+        )
+        if starts_item:
+            current = [line]
+            blocks.append(current)
+        elif current is not None and (is_field or line[:1].isspace()):
+            current.append(line)
+        else:
+            current = None
+    return blocks
+
+
+def _parse_block(block: List[str], semester_start: date) -> Tuple[Optional[Dict], bool]:
+    """Turn one item block into an assignment; returns ``(assignment, resolved)``."""
+    head = ITEM_PREFIX.sub("", block[0]).strip()
+    # The name is whatever precedes the first date, "due"/"weight" marker or percentage
+    head_dates = find_dates(head, semester_start)
+    name = head[:head_dates[0][0]] if head_dates else head
+    name = NAME_CUT.sub("", name).strip(" -–—|,:(") or head
+    kind = detect_type(name) or detect_type(head)
+
+    due = None
+    weight = None
+    description = ""
+    for line in block:
+        field = FIELD_LINE.match(line.strip())
+        label = field.group(1).lower() if field else ""
+        if label in ("description", "details"):
+            description = field.group(2).strip()
+        dates = find_dates(line, semester_start)
+        # A date on a "due" line wins over any other date in the block
+        if dates and (due is None or label.startswith("due") or label == "deadline"):
+            due = dates[-1][1] if label.startswith("due") else dates[0][1]
+        w = WEIGHT.search(line)
+        if w and weight is None:
+            weight = float(w.group(1))
+
+    if due is None:
+        # "Homework: 20%" with no date or details is a grading category, not an assignment
+        if weight is not None and len(block) == 1 and not re.search(r"\d", WEIGHT.sub("", name)):
+            return None, True
+        return None, False
+
+    assignment = {
+        "name": name,
+        "type": kind or "homework",
+        "due_date": due.strftime("%Y-%m-%d"),
+        "weight": int(weight) if weight is not None and weight.is_integer() else (weight or 0),
+        "estimated_hours": ESTIMATED_HOURS.get(kind or "homework", 5),
+        "description": description,
+    }
+    return assignment, True
+
+
+def _parse_header(lines: List[str]) -> Dict:
+    course = {"course_name": "", "course_code": "", "instructor": ""}
+    for line in lines[:40]:
+        stripped = line.strip()
+        m = CODE_FIELD.match(stripped)
+        if m and not course["course_code"]:
+            course["course_code"] = m.group(1).strip()
+            continue
+        m = COURSE_FIELD.match(stripped)
+        if m and not course["course_name"]:
+            value = m.group(1).strip()
+            code = COURSE_CODE.search(value)
+            if code and not course["course_code"]:
+                course["course_code"] = f"{code.group(1)}{code.group(2)}"
+            # "Intro to AI (CS101)" -> "Intro to AI"
+            course["course_name"] = COURSE_IN_PARENS.sub("", value).strip()
+            continue
+        m = INSTRUCTOR_FIELD.match(stripped)
+        if m and not course["instructor"]:
+            course["instructor"] = m.group(1).strip()
+    if not course["course_code"]:
+        for line in lines[:10]:
+            code = COURSE_CODE.search(line)
+            if code:
+                course["course_code"] = f"{code.group(1)}{code.group(2)}"
+                break
+    if not course["course_name"]:
+        # Scraped pages rarely have a "Course:" line; a heading carrying the course code will do
+        for line in lines[:20]:
+            heading = re.match(r"^#{1,2}\s+(.+)$", line.strip())
+            if heading and COURSE_CODE.search(heading.group(1)):
+                course["course_name"] = COURSE_IN_PARENS.sub("", heading.group(1)).strip()
+                break
+    return course
+
+
+def preextract_syllabus(text: str, semester_start: str) -> PreExtraction:
+    """Extract course fields and assignments from ``text`` without the LLM."""
+    try:
+        start = datetime.strptime(semester_start, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        start = date.today()
+
+    lines = text.splitlines()
+    course = _parse_header(lines)
+    course["assignments"] = []
+    unresolved: List[str] = []
+    seen = set()
+    for block in _split_blocks(lines):
+        assignment, resolved = _parse_block(block, start)
+        if detect_type(block[0]) is None and (assignment or not resolved):
+            # Dated or weighted but no type keyword: likely graded, so let the LLM decide
+            unresolved.append("\n".join(block))
+        elif not resolved:
+            unresolved.append("\n".join(block))
+        elif assignment:
+            key = (assignment["name"].lower(), assignment["due_date"])
+            if key not in seen:
+                seen.add(key)
+                course["assignments"].append(assignment)
+    return PreExtraction(course, unresolved)
+
+
+def merge_parsed(partial: Dict, llm_result: Dict) -> Dict:
+    """Fill gaps in the local result with the LLM's answer for the unresolved sections."""
+    merged = dict(partial)
+    for field in ("course_name", "course_code", "instructor"):
+        if not merged.get(field) and llm_result.get(field):
+            merged[field] = llm_result[field]
+    known = {(a["name"].lower(), a["due_date"]) for a in partial.get("assignments", [])}
+    merged["assignments"] = list(partial.get("assignments", []))
+    for a in llm_result.get("assignments", []) or []:
+        if isinstance(a, dict) and (str(a.get("name", "")).lower(), a.get("due_date")) not in known:
+            merged["assignments"].append(a)
+    return merged
@@ -0,0 +1,99 @@
+"""On-demand sampling profiler for live requests.
+
+Samples the stacks of every Python thread at a fixed interval for a bounded
+window and aggregates them as collapsed stacks (``frame;frame;frame count``),
+the input format of flamegraph.pl and speedscope. Sampling only reads
+``sys._current_frames()`` so request handling is never paused.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+MAX_PROFILE_SECONDS = 300
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class SamplingProfiler:
+    """Background thread that samples all thread stacks for a time window."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.duration = 0.0
+        self.interval = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, interval: float = 0.005) -> bool:
+        """Start a capture window; returns False if one is already running."""
+        with self._lock:
+            if self.running:
+                return False
+            self.stacks = Counter()
+            self.samples = 0
+            self.duration = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+            self.interval = max(interval, 0.001)
+            self.started_at = time.time()
+            self.finished_at = None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="coursesync-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + self.duration
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            with self._lock:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    labels = []
+                    while frame is not None:
+                        labels.append(_frame_label(frame))
+                        frame = frame.f_back
+                    self.stacks[";".join(reversed(labels))] += 1
+                self.samples += 1
+            self._stop.wait(self.interval)
+        self.finished_at = time.time()
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "running": self.running,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "duration_seconds": self.duration,
+                "interval_seconds": self.interval,
+                "samples": self.samples,
+                "unique_stacks": len(self.stacks),
+            }
+
+    def collapsed(self) -> str:
+        """Return the captured profile in collapsed-stack format."""
+        with self._lock:
+            return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+
+profiler = SamplingProfiler()
@@ -26,6 +26,28 @@ Rules:
 - Convert relative dates using the semester start date provided
 - Weight should be percentage (0-100)"""
 
+SYLLABUS_PATCH_PROMPT = """You update a previously parsed course syllabus after the syllabus text changed.
+
+You are given the earlier parse as JSON and a unified diff of the syllabus text ("-" lines removed, "+" lines added).
+Apply only the changes the diff implies (new, removed or modified assignments, dates, weights, course details) and keep everything else as is.
+
+Return ONLY the complete updated JSON object, in the same structure as the earlier parse:
+{
+  "course_name": "string",
+  "course_code": "string",
+  "instructor": "string",
+  "assignments": [
+    {
+      "name": "string",
+      "type": "quiz|exam|project|homework|presentation",
+      "due_date": "YYYY-MM-DD",
+      "weight": number,
+      "estimated_hours": number,
+      "description": "string"
+    }
+  ]
+}"""
+
 WORKLOAD_ANALYZER_PROMPT = """You are an intelligent workload analyzer. Analyze assignment distribution and identify risk periods.
 
 Return ONLY a valid JSON object:
@@ -134,3 +156,30 @@ Rules:
 - If they ask about their workload or schedule, refer to the data you have.
 - If you don't know something, be honest.
 """
+
+CHAT_ACTION_PROMPT = """You turn a student's request into an action for CourseSync.
+
+Return ONLY a valid JSON object:
+{
+  "action": "add_course" | "delete_course" | "edit_course" | "add_assignment" | "delete_assignment" | "update_assignment" | "update_settings" | "chat",
+  "content": "short message to show the student",
+  "data": {
+    "syllabus_text": "syllabus text or URL (add_course)",
+    "course_name": "course the request refers to",
+    "assignment_name": "assignment to delete/update",
+    "assignment": {"name": "string", "due_date": "YYYY-MM-DD", "type": "quiz|exam|project|homework|presentation", "estimated_hours": number, "weight": number},
+    "update_data": {"course_name": "new name", "course_code": "new code", "name": "new name", "due_date": "YYYY-MM-DD", "type": "string", "estimated_hours": number, "weight": number, "progress": number},
+    "settings": {"hours_per_day": number, "notification_lead_days": number, "risk_threshold": number}
+  }
+}
+
+Rules:
+- Only include the data fields the action needs.
+- Use the course and assignment names as the student wrote them; they are matched fuzzily.
+- "I finished X" means update_assignment with progress 100.
+- Resolve relative dates ("Friday", "next week") against today's date.
+- "Set my hours per day to 6" means update_settings with only the settings that change.
+- If the message is not a request to change courses, assignments or settings, use action "chat" and answer briefly in "content"."""
+
+QUICK_ANSWER_PROMPT = """You are CourseSync's academic assistant. Answer the student's question in one to three sentences using only the course data provided. If the data does not contain the answer, say so."""
+
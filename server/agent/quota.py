@@ -0,0 +1,231 @@
+"""Per-tenant LLM token accounting and budgets.
+
+Every Groq call's ``usage`` tokens are appended to ``usage.bin`` in the
+tenant's data directory (one ``O_APPEND`` write per call, like the progress
+event log), keyed by operation. The web server opens ``use_ledger`` around
+each request so ``GroqClient`` charges the right tenant.
+
+Budgets are per tenant, per day and per month (``TOKEN_BUDGET_*``). All of
+them default to 0, which turns a limit off:
+
+- past a soft limit ``soft_limited()`` is True and callers serve cached or
+  locally computed results where they have them, calling the LLM only when
+  there is no alternative
+- at a hard limit ``check_quota`` raises ``QuotaExceeded`` (429 with
+  ``Retry-After`` until the day or month rolls over)
+
+``soft_limited()`` is asked several times per request, so its answer is
+cached for the ``use_ledger`` block until the request records usage.
+"""
+
+import contextvars
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from .metrics import LLM_QUOTA_REJECTED
+from .resilience import ServiceUnavailable
+
+DAILY_SOFT = int(os.getenv("TOKEN_BUDGET_DAILY_SOFT", "0"))
+DAILY_HARD = int(os.getenv("TOKEN_BUDGET_DAILY_HARD", "0"))
+MONTHLY_SOFT = int(os.getenv("TOKEN_BUDGET_MONTHLY_SOFT", "0"))
+MONTHLY_HARD = int(os.getenv("TOKEN_BUDGET_MONTHLY_HARD", "0"))
+
+OPERATIONS = (
+    "parse_syllabus", "patch_syllabus", "analyze_workload", "create_schedule",
+    "generate_notifications", "chat", "chat_action", "chat_answer",
+)
+
+# timestamp (epoch seconds), operation key, tokens
+RECORD = struct.Struct("<dII")
+
+_ledger: contextvars.ContextVar = contextvars.ContextVar("coursesync_ledger", default=None)
+# Per-request answers derived from the ledger (a dict shared by the request's threads)
+_cache: contextvars.ContextVar = contextvars.ContextVar("coursesync_ledger_cache", default=None)
+
+
+def operation_key(operation: str) -> int:
+    return zlib.crc32(operation.encode("utf-8"))
+
+
+_names: Dict[int, str] = {operation_key(op): op for op in OPERATIONS}
+
+
+class QuotaExceeded(ServiceUnavailable):
+    """A hard token budget is used up."""
+
+
+class UsageLedger:
+    """Append-only token usage of one tenant, summed per day and operation."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._offset = 0
+        # (date ordinal, operation key) -> tokens
+        self._by_day: Dict[Tuple[int, int], int] = {}
+
+    def record(self, operation: str, tokens: int):
+        if tokens <= 0:
+            return
+        _names.setdefault(operation_key(operation), operation)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, RECORD.pack(time.time(), operation_key(operation), tokens))
+        finally:
+            os.close(fd)
+
+    def _load(self):
+        """Fold records appended since the last read (by any worker) into the sums."""
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        data = data[: len(data) - len(data) % RECORD.size]
+        self._offset += len(data)
+        for ts, key, tokens in RECORD.iter_unpack(data):
+            day = (date.fromtimestamp(ts).toordinal(), key)
+            self._by_day[day] = self._by_day.get(day, 0) + tokens
+
+    def totals(self, today: Optional[date] = None) -> Dict:
+        """Tokens used today and this month, overall and per operation."""
+        today = today or date.today()
+        day, month_start = today.toordinal(), today.replace(day=1).toordinal()
+        totals = {"day": 0, "month": 0, "by_operation": {}}
+        with self._lock:
+            self._load()
+            items = list(self._by_day.items())
+        for (ordinal, key), tokens in items:
+            if not month_start <= ordinal <= day:
+                continue
+            name = _names.get(key, "other")
+            per_op = totals["by_operation"].setdefault(name, {"day": 0, "month": 0})
+            per_op["month"] += tokens
+            totals["month"] += tokens
+            if ordinal == day:
+                per_op["day"] += tokens
+                totals["day"] += tokens
+        return totals
+
+
+MAX_LEDGERS = max(1, int(os.getenv("MAX_TENANTS_IN_MEMORY", "1000")))
+_ledgers: "OrderedDict[str, UsageLedger]" = OrderedDict()
+_ledgers_lock = threading.Lock()
+
+
+def ledger_for(key: str, data_dir: Callable[[], str]) -> UsageLedger:
+    """Tenant ``key``'s ledger; ``data_dir()`` is only resolved when the ledger is created.
+
+    Ledgers are kept for at most ``MAX_TENANTS_IN_MEMORY`` tenants, least
+    recently used first out; an evicted one re-reads ``usage.bin`` when needed.
+    """
+    with _ledgers_lock:
+        ledger = _ledgers.get(key)
+        if ledger is not None:
+            _ledgers.move_to_end(key)
+            return ledger
+    path = os.path.join(data_dir(), "usage.bin")
+    with _ledgers_lock:
+        ledger = _ledgers.get(key)
+        if ledger is None:
+            ledger = _ledgers[key] = UsageLedger(path)
+            while len(_ledgers) > MAX_LEDGERS:
+                _ledgers.popitem(last=False)
+        return ledger
+
+
+@contextmanager
+def use_ledger(ledger: Optional[UsageLedger]):
+    """Charge LLM calls inside the block to ``ledger``."""
+    token, cache_token = _ledger.set(ledger), _cache.set({})
+    try:
+        yield
+    finally:
+        _cache.reset(cache_token)
+        _ledger.reset(token)
+
+
+def current_ledger() -> Optional[UsageLedger]:
+    return _ledger.get()
+
+
+def record_usage(operation: str, tokens: int, ledger: Optional[UsageLedger] = None):
+    ledger = ledger or _ledger.get()
+    if ledger is not None:
+        ledger.record(operation, tokens)
+        cache = _cache.get()
+        if cache is not None and ledger is _ledger.get():
+            cache.clear()
+
+
+def _tomorrow(today: date) -> datetime:
+    return datetime.combine(today + timedelta(days=1), datetime.min.time())
+
+
+def _next_month(today: date) -> datetime:
+    return datetime.combine((today.replace(day=28) + timedelta(days=4)).replace(day=1), datetime.min.time())
+
+
+def budget(ledger: UsageLedger, today: Optional[date] = None) -> Dict:
+    """Usage, limits and what is left, for the ``/api/quota`` endpoint."""
+    today = today or date.today()
+    totals = ledger.totals(today)
+
+    def window(used, soft, hard, resets):
+        return {
+            "used": used,
+            "soft_limit": soft or None,
+            "hard_limit": hard or None,
+            "remaining": max(0, hard - used) if hard else None,
+            "resets_at": resets.isoformat(),
+        }
+
+    day = window(totals["day"], DAILY_SOFT, DAILY_HARD, _tomorrow(today))
+    month = window(totals["month"], MONTHLY_SOFT, MONTHLY_HARD, _next_month(today))
+    if (DAILY_HARD and totals["day"] >= DAILY_HARD) or (MONTHLY_HARD and totals["month"] >= MONTHLY_HARD):
+        status = "hard_limit"
+    elif (DAILY_SOFT and totals["day"] >= DAILY_SOFT) or (MONTHLY_SOFT and totals["month"] >= MONTHLY_SOFT):
+        status = "soft_limit"
+    else:
+        status = "ok"
+    return {"status": status, "day": day, "month": month, "by_operation": totals["by_operation"]}
+
+
+def soft_limited() -> bool:
+    """True when the current tenant is past a soft (or hard) limit."""
+    if not (DAILY_SOFT or DAILY_HARD or MONTHLY_SOFT or MONTHLY_HARD):
+        return False
+    ledger = _ledger.get()
+    if ledger is None:
+        return False
+    cache = _cache.get()
+    if cache is None:
+        return budget(ledger)["status"] != "ok"
+    if "soft_limited" not in cache:
+        cache["soft_limited"] = budget(ledger)["status"] != "ok"
+    return cache["soft_limited"]
+
+
+def check_quota(operation: str):
+    """Raise ``QuotaExceeded`` if the current tenant has used up a hard limit."""
+    ledger = _ledger.get()
+    if ledger is None or not (DAILY_HARD or MONTHLY_HARD):
+        return
+    today = date.today()
+    totals = ledger.totals(today)
+    if MONTHLY_HARD and totals["month"] >= MONTHLY_HARD:
+        window, resets = "monthly", _next_month(today)
+    elif DAILY_HARD and totals["day"] >= DAILY_HARD:
+        window, resets = "daily", _tomorrow(today)
+    else:
+        return
+    LLM_QUOTA_REJECTED.inc(operation=operation, window=window)
+    raise QuotaExceeded(f"The {window} LLM token budget is used up", max(1.0, (resets - datetime.now()).total_seconds()))
@@ -0,0 +1,136 @@
+"""Circuit breaker and per-request deadlines for outbound LLM calls.
+
+The web server opens a ``deadline(seconds)`` around each request; code
+below it asks ``remaining()`` how long it may still wait, so retries and
+backoff sleeps never outlive the client. The ``CircuitBreaker`` opens after
+``failure_threshold`` consecutive failures and rejects calls immediately
+for ``reset_timeout`` seconds, then lets a single probe through (half-open)
+and closes again if it succeeds.
+
+Both raise ``ServiceUnavailable`` carrying a ``retry_after`` hint, which
+the API turns into ``503`` with a ``Retry-After`` header.
+"""
+
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from .metrics import LLM_CIRCUIT_STATE, LLM_REJECTED
+
+_deadline: contextvars.ContextVar = contextvars.ContextVar("coursesync_deadline", default=None)
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class ServiceUnavailable(RuntimeError):
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class CircuitOpenError(ServiceUnavailable):
+    pass
+
+
+class DeadlineExceeded(ServiceUnavailable):
+    pass
+
+
+@contextmanager
+def deadline(seconds: float):
+    """Limit everything inside to ``seconds`` (never extends an outer deadline)."""
+    until = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(until if outer is None else min(outer, until))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current deadline, or None outside one."""
+    until = _deadline.get()
+    return None if until is None else until - time.monotonic()
+
+
+def check_deadline(operation: str, needed: float = 0.0, retry_after: float = 1.0):
+    """Raise ``DeadlineExceeded`` unless more than ``needed`` seconds are left."""
+    left = remaining()
+    if left is not None and left <= needed:
+        LLM_REJECTED.inc(operation=operation, reason="deadline")
+        raise DeadlineExceeded(f"Request deadline exceeded during {operation}", retry_after)
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def _set_state(self, state: str):
+        self._state = state
+        LLM_CIRCUIT_STATE.set(_STATE_VALUES[state])
+
+    def _reject(self, operation: str, wait: float):
+        LLM_REJECTED.inc(operation=operation, reason="circuit_open")
+        raise CircuitOpenError(f"{self.name} circuit open after repeated failures", max(wait, 1.0))
+
+    def allow(self, operation: str) -> bool:
+        """Raise ``CircuitOpenError`` if calls are currently being rejected.
+
+        Returns True when this call is the half-open probe; it must then end
+        in ``record_success``, ``record_failure`` or ``release``.
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return False
+            wait = self._opened_at + self.reset_timeout - time.monotonic()
+            if self._state == OPEN and wait <= 0:
+                self._set_state(HALF_OPEN)
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+        self._reject(operation, wait)
+
+    def check(self, operation: str):
+        """Raise ``CircuitOpenError`` if the circuit is open, e.g. before a retry."""
+        if self._state == OPEN:
+            self._reject(operation, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if self._state != CLOSED:
+                self._set_state(CLOSED)
+
+    def release(self):
+        """End a call that neither proved nor disproved the service (e.g. rate limited)."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(OPEN)
@@ -0,0 +1,286 @@
+"""Local scraping backend and scrape cache.
+
+``fetch_page`` downloads a URL directly and converts it to markdown with the
+standard library, so URL ingestion keeps working without Firecrawl.
+``ScrapeCache`` keeps recent results per URL for ``SCRAPE_CACHE_TTL``
+seconds; after that an entry is revalidated with a conditional GET
+(``If-None-Match`` / ``If-Modified-Since``) and only re-scraped if the page
+actually changed.
+
+URLs come from users, so ``check_url`` resolves the host and refuses
+anything that is not a public address (loopback, private networks,
+link-local including the 169.254.169.254 metadata service, ...).
+``fetch_page`` follows redirects itself and checks every hop.
+``SCRAPE_ALLOW_PRIVATE=1`` lifts this for local development.
+"""
+
+import hashlib
+import io
+import ipaddress
+import os
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict
+from html.parser import HTMLParser
+from typing import Dict, Optional
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+SCRAPE_CACHE_TTL = float(os.getenv("SCRAPE_CACHE_TTL", "3600"))
+SCRAPE_CACHE_SIZE = int(os.getenv("SCRAPE_CACHE_SIZE", "256"))
+FETCH_TIMEOUT = float(os.getenv("SCRAPE_FETCH_TIMEOUT", "15"))
+MAX_PAGE_BYTES = 5 * 1024 * 1024
+MAX_REDIRECTS = 5
+SCRAPE_ALLOW_PRIVATE = os.getenv("SCRAPE_ALLOW_PRIVATE", "").lower() in ("1", "true", "yes")
+USER_AGENT = "CourseSync-AI/1.0 (+https://github.com/AsmSafone/CourseSync-AI)"
+
+
+class _MarkdownConverter(HTMLParser):
+    """Good-enough HTML to markdown: headings, lists, links, tables and paragraphs."""
+
+    SKIP = {"script", "style", "noscript", "svg", "template", "iframe"}
+    BLOCK = {"p", "div", "section", "article", "main", "header", "footer", "aside", "br", "hr",
+             "ul", "ol", "table", "thead", "tbody", "blockquote", "pre", "dl", "dt", "dd", "form"}
+
+    def __init__(self, base_url: str = ""):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.out = []
+        self._skip = 0
+        self._href = None
+        self._link_text = []
+        self._row = None
+        self._cell = None
+        self.title = ""
+        self._in_title = False
+
+    def _emit(self, text: str):
+        if self._cell is not None:
+            self._cell.append(text)
+        elif self._href is not None:
+            self._link_text.append(text)
+        else:
+            self.out.append(text)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip += 1
+            return
+        if self._skip:
+            return
+        attrs = dict(attrs)
+        if tag == "title":
+            self._in_title = True
+        elif re.fullmatch(r"h[1-6]", tag):
+            self._emit("\n\n" + "#" * int(tag[1]) + " ")
+        elif tag == "li":
+            self._emit("\n- ")
+        elif tag == "a" and attrs.get("href") and self._cell is None:
+            self._href = urljoin(self.base_url, attrs["href"])
+            self._link_text = []
+        elif tag == "tr":
+            self._row = []
+        elif tag in ("td", "th") and self._row is not None:
+            self._cell = []
+        elif tag in ("strong", "b"):
+            self._emit("**")
+        elif tag in self.BLOCK:
+            self._emit("\n\n" if tag != "br" else "\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skip = max(0, self._skip - 1)
+            return
+        if self._skip:
+            return
+        if tag == "title":
+            self._in_title = False
+        elif re.fullmatch(r"h[1-6]", tag) or tag in ("p", "div", "ul", "ol", "table"):
+            self._emit("\n")
+        elif tag == "a" and self._href is not None:
+            text = " ".join("".join(self._link_text).split())
+            href = self._href
+            self._href = None
+            self._emit(f"[{text}]({href})" if text else "")
+        elif tag in ("td", "th") and self._cell is not None and self._row is not None:
+            self._row.append(" ".join("".join(self._cell).split()))
+            self._cell = None
+        elif tag == "tr" and self._row is not None:
+            if any(self._row):
+                self.out.append("\n| " + " | ".join(self._row) + " |")
+            self._row = None
+        elif tag in ("strong", "b"):
+            self._emit("**")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+            return
+        if self._skip:
+            return
+        self._emit(re.sub(r"\s+", " ", data))
+
+    def markdown(self) -> str:
+        text = "".join(self.out)
+        lines = [line.strip() for line in text.splitlines()]
+        text = "\n".join(lines)
+        text = re.sub(r"\n{3,}", "\n\n", text).strip()
+        title = " ".join(self.title.split())
+        if title and not text.startswith("# "):
+            text = f"# {title}\n\n{text}"
+        return text
+
+
+def html_to_markdown(html: str, base_url: str = "") -> str:
+    parser = _MarkdownConverter(base_url)
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        pass
+    return parser.markdown()
+
+
+def _body_to_markdown(body: bytes, content_type: str, encoding: Optional[str], url: str) -> str:
+    content_type = content_type.lower()
+    if "pdf" in content_type or url.lower().endswith(".pdf"):
+        from pdfminer.high_level import extract_text
+
+        return extract_text(io.BytesIO(body))
+    text = body.decode(encoding or "utf-8", errors="ignore")
+    if "html" in content_type or re.search(r"<(html|body|div|p)\b", text[:2000], re.I):
+        return html_to_markdown(text, url)
+    return text
+
+
+class BlockedURL(requests.exceptions.InvalidURL):
+    """The URL is not http(s) or its host resolves to a non-public address."""
+
+
+def check_url(url: str):
+    """Raise ``BlockedURL`` unless every address ``url``'s host resolves to is public."""
+    parsed = urlparse(url)
+    try:
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    except ValueError:
+        raise BlockedURL(f"Invalid port in {url}")
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise BlockedURL(f"Only http(s) URLs can be scraped: {url}")
+    if SCRAPE_ALLOW_PRIVATE:
+        return
+    try:
+        infos = socket.getaddrinfo(parsed.hostname, port, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError) as e:
+        raise requests.exceptions.ConnectionError(f"Cannot resolve {parsed.hostname}: {e}")
+    for *_, sockaddr in infos:
+        ip = ipaddress.ip_address(sockaddr[0].split("%")[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise BlockedURL(f"{parsed.hostname} resolves to a non-public address ({ip})")
+
+
+class FetchResult:
+    def __init__(self, status: int, markdown: str = "", etag: str = "", last_modified: str = "", body_hash: str = ""):
+        self.status = status
+        self.markdown = markdown
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body_hash = body_hash
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+
+def fetch_page(url: str, etag: str = "", last_modified: str = "", timeout: float = FETCH_TIMEOUT) -> FetchResult:
+    """GET ``url`` (conditionally, if validators are given) and convert it to markdown.
+
+    Raises ``requests.RequestException`` on network errors and bad statuses,
+    ``BlockedURL`` if ``url`` or a redirect points at a non-public host.
+    """
+    headers = {"User-Agent": USER_AGENT, "Accept": "text/html,text/plain,application/pdf;q=0.9,*/*;q=0.5"}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    for _ in range(MAX_REDIRECTS + 1):
+        check_url(url)
+        response = requests.get(url, headers=headers, timeout=timeout, stream=True, allow_redirects=False)
+        if not (response.is_redirect and response.headers.get("Location")):
+            break
+        response.close()
+        url = urljoin(url, response.headers["Location"])
+    else:
+        raise requests.exceptions.TooManyRedirects(f"More than {MAX_REDIRECTS} redirects")
+    with response:
+        if response.status_code == 304:
+            return FetchResult(304, etag=response.headers.get("ETag", etag),
+                               last_modified=response.headers.get("Last-Modified", last_modified))
+        response.raise_for_status()
+        chunks, size = [], 0
+        for chunk in response.iter_content(64 * 1024):
+            size += len(chunk)
+            if size > MAX_PAGE_BYTES:
+                break
+            chunks.append(chunk)
+        body = b"".join(chunks)
+        return FetchResult(
+            response.status_code,
+            markdown=_body_to_markdown(body, response.headers.get("Content-Type", ""), response.encoding, url),
+            etag=response.headers.get("ETag", ""),
+            last_modified=response.headers.get("Last-Modified", ""),
+            body_hash=hashlib.sha256(body).hexdigest(),
+        )
+
+
+class ScrapeCache:
+    """Thread-safe LRU of scraped pages keyed by URL."""
+
+    def __init__(self, ttl: float = SCRAPE_CACHE_TTL, max_entries: int = SCRAPE_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def fresh(self, entry: Dict) -> bool:
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    def put(self, url: str, markdown: str, backend: str, etag: str = "", last_modified: str = "", body_hash: str = ""):
+        with self._lock:
+            self._entries[url] = {
+                "markdown": markdown,
+                "backend": backend,
+                "etag": etag,
+                "last_modified": last_modified,
+                "body_hash": body_hash,
+                "fetched_at": time.time(),
+            }
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def touch(self, url: str, **validators):
+        """Mark an entry as fresh again after a successful revalidation."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                entry.update({k: v for k, v in validators.items() if v})
+                entry["fetched_at"] = time.time()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+scrape_cache = ScrapeCache()
@@ -0,0 +1,249 @@
+"""Near-duplicate syllabus index.
+
+Students in one section upload slightly different copies of the same
+syllabus (another PDF export, a footer, a fixed typo), so an exact hash
+misses them. Each ingested text is reduced to a MinHash signature over
+word shingles; locality-sensitive hashing (bands of the signature) finds
+candidates in constant time, and the estimated Jaccard similarity decides
+whether an earlier parse can be reused.
+
+The index is shared by every student, so a diff only counts as cosmetic
+when it leaves the course details (code, title, section, instructor)
+alone too; otherwise another student's details could be handed back.
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from .preextract import WEIGHT, detect_type, find_dates
+
+SHINGLE_WORDS = 5
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+MIN_WORDS = 30
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _permutations(seed: int = 1) -> List[Tuple[int, int]]:
+    # Deterministic so signatures stay comparable across restarts and workers
+    params = []
+    for i in range(NUM_PERM):
+        digest = hashlib.blake2b(f"{seed}:{i}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "big") % _PRIME or 1
+        b = int.from_bytes(digest[8:], "big") % _PRIME
+        params.append((a, b))
+    return params
+
+
+_PERMS = _permutations()
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(re.sub(r"[^\w%/-]+", " ", text.lower()).split())
+
+
+def shingles(normalized: str) -> set:
+    words = normalized.split()
+    if len(words) < SHINGLE_WORDS:
+        return {zlib.crc32(normalized.encode())} if words else set()
+    return {zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode()) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash(shingle_set: set) -> Tuple[int, ...]:
+    if not shingle_set:
+        return tuple([_MAX_HASH] * NUM_PERM)
+    return tuple(min(((a * s + b) % _PRIME) & _MAX_HASH for s in shingle_set) for a, b in _PERMS)
+
+
+def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of the two shingle sets."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _bands(signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+    return [(i, signature[i * ROWS:(i + 1) * ROWS]) for i in range(BANDS)]
+
+
+# Header lines: course codes and the labels of the course details
+_COURSE_DETAIL = re.compile(
+    r"(?-i:\b[A-Z]{2,5}[\s-]?\d{3}[A-Z]?\b)|\b(course|title|section|sec|instructor|professor|prof|lecturer|teacher|"
+    r"faculty|taught by|dr)\b",
+    re.I,
+)
+COURSE_FIELDS = ("course_name", "course_code", "section", "instructor")
+
+
+def _relevant(line: str, details: Tuple[str, ...] = ()) -> bool:
+    """Whether a changed line could change the parsed assignments or course details."""
+    if _COURSE_DETAIL.search(line):
+        return True
+    lowered = line.lower()
+    if any(value in lowered for value in details):
+        return True
+    # Only the presence of a date matters here, so any reference date will do
+    return bool(WEIGHT.search(line) or detect_type(line) or find_dates(line, date.today()))
+
+
+def diff_lines(old_text: str, new_text: str) -> List[str]:
+    """Unified diff between two syllabus texts, ignoring whitespace-only changes."""
+    old = [" ".join(line.split()) for line in old_text.splitlines() if line.strip()]
+    new = [" ".join(line.split()) for line in new_text.splitlines() if line.strip()]
+    return [line for line in difflib.unified_diff(old, new, lineterm="", n=1) if not line.startswith(("---", "+++"))]
+
+
+def is_cosmetic(diff: List[str], parsed: Optional[Dict] = None) -> bool:
+    """True when no added or removed line mentions dates, weights, assignment types or course details.
+
+    With the earlier ``parsed`` result, a line containing one of its course
+    details (an instructor's name, say) counts as a course detail too.
+    """
+    details = tuple(
+        str(parsed[field]).lower() for field in COURSE_FIELDS
+        if parsed and isinstance(parsed.get(field), str) and len(parsed[field].strip()) > 1
+    )
+    return not any(_relevant(line[1:], details) for line in diff if line.startswith(("+", "-")))
+
+
+class SyllabusIndex:
+    """Bounded LRU index of parsed syllabi, persisted to ``path`` as JSON lines.
+
+    Entries are keyed by a hash of the semester start plus the normalized
+    text, and carry the original text (for diffs), the semester start the
+    dates were resolved against, the MinHash signature and the parsed result.
+
+    ``add`` appends one line (one ``O_APPEND`` write, like the event log);
+    later lines win on load. The file is rewritten with just the live
+    entries once it holds twice ``max_entries`` lines, so the cost of a
+    rewrite is spread over as many adds as it keeps.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 500, threshold: float = 0.8):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.threshold = threshold
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], set] = {}
+        self._lock = threading.Lock()
+        # Lines in the file, live or superseded
+        self._lines = 0
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A torn last line from a crash
+                        continue
+                    entry["signature"] = tuple(entry["signature"])
+                    self._entries.pop(entry["key"], None)
+                    self._insert(entry["key"], entry)
+                    self._lines += 1
+        except Exception as e:
+            print(f"Error loading syllabus index: {e}")
+
+    @staticmethod
+    def _line(entry: Dict) -> bytes:
+        return (json.dumps({**entry, "signature": list(entry["signature"])}) + "\n").encode("utf-8")
+
+    def _append(self, entry: Dict):
+        if not self.path:
+            return
+        try:
+            if self._lines >= 2 * self.max_entries:
+                self._rewrite()
+                return
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, self._line(entry))
+            finally:
+                os.close(fd)
+            self._lines += 1
+        except Exception as e:
+            print(f"Error saving syllabus index: {e}")
+
+    def _rewrite(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            for entry in self._entries.values():
+                f.write(self._line(entry))
+        os.replace(tmp_path, self.path)
+        self._lines = len(self._entries)
+
+    def _insert(self, key: str, entry: Dict):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        for band in _bands(entry["signature"]):
+            self._buckets.setdefault(band, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            old_key, old = self._entries.popitem(last=False)
+            for band in _bands(old["signature"]):
+                bucket = self._buckets.get(band)
+                if bucket:
+                    bucket.discard(old_key)
+                    if not bucket:
+                        del self._buckets[band]
+
+    @staticmethod
+    def fingerprint(text: str, semester_start: str) -> Tuple[str, Tuple[int, ...], int]:
+        normalized = normalize(text)
+        # Relative dates resolve differently per semester, so the start is part of the key
+        key = hashlib.sha256(f"{semester_start}\n{normalized}".encode()).hexdigest()
+        return key, minhash(shingles(normalized)), len(normalized.split())
+
+    def lookup(self, text: str, semester_start: str) -> Optional[Tuple[Dict, float]]:
+        """Best earlier entry for the same semester start, with its similarity."""
+        key, signature, words = self.fingerprint(text, semester_start)
+        if words < MIN_WORDS:
+            return None
+        with self._lock:
+            exact = self._entries.get(key)
+            if exact is not None:
+                self._entries.move_to_end(key)
+                return exact, 1.0
+            candidates = set()
+            for band in _bands(signature):
+                candidates |= self._buckets.get(band, set())
+            best, best_score = None, 0.0
+            for candidate in candidates:
+                entry = self._entries[candidate]
+                if entry["semester_start"] != semester_start:
+                    continue
+                score = similarity(signature, entry["signature"])
+                if score > best_score:
+                    best, best_score = entry, score
+            if best is None or best_score < self.threshold:
+                return None
+            self._entries.move_to_end(best["key"])
+            return best, best_score
+
+    def add(self, text: str, semester_start: str, parsed: Dict):
+        key, signature, words = self.fingerprint(text, semester_start)
+        if words < MIN_WORDS or not parsed:
+            return
+        with self._lock:
+            entry = {
+                "key": key,
+                "semester_start": semester_start,
+                "signature": signature,
+                "text": text,
+                "parsed": parsed,
+            }
+            self._insert(key, entry)
+            self._append(entry)
@@ -0,0 +1,69 @@
+"""Lightweight per-request span timing.
+
+The web server starts a trace per request; code anywhere below it wraps a
+stage in ``with span("llm"):`` and the accumulated timings are returned to
+the client in a ``Server-Timing`` header. Outside a request ``span`` is a
+no-op, so the agent can be used on its own.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("coursesync_trace", default=None)
+
+
+class Trace:
+    """Collects ``(name, seconds)`` spans for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float]] = []
+
+    def add(self, name: str, seconds: float):
+        self.spans.append((name, seconds))
+
+    def totals(self) -> Dict[str, Tuple[float, int]]:
+        """Total seconds and span count per stage name, in first-seen order."""
+        totals: Dict[str, Tuple[float, int]] = {}
+        for name, seconds in list(self.spans):
+            total, count = totals.get(name, (0.0, 0))
+            totals[name] = (total + seconds, count + 1)
+        return totals
+
+    def server_timing(self) -> str:
+        """Format the spans as a ``Server-Timing`` header value (milliseconds)."""
+        parts = []
+        for name, (total, count) in self.totals().items():
+            desc = f';desc="{count}x"' if count > 1 else ""
+            parts.append(f"{name};dur={total * 1000:.1f}{desc}")
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def start_trace() -> Tuple[Trace, contextvars.Token]:
+    trace = Trace()
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token: contextvars.Token):
+    _current_trace.reset(token)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block and record it on the current request's trace."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - started)
@@ -1,24 +1,55 @@
 import json
 import re
+import sys
+from contextlib import nullcontext
 from typing import Dict, List
-from rich.console import Console
 from datetime import datetime
 import uuid
 import os
-import smtplib
-import ssl
-from email.message import EmailMessage
 import hashlib
 
+from .metrics import LLM_PARSE_FAILURES
+
+_console = None
+
+
+def _rich_console():
+    global _console
+    if _console is None:
+        from rich.console import Console
+
+        _console = Console()
+    return _console
+
+
+class _LazyConsole:
+    """Creates the Rich console on first use, keeping Rich out of server startup."""
+
+    def __getattr__(self, name):
+        return getattr(_rich_console(), name)
+
+
 # Shared console for nice output
-console = Console()
+console = _LazyConsole()
+
 
+def spinner(description: str):
+    """A Rich spinner while the block runs, or nothing off a terminal or in production."""
+    if os.getenv("COURSESYNC_ENV", "development") == "production" or not sys.stdout.isatty():
+        return nullcontext()
+    from rich.progress import Progress, SpinnerColumn, TextColumn
 
-def extract_json(text: str) -> Dict:
+    progress = Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), console=_rich_console())
+    progress.add_task(description, total=None)
+    return progress
+
+
+def extract_json(text: str, operation: str = "unknown") -> Dict:
     """Extract JSON from LLM response robustly.
 
     Tries several common patterns (```json blocks, fenced blocks, or plain JSON).
     Returns an empty dict on parse failure and prints a helpful message to console.
+    ``operation`` labels the parse-failure metric.
     """
     try:
         if "```json" in text:
@@ -38,6 +69,7 @@ def extract_json(text: str) -> Dict:
 
         return json.loads(json_str)
     except Exception as e:
+        LLM_PARSE_FAILURES.inc(operation=operation)
         console.print(f"[red]Failed to parse JSON: {str(e)}[/red]")
         console.print(f"[dim]Raw response:\n{text}[/dim]")
         return {}
@@ -103,16 +135,16 @@ def get_data_dir() -> str:
     os.makedirs(path, exist_ok=True)
     return path
 
-def load_settings() -> Dict:
-    path = os.path.join(get_data_dir(), "settings.json")
+def load_settings(path: str = None) -> Dict:
+    path = path or os.path.join(get_data_dir(), "settings.json")
     try:
         with open(path, "r", encoding="utf-8") as f:
             return json.load(f)
     except Exception:
         return {}
 
-def save_settings(settings: Dict) -> None:
-    path = os.path.join(get_data_dir(), "settings.json")
+def save_settings(settings: Dict, path: str = None) -> None:
+    path = path or os.path.join(get_data_dir(), "settings.json")
     with open(path, "w", encoding="utf-8") as f:
         json.dump(settings, f, indent=2)
 
@@ -131,6 +163,10 @@ def send_email(to: str, subject: str, body: str) -> bool:
     password = os.getenv("SMTP_PASS", "")
     if not to or not user or not password:
         return False
+    import smtplib
+    import ssl
+    from email.message import EmailMessage
+
     msg = EmailMessage()
     msg["From"] = user
     msg["To"] = to
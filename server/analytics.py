@@ -0,0 +1,176 @@
+"""Trends computed from the progress event log.
+
+``analytics`` joins the event columns (``server.events``) with the current
+snapshot and returns, for a window of recent days:
+
+- burn-down: estimated hours of work left per course at the end of each day
+- velocity: hours studied per day and estimated work finished per day
+- estimate vs. actual: logged hours over estimated hours per assignment type
+- predicted completion: when each course's remaining work is done at the
+  recent pace, and whether that beats its last deadline
+
+The per-event work (key lookup, progress deltas, per-day and per-course
+sums) is vectorized with numpy when it is installed; the fallback walks the
+events once in Python and gives the same results. numpy is optional (not in
+requirements.txt). The rest only touches per-course and per-day totals.
+"""
+
+import math
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Tuple
+
+from .events import PROGRESS, TIME_SPENT, assignment_key, np
+
+DAY = 86400.0
+# Recent pace used for predictions
+VELOCITY_DAYS = 14
+
+
+def _aggregate_numpy(columns, keys, est, course_ids, n_courses, start, days) -> Tuple[List[float], List[List[float]]]:
+    ts = columns["ts"]
+    value = columns["value"].astype(np.float64)
+    kind = columns["kind"]
+    keys = np.asarray(keys, dtype=np.uint32)
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    pos = np.minimum(np.searchsorted(sorted_keys, columns["key"]), len(sorted_keys) - 1)
+    known = sorted_keys[pos] == columns["key"]
+    idx = order[pos]
+    day = np.floor((ts - start) / DAY).astype(np.int64)
+    in_window = (day >= 0) & (day < days)
+
+    studied = known & in_window & (kind == TIME_SPENT)
+    hours = np.bincount(day[studied], weights=value[studied], minlength=days)[:days]
+
+    done = np.zeros(n_courses * days)
+    p = np.flatnonzero(known & (kind == PROGRESS))
+    if p.size:
+        # Each assignment's events in time order; progress before its first event counts as 0
+        p = p[np.lexsort((ts[p], idx[p]))]
+        p_idx, p_value = idx[p], value[p]
+        previous = np.concatenate([[0.0], p_value[:-1]])
+        previous[np.concatenate([[True], p_idx[1:] != p_idx[:-1]])] = 0.0
+        work = np.asarray(est)[p_idx] * (p_value - previous) / 100.0
+        p_day = day[p]
+        w = (p_day >= 0) & (p_day < days)
+        cells = np.asarray(course_ids)[p_idx[w]] * days + p_day[w]
+        done = np.bincount(cells, weights=work[w], minlength=n_courses * days)
+    return hours.tolist(), done.reshape(n_courses, days).tolist()
+
+
+def _aggregate_python(columns, keys, est, course_ids, n_courses, start, days) -> Tuple[List[float], List[List[float]]]:
+    index = {key: i for i, key in enumerate(keys)}
+    hours = [0.0] * days
+    done = [[0.0] * days for _ in range(n_courses)]
+    previous: Dict[int, float] = {}
+    events = sorted(zip(columns["ts"], columns["key"], columns["value"], columns["kind"]))
+    for ts, key, value, kind in events:
+        i = index.get(key)
+        if i is None:
+            continue
+        day = math.floor((ts - start) / DAY)
+        if kind == TIME_SPENT:
+            if 0 <= day < days:
+                hours[day] += value
+        elif kind == PROGRESS:
+            before = previous.get(i, 0.0)
+            previous[i] = value
+            if 0 <= day < days:
+                done[course_ids[i]][day] += est[i] * (value - before) / 100.0
+    return hours, done
+
+
+def _number(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def analytics(snapshot, columns: Dict, days: int = 30, today: date = None) -> Dict:
+    today = today or date.today()
+    first_day = today - timedelta(days=days - 1)
+    start = datetime.combine(first_day, time.min).timestamp()
+    dates = [(first_day + timedelta(days=d)).isoformat() for d in range(days)]
+
+    course_names = [c.get("course_name", "") for c in snapshot.courses]
+    course_index = {}
+    for i, name in enumerate(course_names):
+        course_index.setdefault(name, i)
+    # Assignments of unknown courses are grouped under one extra row
+    other = len(course_names)
+
+    keys, est, course_ids = [], [], []
+    remaining = [0.0] * (other + 1)
+    last_due = [""] * (other + 1)
+    by_type: Dict[str, List[float]] = {}
+    for a in snapshot.assignments:
+        c = course_index.get(a.get("course"), other)
+        hours = _number(a.get("estimated_hours"))
+        progress = _number(a.get("progress"))
+        keys.append(assignment_key(a))
+        est.append(hours)
+        course_ids.append(c)
+        if progress < 100:
+            remaining[c] += hours * (1 - progress / 100)
+            last_due[c] = max(last_due[c], a.get("due_date") or "")
+        elif _number(a.get("time_spent")) > 0 and hours > 0:
+            totals = by_type.setdefault(a.get("type") or "other", [0.0, 0.0, 0])
+            totals[0] += hours
+            totals[1] += _number(a.get("time_spent"))
+            totals[2] += 1
+
+    n_courses = other + 1
+    if keys and len(columns["ts"]):
+        aggregate = _aggregate_numpy if np is not None else _aggregate_python
+        studied, done = aggregate(columns, keys, est, course_ids, n_courses, start, days)
+    else:
+        studied, done = [0.0] * days, [[0.0] * days for _ in range(n_courses)]
+
+    courses = []
+    for c in range(n_courses):
+        if c == other and not remaining[c] and not any(done[c]):
+            continue
+        # Walk back from today's remaining work, adding back what was finished each day
+        series, left = [], remaining[c]
+        for d in range(days - 1, -1, -1):
+            series.append({"date": dates[d], "remaining_hours": round(left, 2)})
+            left += done[c][d]
+        series.reverse()
+        pace = sum(done[c][-VELOCITY_DAYS:]) / min(days, VELOCITY_DAYS)
+        if remaining[c] <= 0:
+            predicted = None
+        elif pace > 0:
+            predicted = (today + timedelta(days=math.ceil(remaining[c] / pace))).isoformat()
+        else:
+            predicted = None
+        courses.append({
+            "course": course_names[c] if c < other else None,
+            "remaining_hours": round(remaining[c], 2),
+            "burn_down": series,
+            "hours_per_day": round(pace, 2),
+            "predicted_completion": predicted,
+            "last_due_date": last_due[c] or None,
+            "on_track": None if predicted is None or not last_due[c] else predicted <= last_due[c],
+        })
+
+    work_per_day = [sum(done[c][d] for c in range(n_courses)) for d in range(days)]
+    recent = studied[-7:]
+    return {
+        "days": days,
+        "courses": courses,
+        "velocity": {
+            "daily": [
+                {"date": dates[d], "hours_studied": round(studied[d], 2), "work_completed_hours": round(work_per_day[d], 2)}
+                for d in range(days)
+            ],
+            "avg_hours_studied_7d": round(sum(recent) / len(recent), 2),
+            "avg_hours_studied": round(sum(studied) / days, 2),
+        },
+        "estimate_accuracy": {
+            kind: {"assignments": count, "estimated_hours": round(estimated, 2), "actual_hours": round(actual, 2),
+                   "ratio": round(actual / estimated, 2)}
+            for kind, (estimated, actual, count) in sorted(by_type.items())
+        },
+        "events": len(columns["ts"]),
+    }
@@ -1,34 +1,46 @@
 """FastAPI web server for CourseSync-Agent web UI"""
 
-from fastapi import FastAPI, HTTPException, UploadFile, File
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Depends, Header, Query
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, Response, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
+import hmac
 import os
-import json
 import threading
 import time
 from datetime import datetime
 
-from .agent.agent import CourseSyncAgent
 from .agent.utils import (
-    get_data_dir, load_settings, save_settings, load_state,
+    get_data_dir,
     send_email, notification_id, extract_text_from_file, create_ics_for_assignments
 )
+from .agent.metrics import HTTP_REQUEST_DURATION, render_latest, CONTENT_TYPE_LATEST
+from .agent.tracing import span, start_trace, end_trace
+from .agent.profiler import profiler
+from .agent.resilience import ServiceUnavailable, deadline
+from .agent.quota import QuotaExceeded, budget as token_budget, ledger_for, use_ledger
+
+from .logging_config import configure_logging
+from .state import State, TenantRegistry, USER_ID_PATTERN
+from .chat import handle_chat
+from .assignment_query import QueryError, assignment_index
+from .compression import CompressionMiddleware
+from .static_files import StaticManifest
+from .batch import BatchError, apply_batch, apply_progress, find_course, new_assignment
+from .events import event_log, record as record_events
+from .analytics import analytics
+from .encoding import FastJSONResponse, RawJSONResponse, encoded_state
+from .model import due_date_of
+from .store import create_store, tenant_dir, DEFAULT_TENANT
 
 import logging
 
-# Configure logging
-logging.basicConfig(
-    filename='server_debug.log',
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging (queued, rotated, level per COURSESYNC_ENV)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="CourseSync-Agent Web UI")
+app = FastAPI(title="CourseSync-Agent Web UI", default_response_class=FastJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -39,59 +51,102 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize agent and state
-agent = CourseSyncAgent()
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Observe per-route latency for the /metrics endpoint"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template (not raw path) to keep cardinality bounded
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - started,
+            method=request.method, route=route_path, status=str(status),
+        )
+
+@app.middleware("http")
+async def add_server_timing(request: Request, call_next):
+    """Collect spans for this request and report them in a Server-Timing header"""
+    trace, token = start_trace()
+    try:
+        response = await call_next(request)
+    finally:
+        end_trace(token)
+    response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
+# Default end-to-end budget for a request; clients may ask for less with X-Request-Timeout
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "45"))
+
+@app.middleware("http")
+async def apply_deadline(request: Request, call_next):
+    """Bound LLM retries and backoff by the time the client is willing to wait"""
+    seconds = REQUEST_DEADLINE_SECONDS
+    try:
+        seconds = min(seconds, float(request.headers.get("X-Request-Timeout") or seconds))
+    except ValueError:
+        pass
+    with deadline(seconds):
+        return await call_next(request)
+
+@app.middleware("http")
+async def charge_tenant(request: Request, call_next):
+    """Charge LLM tokens used by this request to the caller's usage ledger"""
+    user_id = request.headers.get("X-User-Id") or DEFAULT_TENANT
+    ledger = None
+    if request.url.path.startswith("/api/") and USER_ID_PATTERN.match(user_id) and not user_id.startswith("."):
+        ledger = ledger_for(user_id, lambda: tenant_dir(data_dir, user_id))
+    with use_ledger(ledger):
+        return await call_next(request)
+
+# Added last so it wraps every other middleware and compresses their final output
+app.add_middleware(CompressionMiddleware)
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+def require_admin(request: Request):
+    """Reject requests without a matching X-Admin-Token (admin routes are off when ADMIN_TOKEN is unset)"""
+    supplied = request.headers.get("X-Admin-Token", "")
+    if not ADMIN_TOKEN or not hmac.compare_digest(supplied, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+# The agent (Groq/Firecrawl clients, Rich, the syllabus index) is built on first use, not at import
+_agent = None
+_agent_lock = threading.Lock()
+
+def get_agent():
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                from .agent.agent import CourseSyncAgent
+                _agent = CourseSyncAgent()
+    return _agent
+
 data_dir = get_data_dir()
 
-# State management
-class State:
-    def __init__(self):
-        self.courses = []
-        self.all_assignments = []
-        self.sent_notifications = []
-        self.settings = self._load_settings()
-        self.scheduler_thread = None
-        self.scheduler_stop_event = threading.Event()
-        self._load_state()
-    
-    def _load_settings(self):
-        base = {
-            "hours_per_day": 4,
-            "risk_threshold": 20,
-            "notification_lead_days": 3,
-            "calendar_filename": os.path.join(data_dir, "coursesync_calendar.ics"),
-            "email_enabled": False,
-            "email_to": "",
-            "email_schedule_enabled": False,
-            "notification_poll_seconds": 60,
-        }
-        loaded = load_settings()
-        settings = {**base, **loaded}
-        save_settings(settings)
-        return settings
-    
-    def _load_state(self):
-        state = load_state()
-        self.courses = state.get("courses", [])
-        self.all_assignments = state.get("assignments", [])
-        self.sent_notifications = state.get("sent_notifications", [])
-    
-    def persist(self):
-        state = {
-            "timestamp": datetime.now().isoformat(),
-            "courses": self.courses,
-            "assignments": self.all_assignments,
-            "settings": self.settings,
-            "sent_notifications": self.sent_notifications,
-        }
-        try:
-            path = os.path.join(data_dir, "data.json")
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(state, f, indent=2)
-        except Exception as e:
-            print(f"Error persisting state: {e}")
+# State management: one lazily loaded partition per user
+tenants = TenantRegistry(create_store(data_dir), data_dir, int(os.getenv("MAX_TENANTS_IN_MEMORY", "1000")))
 
-state = State()
+def current_state(x_user_id: Optional[str] = Header(None)) -> State:
+    """Resolve the caller's partition from the X-User-Id header (single-user deployments omit it)"""
+    try:
+        tenant = tenants.get(x_user_id or DEFAULT_TENANT)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Pick up writes from other workers before serving the request
+    tenant.refresh()
+    return tenant
+
+def service_unavailable(e: ServiceUnavailable) -> HTTPException:
+    """503 (429 for a used-up token budget) telling the client when it is worth retrying"""
+    status = 429 if isinstance(e, QuotaExceeded) else 503
+    return HTTPException(status_code=status, detail=str(e), headers={"Retry-After": e.retry_after_header})
 
 # Pydantic models
 class SyllabusRequest(BaseModel):
@@ -101,6 +156,8 @@ class SyllabusRequest(BaseModel):
 class URLRequest(BaseModel):
     url: str
     semester_start: str
+    # Also follow same-site links (schedule, assignments, exams pages)
+    crawl: bool = False
 
 class ProgressUpdate(BaseModel):
     assignment_index: int
@@ -142,336 +199,58 @@ class AddAssignmentRequest(BaseModel):
     course_name: str
     assignment: AssignmentModel
 
+class BatchRequest(BaseModel):
+    # Each item is {"op": "progress" | "time_spent" | "update_assignment" | "delete_assignment" | "add_assignment" | "settings", ...}
+    operations: List[Dict[str, Any]]
+
 # API Routes
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    return Response(content=render_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.post("/api/chat")
-async def chat_with_assistant(request: ChatRequest):
+async def chat_with_assistant(request: ChatRequest, state: State = Depends(current_state)):
     """Chat with the academic assistant"""
     try:
-        logger.info(f"Chat request: {request.question}")
-        result = agent.chat(request.question, state.courses, state.all_assignments, request.history)
-        logger.info(f"Agent response: {result}")
-        
-        # Helper to format response
-        def format_response(msg):
-             return {"success": True, "response": msg}
-
-        if isinstance(result, dict) and "action" in result:
-            action = result["action"]
-            content = result.get("content", "")
-            data = result.get("data", {})
-            logger.info(f"Action detected: {action}")
-            
-            if action == "add_course":
-                syllabus_text = data.get("syllabus_text", "")
-                if not syllabus_text:
-                     # Check if course_name is provided instead (for simple "add course" commands)
-                     course_name = data.get("course_name", "")
-                     if course_name:
-                         syllabus_text = course_name
-                     else:
-                         logger.warning("Add course action but no syllabus text or course name")
-                         return format_response(f"{content}\n(No syllabus text found to process)")
-
-                try:
-                    # Check if URL
-                    if syllabus_text.startswith("http"):
-                        logger.info(f"Scraping URL: {syllabus_text}")
-                        scraped = agent.scrape_course_page(syllabus_text)
-                        if not scraped:
-                             logger.error("Scraping failed")
-                             return format_response(f"{content}\n(Failed to scrape the URL provided)")
-                        course_data = agent.parse_syllabus(scraped, "2025-09-01") # Default date
-                    else:
-                        logger.info(f"Parsing syllabus text: {syllabus_text}")
-                        # For simple commands like "Add Math 101", parse_syllabus handles the string intelligently
-                        course_data = agent.parse_syllabus(syllabus_text, "2025-09-01")
-                    
-                    logger.info(f"Parsed course data: {course_data}")
-                    if course_data:
-                        # Ensure 'assignments' key exists
-                        if "assignments" not in course_data:
-                             course_data["assignments"] = []
-                        
-                        for a in course_data["assignments"]:
-                            a["course"] = course_data.get("course_name", "N/A")
-                            a["course_code"] = course_data.get("course_code", "")
-                            a["progress"] = 0
-                        state.courses.append(course_data)
-                        state.all_assignments.extend(course_data["assignments"])
-                        state.persist()
-                        logger.info("Course persisted (chat action)")
-                        return format_response(f"{content}\n\n✅ Automatically added course: {course_data.get('course_name')}")
-                    else:
-                        logger.error("Failed to parse course details")
-                        return format_response(f"{content}\n(Failed to extract course details)")
-                except Exception as e:
-                     logger.exception("Error processing add_course action")
-                     return format_response(f"{content}\n(Error adding course: {str(e)})")
-
-            elif action == "add_assignment":
-                course_target = data.get("course_name", "")
-                assignment_data = data.get("assignment", {})
-                
-                if not course_target or not assignment_data:
-                    return format_response(f"{content}\n(Missing course name or assignment details)")
-
-                target_lower = course_target.lower()
-                found_course = None
-                for course in state.courses:
-                    if target_lower in course.get("course_name", "").lower() or target_lower in course.get("course_code", "").lower():
-                        found_course = course
-                        break
-                
-                if found_course:
-                    new_assignment = {
-                        "name": assignment_data.get("name", "New Assignment"),
-                        "type": assignment_data.get("type", "homework"),
-                        "due_date": assignment_data.get("due_date", datetime.now().strftime("%Y-%m-%d")),
-                        "weight": assignment_data.get("weight", 0),
-                        "estimated_hours": assignment_data.get("estimated_hours", 1),
-                        "description": assignment_data.get("description", ""),
-                        "course": found_course.get("course_name", ""),
-                        "course_code": found_course.get("course_code", ""),
-                        "progress": 0
-                    }
-                    found_course.setdefault("assignments", []).append(new_assignment)
-                    state.all_assignments.append(new_assignment)
-                    state.persist()
-                    return format_response(f"{content}\n\n✅ Added assignment '{new_assignment['name']}' to {found_course['course_name']}")
-                else:
-                    return format_response(f"{content}\n(Course '{course_target}' not found)")
-
-            elif action == "delete_course":
-                target = data.get("course_name", "").lower()
-                logger.info(f"Deleting course target: {target}")
-                if not target:
-                    return format_response(f"{content}\n(No course name specified)")
-
-                for i, c in enumerate(state.courses):
-                    if target in c.get("course_name", "").lower() or target in c.get("course_code", "").lower():
-                         course = state.courses.pop(i)
-                         # remove assignments
-                         state.all_assignments = [a for a in state.all_assignments if a.get("course") != course.get("course_name")]
-                         state.persist()
-                         logger.info(f"Deleted course {course.get('course_name')}")
-                         return format_response(f"{content}\n\n🗑️ Deleted course: {course.get('course_name')}")
-                
-                logger.warning(f"Course not found: {target}")
-                return format_response(f"{content}\n(Could not find course '{target}' to delete)")
-
-            elif action == "edit_course":
-                course_target = data.get("course_name", "")
-                update_data = data.get("update_data", {})
-                new_name = update_data.get("course_name")
-                new_code = update_data.get("course_code")
-
-                if not course_target:
-                     return format_response(f"{content}\n(Missing course name to edit)")
-                
-                target_lower = course_target.lower()
-                found = False
-                
-                for course in state.courses:
-                    if target_lower in course.get("course_name", "").lower() or target_lower in course.get("course_code", "").lower():
-                        found = True
-                        
-                        if new_name:
-                            old_name = course.get("course_name")
-                            course["course_name"] = new_name
-                            # Update assignments
-                            for a in state.all_assignments:
-                                if a.get("course") == old_name:
-                                    a["course"] = new_name
-                            for a in course.get("assignments", []):
-                                a["course"] = new_name
-                        
-                        if new_code:
-                            course["course_code"] = new_code
-                            # Update assignments
-                            for a in state.all_assignments:
-                                if a.get("course") == course.get("course_name"):
-                                     a["course_code"] = new_code
-                            for a in course.get("assignments", []):
-                                a["course_code"] = new_code
-
-                        state.persist()
-                        return format_response(f"{content}\n\n✏️ Updated course: {course.get('course_name')}")
-                
-                return format_response(f"{content}\n(Course '{course_target}' not found)")
-
-            elif action == "delete_assignment":
-                 assignment_name = data.get("assignment_name", "")
-                 course_name = data.get("course_name", "")
-                 
-                 if not assignment_name:
-                      return format_response(f"{content}\n(Missing assignment name)")
-
-                 target_a = assignment_name.lower()
-                 target_c = course_name.lower() if course_name else ""
-
-                 deleted_count = 0
-                 
-                 # Remove from all_assignments
-                 new_all_assignments = []
-                 for a in state.all_assignments:
-                     a_name = a.get("name", "").lower()
-                     a_course = a.get("course", "").lower()
-                     
-                     match_name = target_a in a_name
-                     match_course = True
-                     if target_c:
-                         match_course = target_c in a_course
-                     
-                     if match_name and match_course:
-                         deleted_count += 1
-                     else:
-                         new_all_assignments.append(a)
-                 
-                 state.all_assignments = new_all_assignments
-
-                 # Remove from courses
-                 for course in state.courses:
-                     c_assignments = course.get("assignments", [])
-                     new_c_assignments = []
-                     for a in c_assignments:
-                         a_name = a.get("name", "").lower()
-                         match_name = target_a in a_name
-                         match_course = True
-                         if target_c:
-                             if target_c not in course.get("course_name", "").lower():
-                                 match_course = False
-                         
-                         if match_name and match_course:
-                             pass 
-                         else:
-                             new_c_assignments.append(a)
-                     course["assignments"] = new_c_assignments
-
-                 if deleted_count > 0:
-                     state.persist()
-                     return format_response(f"{content}\n\n🗑️ Deleted assignment: {assignment_name}")
-                 else:
-                     return format_response(f"{content}\n(Assignment '{assignment_name}' not found)")
-
-            elif action == "update_assignment":
-                course_target = data.get("course_name", "")
-                assignment_target = data.get("assignment_name", "")
-                update_data = data.get("update_data", {})
-                
-                if not assignment_target:
-                    return format_response(f"{content}\n(Missing assignment name)")
-
-                target_a = assignment_target.lower()
-                target_c = course_target.lower() if course_target else ""
-                
-                updated_count = 0
-                
-                # Helper to update fields
-                def update_fields(a):
-                    changed = False
-                    for k, v in update_data.items():
-                        if v is not None and k in ["name", "due_date", "type", "description", "estimated_hours", "weight", "progress"]:
-                            a[k] = v
-                            changed = True
-                    return changed
-
-                # Update in all_assignments
-                for a in state.all_assignments:
-                    a_name = a.get("name", "").lower()
-                    a_course = a.get("course", "").lower()
-                    
-                    match_name = target_a in a_name
-                    match_course = True
-                    if target_c:
-                         match_course = target_c in a_course
-                    
-                    if match_name and match_course:
-                        if update_fields(a):
-                            updated_count += 1
-
-                # Update in courses
-                for course in state.courses:
-                     c_assignments = course.get("assignments", [])
-                     for a in c_assignments:
-                         a_name = a.get("name", "").lower()
-                         match_name = target_a in a_name
-                         match_course = True
-                         if target_c:
-                             if target_c not in course.get("course_name", "").lower():
-                                 match_course = False
-                         
-                         if match_name and match_course:
-                             update_fields(a)
-                
-                if updated_count > 0:
-                    state.persist()
-                    return format_response(f"{content}\n\n✅ Updated assignment: {assignment_target}")
-                else:
-                    return format_response(f"{content}\n(Assignment '{assignment_target}' not found)")
-            
-            else:
-                 return format_response(content)
-        
-        # Fallback
-        return format_response(str(result))
-
+        logger.info("Chat request: %s", request.question)
+        return handle_chat(request.question, request.history, state, get_agent())
+    except ServiceUnavailable as e:
+        raise service_unavailable(e)
     except Exception as e:
         logger.exception("Chat endpoint error")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/state")
-async def get_state():
-    """Get current application state"""
-    # Calculate course progress
-    courses_with_progress = []
-    for course in state.courses:
-        course_name = course.get("course_name", "")
-        course_assignments = [a for a in state.all_assignments if a.get("course") == course_name]
-        
-        if course_assignments:
-            completed = sum(1 for a in course_assignments if a.get("progress", 0) == 100)
-            progress = round((completed / len(course_assignments)) * 100)
-        else:
-            progress = 0
-        
-        course_copy = course.copy()
-        course_copy["progress"] = progress
-        course_copy["assignments"] = course_assignments
-        courses_with_progress.append(course_copy)
-    
-    # Get pending assignments (not completed)
-    pending_assignments = [a for a in state.all_assignments if a.get("progress", 0) < 100]
-    
-    return {
-        "courses": courses_with_progress,
-        "assignments": state.all_assignments,
-        "settings": state.settings,
-        "stats": {
-            "total_courses": len(state.courses),
-            "total_assignments": len(state.all_assignments),
-            "completed_assignments": sum(1 for a in state.all_assignments if a.get("progress", 0) == 100),
-            "pending_assignments": len(pending_assignments),
-        }
-    }
+async def get_state(compact: bool = False, summary: bool = False, state: State = Depends(current_state)):
+    """Get current application state; ``compact=true`` references courses by ID instead of repeating them,
+    ``summary=true`` returns only courses and dashboard totals"""
+    snap = state.snapshot()
+    with span("scan"):
+        body = encoded_state(snap, compact, summary)
+    return RawJSONResponse(body)
 
 @app.post("/api/syllabus/text")
-async def add_syllabus_text(request: SyllabusRequest):
+async def add_syllabus_text(request: SyllabusRequest, state: State = Depends(current_state)):
     """Add syllabus from text"""
     try:
-        course_data = agent.parse_syllabus(request.syllabus_text, request.semester_start)
+        course_data = get_agent().parse_syllabus(request.syllabus_text, request.semester_start)
         
         if course_data and "assignments" in course_data:
             for a in course_data["assignments"]:
                 a["course"] = course_data.get("course_name", "N/A")
                 a["course_code"] = course_data.get("course_code", "")
                 a["progress"] = a.get("progress", 0)
-            state.courses.append(course_data)
-            state.all_assignments.extend(course_data["assignments"])
-            state.persist()
+            with state.locked():
+                state.courses.append(course_data)
+                state.all_assignments.extend(course_data["assignments"])
+                state.persist()
             return {"success": True, "course": course_data}
         else:
             return {"success": False, "error": "Failed to parse syllabus"}
+    except ServiceUnavailable as e:
+        raise service_unavailable(e)
     except Exception as e:
         msg = str(e)
         lower = msg.lower()
@@ -481,26 +260,33 @@ async def add_syllabus_text(request: SyllabusRequest):
         raise HTTPException(status_code=500, detail=msg)
 
 @app.post("/api/syllabus/url")
-async def add_syllabus_url(request: URLRequest):
+async def add_syllabus_url(request: URLRequest, state: State = Depends(current_state)):
     """Add syllabus from URL"""
+    from .agent.scraping import BlockedURL  # pulls in requests, like the agent itself
+
     try:
-        content = agent.scrape_course_page(request.url)
+        content = get_agent().scrape_course_page(request.url, crawl=request.crawl)
         if not content:
             return {"success": False, "error": "Failed to scrape URL"}
         
-        course_data = agent.parse_syllabus(content, request.semester_start)
+        course_data = get_agent().parse_syllabus(content, request.semester_start)
         
         if course_data and "assignments" in course_data:
             for a in course_data["assignments"]:
                 a["course"] = course_data.get("course_name", "N/A")
                 a["course_code"] = course_data.get("course_code", "")
                 a["progress"] = a.get("progress", 0)
-            state.courses.append(course_data)
-            state.all_assignments.extend(course_data["assignments"])
-            state.persist()
+            with state.locked():
+                state.courses.append(course_data)
+                state.all_assignments.extend(course_data["assignments"])
+                state.persist()
             return {"success": True, "course": course_data}
         else:
             return {"success": False, "error": "Failed to parse scraped content"}
+    except BlockedURL as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ServiceUnavailable as e:
+        raise service_unavailable(e)
     except Exception as e:
         msg = str(e)
         lower = msg.lower()
@@ -509,12 +295,12 @@ async def add_syllabus_url(request: URLRequest):
         raise HTTPException(status_code=500, detail=msg)
 
 @app.post("/api/syllabus/file")
-async def add_syllabus_file(file: UploadFile = File(...), semester_start: str = "2025-09-01"):
+async def add_syllabus_file(file: UploadFile = File(...), semester_start: str = "2025-09-01", state: State = Depends(current_state)):
     """Add syllabus from any text-based file (PDF, TXT, MD, etc.)"""
     try:
-        logger.info(f"Received file upload: {file.filename}")
+        logger.info("Received file upload: %s", file.filename)
         # Save uploaded file temporarily
-        temp_path = os.path.join(data_dir, f"temp_{file.filename}")
+        temp_path = os.path.join(state.data_dir, f"temp_{os.path.basename(file.filename or 'upload')}")
         with open(temp_path, "wb") as f:
             content = await file.read()
             f.write(content)
@@ -523,30 +309,33 @@ async def add_syllabus_file(file: UploadFile = File(...), semester_start: str =
         text = extract_text_from_file(temp_path, file.filename)
         os.remove(temp_path)  # Clean up
         
-        logger.info(f"Extracted {len(text)} chars from file.")
+        logger.info("Extracted %d chars from file.", len(text))
         if len(text) < 50:
-            logger.warning(f"Extracted text too short: {text}")
+            logger.warning("Extracted text too short: %s", text)
 
         if not text.strip():
             logger.error("No content extracted from file.")
             return {"success": False, "error": "No content extracted from file. Only text-based files (PDF, TXT, MD, etc.) are supported."}
         
-        course_data = agent.parse_syllabus(text, semester_start)
-        logger.info(f"Parsed course data: {course_data}")
+        course_data = get_agent().parse_syllabus(text, semester_start)
+        logger.debug("Parsed course data: %s", course_data)
 
         if course_data and "assignments" in course_data:
             for a in course_data["assignments"]:
                 a["course"] = course_data.get("course_name", "N/A")
                 a["course_code"] = course_data.get("course_code", "")
                 a["progress"] = a.get("progress", 0)
-            state.courses.append(course_data)
-            state.all_assignments.extend(course_data["assignments"])
-            state.persist()
+            with state.locked():
+                state.courses.append(course_data)
+                state.all_assignments.extend(course_data["assignments"])
+                state.persist()
             logger.info("Course persisted successfully.")
             return {"success": True, "course": course_data}
         else:
             logger.error("Failed to parse syllabus: Missing 'assignments' key or empty result.")
             return {"success": False, "error": "Failed to parse syllabus from file"}
+    except ServiceUnavailable as e:
+        raise service_unavailable(e)
     except Exception as e:
         logger.exception("Error in add_syllabus_file:")
         msg = str(e)
@@ -556,7 +345,7 @@ async def add_syllabus_file(file: UploadFile = File(...), semester_start: str =
         raise HTTPException(status_code=500, detail=msg)
 
 @app.post("/api/course/manual")
-async def add_course_manual(request: ManualCourseRequest):
+async def add_course_manual(request: ManualCourseRequest, state: State = Depends(current_state)):
     """Add a course manually (bypassing AI parsing)"""
     try:
         assignments = []
@@ -582,61 +371,81 @@ async def add_course_manual(request: ManualCourseRequest):
             "assignments": assignments
         }
         
-        state.courses.append(course_data)
-        state.all_assignments.extend(assignments)
-        state.persist()
+        with state.locked():
+            state.courses.append(course_data)
+            state.all_assignments.extend(assignments)
+            state.persist()
         return {"success": True, "course": course_data}
     except Exception as e:
         logger.exception("Error adding course manually")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/workload")
-async def get_workload():
+async def get_workload(state: State = Depends(current_state)):
     """Get workload analysis"""
-    if not state.all_assignments:
+    snap = state.snapshot()
+    if not snap.assignments:
         return {"error": "No assignments to analyze"}
     
     try:
-        analysis = agent.analyze_workload(state.all_assignments)
+        analysis = get_agent().analyze_workload(list(snap.assignments))
         return {"success": True, "analysis": analysis}
+    except ServiceUnavailable as e:
+        raise service_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/schedule")
-async def get_schedule(hours_per_day: int = None):
+async def get_schedule(hours_per_day: int = None, state: State = Depends(current_state)):
     """Get study schedule"""
-    if not state.all_assignments:
+    snap = state.snapshot()
+    if not snap.assignments:
         return {"error": "No assignments to schedule"}
     
     try:
-        hours = hours_per_day or state.settings.get("hours_per_day", 4)
-        schedule = agent.create_schedule(state.all_assignments, hours)
+        hours = hours_per_day or snap.settings.get("hours_per_day", 4)
+        schedule = get_agent().create_schedule(list(snap.assignments), hours)
         return {"success": True, "schedule": schedule}
+    except ServiceUnavailable as e:
+        raise service_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/insights")
+async def get_insights(hours_per_day: int = None, state: State = Depends(current_state)):
+    """Workload analysis, schedule and notifications from one shared context"""
+    snap = state.snapshot()
+    if not snap.assignments:
+        return {"error": "No assignments to analyze"}
+
+    try:
+        hours = hours_per_day or snap.settings.get("hours_per_day", 4)
+        insights = get_agent().insights(list(snap.courses), list(snap.assignments), hours)
+        return {"success": not insights["errors"], **insights}
+    except ServiceUnavailable as e:
+        raise service_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/notifications")
-async def get_notifications():
+async def get_notifications(state: State = Depends(current_state)):
     """Get smart notifications"""
+    snap = state.snapshot()
     try:
         from datetime import datetime, timedelta
         
         notifications = []
         now = datetime.now()
-        lead_days = state.settings.get("notification_lead_days", 3)
+        lead_days = snap.settings.get("notification_lead_days", 3)
         
-        for assignment in state.all_assignments:
+        for assignment in snap.assignments:
             if assignment.get("progress", 0) == 100:  # Skip completed
                 continue
             
-            due_date_str = assignment.get("due_date", "")
-            if not due_date_str:
-                continue
-            
-            try:
-                due_date = datetime.strptime(due_date_str, "%Y-%m-%d")
-            except:
+            due = due_date_of(assignment)
+            if due is None:
                 continue
+            due_date = datetime.combine(due, datetime.min.time())
             
             days_until = (due_date - now).days
             
@@ -671,7 +480,7 @@ async def get_notifications():
                 "message": message,
                 "assignment": assignment['name'],
                 "course": assignment['course'],
-                "due_date": due_date_str,
+                "due_date": assignment.get("due_date"),
                 "days_until": days_until,
                 "timestamp": now.isoformat()
             })
@@ -680,94 +489,102 @@ async def get_notifications():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/assignments")
+async def query_assignments(
+    course: str = "",
+    status: str = "all",
+    assignment_type: str = Query("", alias="type"),
+    due_from: str = "",
+    due_to: str = "",
+    sort: str = "due_date",
+    cursor: str = "",
+    limit: int = 50,
+    state: State = Depends(current_state),
+):
+    """Filtered, sorted page of assignments; pass ``next_cursor`` back as ``cursor`` for the next page"""
+    snap = state.snapshot()
+    try:
+        with span("scan"):
+            page = assignment_index(snap).query(course, status, assignment_type, due_from, due_to, sort, cursor, limit)
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "version": snap.version, **page}
+
 @app.post("/api/assignments")
-async def add_assignment(request: AddAssignmentRequest):
+async def add_assignment(request: AddAssignmentRequest, state: State = Depends(current_state)):
     """Add an assignment to an existing course"""
     try:
-        target_course = None
-        target_lower = request.course_name.lower()
-        
-        # Find course
-        for course in state.courses:
-            if course.get("course_name", "").lower() == target_lower or course.get("course_code", "").lower() == target_lower:
-                target_course = course
-                break
-        
-        if not target_course:
-            # Try partial match if exact match fails
-            for course in state.courses:
-                if target_lower in course.get("course_name", "").lower():
-                    target_course = course
-                    break
-        
-        if not target_course:
-            return {"success": False, "error": f"Course '{request.course_name}' not found"}
-
-        # process assignment
-        a = request.assignment
-        new_assignment = {
-            "name": a.name,
-            "type": a.type,
-            "due_date": a.due_date,
-            "weight": a.weight,
-            "weight": a.weight,
-            "estimated_hours": a.estimated_hours,
-            "time_spent": 0,
-            "description": a.description,
-            "course": target_course.get("course_name"),
-            "course_code": target_course.get("course_code"),
-            "progress": 0
-        }
-        
-        target_course.setdefault("assignments", []).append(new_assignment)
-        state.all_assignments.append(new_assignment)
-        state.persist()
+        with state.locked():
+            with span("scan"):
+                target_course = find_course(state.courses, request.course_name)
+            if not target_course:
+                return {"success": False, "error": f"Course '{request.course_name}' not found"}
+
+            assignment = new_assignment(target_course, {**request.assignment.dict(), "time_spent": 0})
+            state.edit_course(target_course).setdefault("assignments", []).append(assignment)
+            state.all_assignments.append(assignment)
+            state.persist()
         
-        return {"success": True, "assignment": new_assignment}
+            return {"success": True, "assignment": assignment}
 
     except Exception as e:
         logger.exception("Error adding assignment")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/progress")
-async def update_progress(update: ProgressUpdate):
+async def update_progress(update: ProgressUpdate, state: State = Depends(current_state)):
     """Update assignment progress"""
     try:
-        if 0 <= update.assignment_index < len(state.all_assignments):
-            assignment = state.all_assignments[update.assignment_index]
-            
-            if update.progress is not None:
-                old_progress = assignment.get("progress", 0)
-                new_progress = max(0, min(100, update.progress))
-                assignment["progress"] = new_progress
-                
-                # Update completed_at timestamp
-                if new_progress == 100 and old_progress < 100:
-                    assignment["completed_at"] = datetime.now().isoformat()
-                elif new_progress < 100:
-                    # Remove completion timestamp if getting un-completed
-                    assignment.pop("completed_at", None)
-
-            if update.time_spent is not None:
-                current_time = assignment.get("time_spent", 0)
-                assignment["time_spent"] = current_time + update.time_spent
-                
-            state.persist()
-            return {"success": True}
-        else:
-            return {"success": False, "error": "Invalid assignment index"}
+        with state.locked():
+            if 0 <= update.assignment_index < len(state.all_assignments):
+                assignment = state.edit_assignment(update.assignment_index)
+                events = apply_progress(assignment, update.progress, update.time_spent)
+                state.persist()
+            else:
+                return {"success": False, "error": "Invalid assignment index"}
+        record_events(state, events)
+        return {"success": True}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/batch")
+async def apply_mutations(request: BatchRequest, state: State = Depends(current_state)):
+    """Apply an ordered list of mutations atomically, with one persist"""
+    try:
+        results = apply_batch(state, request.operations)
+    except BatchError as e:
+        return {"success": False, "error": str(e), "operation": e.position}
     except Exception as e:
+        logger.exception("Batch error")
         raise HTTPException(status_code=500, detail=str(e))
+    return {"success": True, "version": state.version, "results": results}
+
+@app.get("/api/analytics")
+async def get_analytics(days: int = 30, state: State = Depends(current_state)):
+    """Burn-down, velocity, estimate accuracy and predicted completion from the progress event log"""
+    days = max(1, min(days, 366))
+    snap = state.snapshot()
+    with span("analytics"):
+        return {"success": True, **analytics(snap, event_log(state).columns(), days)}
+
+@app.get("/api/quota")
+async def get_quota(state: State = Depends(current_state)):
+    """LLM tokens used today and this month against the caller's budgets"""
+    return {"success": True, **token_budget(ledger_for(state.key, lambda: state.data_dir))}
 
 @app.get("/api/calendar")
-async def export_calendar():
+async def export_calendar(state: State = Depends(current_state)):
     """Export calendar as ICS file"""
-    if not state.all_assignments:
+    snap = state.snapshot()
+    if not snap.assignments:
         raise HTTPException(status_code=400, detail="No assignments to export")
     
     try:
-        filename = state.settings.get("calendar_filename", os.path.join(data_dir, "coursesync_calendar.ics"))
-        create_ics_for_assignments(state.all_assignments, filename)
+        filename = snap.settings.get("calendar_filename", os.path.join(state.data_dir, "coursesync_calendar.ics"))
+        if state.key != DEFAULT_TENANT:
+            # Tenants may only write inside their own partition
+            filename = os.path.join(state.data_dir, os.path.basename(filename) or "coursesync_calendar.ics")
+        create_ics_for_assignments(snap.assignments, filename)
         return FileResponse(
             filename,
             media_type="text/calendar",
@@ -777,68 +594,98 @@ async def export_calendar():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/settings")
-async def get_settings():
+async def get_settings(state: State = Depends(current_state)):
     """Get current settings"""
-    return state.settings
+    snap = state.snapshot()
+    return snap.settings
 
 @app.post("/api/settings")
-async def update_settings(settings_update: SettingsUpdate):
+async def update_settings(settings_update: SettingsUpdate, state: State = Depends(current_state)):
     """Update settings"""
     try:
-        update_dict = settings_update.dict(exclude_unset=True)
-        state.settings.update(update_dict)
-        save_settings(state.settings)
-        state.persist()
-        return {"success": True, "settings": state.settings}
+        with state.locked():
+            update_dict = settings_update.dict(exclude_unset=True)
+            state.settings.update(update_dict)
+            state.persist()
+            return {"success": True, "settings": state.settings}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/course/{course_index}")
-async def delete_course(course_index: int):
+async def delete_course(course_index: int, state: State = Depends(current_state)):
     """Delete a course"""
     try:
-        if 0 <= course_index < len(state.courses):
-            course = state.courses.pop(course_index)
-            # Remove associated assignments
-            state.all_assignments = [
-                a for a in state.all_assignments 
-                if a.get("course") != course.get("course_name")
-            ]
-            state.persist()
-            return {"success": True}
-        else:
-            return {"success": False, "error": "Invalid course index"}
+        with state.locked():
+            if 0 <= course_index < len(state.courses):
+                course = state.courses.pop(course_index)
+                # Remove associated assignments
+                state.all_assignments = [
+                    a for a in state.all_assignments 
+                    if a.get("course") != course.get("course_name")
+                ]
+                state.persist()
+                return {"success": True}
+            else:
+                return {"success": False, "error": "Invalid course index"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/admin/profile")
+async def start_profile(request: Request, seconds: float = 30, interval_ms: float = 5):
+    """Start sampling live requests for a time window (admin only)"""
+    require_admin(request)
+    if not profiler.start(seconds, interval_ms / 1000):
+        raise HTTPException(status_code=409, detail="A profile capture is already running")
+    return {"success": True, "profile": profiler.status()}
+
+@app.get("/api/admin/profile")
+async def get_profile(request: Request, download: bool = False):
+    """Profile status, or the collapsed-stack profile when download=true (admin only)"""
+    require_admin(request)
+    if not download:
+        return profiler.status()
+    if profiler.running:
+        raise HTTPException(status_code=409, detail="Profile capture still running")
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={"Content-Disposition": 'attachment; filename="coursesync-profile.collapsed"'},
+    )
+
+@app.delete("/api/admin/profile")
+async def stop_profile(request: Request):
+    """Stop a running profile capture early (admin only)"""
+    require_admin(request)
+    profiler.stop()
+    return {"success": True, "profile": profiler.status()}
+
 # Static file serving for React build
 static_dir = os.path.join(os.path.dirname(__file__), "static")
 
 if os.path.exists(static_dir):
-    # Mount assets
-    assets_dir = os.path.join(static_dir, "assets")
-    if os.path.exists(assets_dir):
-        app.mount("/assets", StaticFiles(directory=assets_dir), name="assets")
+    # Built once at startup: file lookups and index.html never hit the disk per request
+    static_manifest = StaticManifest(static_dir)
 
-    # Serve index.html on root
     @app.get("/")
-    async def read_root():
-        return FileResponse(os.path.join(static_dir, "index.html"))
+    async def read_root(request: Request):
+        return static_manifest.serve(
+            "",
+            request.headers.get("accept-encoding", ""),
+            request.headers.get("if-none-match", ""),
+        )
 
     # Catch-all for SPA client-side routing
     @app.get("/{full_path:path}")
-    async def serve_spa(full_path: str):
+    async def serve_spa(full_path: str, request: Request):
         # Don't intercept API calls (though they should be handled above)
         if full_path.startswith("api/"):
             raise HTTPException(status_code=404, detail="API endpoint not found")
-            
-        # Check if acts file exists (like vite.svg)
-        potential_path = os.path.join(static_dir, full_path)
-        if os.path.isfile(potential_path):
-            return FileResponse(potential_path)
-            
-        # Default to index.html
-        return FileResponse(os.path.join(static_dir, "index.html"))
+
+        # Built files (hashed assets, vite.svg...), otherwise index.html for client-side routes
+        return static_manifest.serve(
+            full_path,
+            request.headers.get("accept-encoding", ""),
+            request.headers.get("if-none-match", ""),
+        )
 else:
     @app.get("/")
     async def read_root():
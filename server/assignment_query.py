@@ -0,0 +1,251 @@
+"""Filtered, sorted and paginated assignment queries.
+
+``AssignmentIndex`` keeps the assignments of one snapshot sorted by each
+supported key (built lazily on first use). A commit that edits or adds a
+few assignments updates the previous version's sorted lists in place of a
+re-sort (``AssignmentIndex.updated``); deletes, which shift positions, and
+large changes rebuild. A query walks the index for its sort key from the
+cursor onwards and stops as soon as the page is full; a due-date range on
+the ``due_date`` sort is a bisect, so "due in the next 7 days" touches only
+that slice.
+
+Cursors are keyset cursors (the last row's sort value and list position)
+rather than offsets, so adding or removing assignments between requests
+does not shift later pages; only rows tied on the sort value can move.
+"""
+
+import base64
+import json
+import sys
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+from typing import Dict, List, Optional, Set, Tuple
+
+from .state import incremental
+
+SORT_KEYS = ("due_date", "name", "course", "type", "weight", "progress", "estimated_hours")
+NUMERIC_KEYS = ("weight", "progress", "estimated_hours")
+STATUSES = ("all", "pending", "completed", "overdue")
+MAX_LIMIT = 200
+
+# Assignments without a due date sort last
+NO_DUE_DATE = "9999-12-31"
+
+
+class QueryError(ValueError):
+    """An invalid filter, sort key or cursor."""
+
+
+def _number(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _course_names(assignment: Dict) -> Set[str]:
+    return {name for name in (str(assignment.get("course") or "").lower(),
+                              str(assignment.get("course_code") or "").lower()) if name}
+
+
+def _sort_value(assignment: Dict, key: str):
+    if key == "due_date":
+        return assignment.get("due_date") or NO_DUE_DATE
+    if key in NUMERIC_KEYS:
+        return _number(assignment.get(key))
+    return str(assignment.get(key) or "").lower()
+
+
+def encode_cursor(entry: Tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(entry)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key: str) -> Tuple:
+    """The ``(value, position)`` entry in ``cursor``, checked against sort ``key`` so it compares with the index."""
+    try:
+        value, position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise QueryError("Invalid cursor")
+    numeric = isinstance(value, (int, float)) and not isinstance(value, bool)
+    if (numeric if key in NUMERIC_KEYS else isinstance(value, str)) and type(position) is int:
+        return float(value) if numeric else value, position
+    # e.g. a cursor from a query with another sort key
+    raise QueryError(f"Invalid cursor for sort key '{key}'")
+
+
+class AssignmentIndex:
+    """Per-key sorted ``(value, position)`` lists over one snapshot's assignments."""
+
+    def __init__(self, assignments):
+        self.assignments = assignments
+        self._sorted: Dict[Tuple[str, Optional[str]], List[Tuple]] = {}
+        self._by_course: Dict[str, List[int]] = {}
+        for position, a in enumerate(assignments):
+            for name in _course_names(a):
+                self._by_course.setdefault(name, []).append(position)
+
+    def updated(self, assignments) -> Optional["AssignmentIndex"]:
+        """This index brought forward to the next version's ``assignments``, or None to rebuild.
+
+        Untouched records are shared between versions, so the changed
+        positions are those holding another object (plus appended ones). Each
+        sorted list built so far is copied, loses the old entries of those
+        positions and gets the new ones by bisection.
+        """
+        old = self.assignments
+        if len(assignments) < len(old):
+            return None
+        changed = [p for p, (a, b) in enumerate(zip(old, assignments)) if a is not b]
+        changed += range(len(old), len(assignments))
+        if len(changed) > max(16, len(assignments) // 16):
+            return None
+        index = AssignmentIndex.__new__(AssignmentIndex)
+        index.assignments = assignments
+        index._by_course = dict(self._by_course)
+        index._sorted = {}
+        copied = set()
+        for p in changed:
+            before = _course_names(old[p]) if p < len(old) else set()
+            after = _course_names(assignments[p])
+            for name in before ^ after:
+                if name not in copied:
+                    index._by_course[name] = list(index._by_course.get(name, ()))
+                    copied.add(name)
+                positions = index._by_course[name]
+                if name in after:
+                    insort(positions, p)
+                else:
+                    del positions[bisect_left(positions, p)]
+        for (key, course), entries in self._sorted.items():
+            entries = list(entries)
+            for p in changed:
+                if p < len(old) and (course is None or course in _course_names(old[p])):
+                    del entries[bisect_left(entries, (_sort_value(old[p], key), p))]
+                if course is None or course in _course_names(assignments[p]):
+                    insort(entries, (_sort_value(assignments[p], key), p))
+            index._sorted[(key, course)] = entries
+        return index
+
+    def entries(self, key: str, course: Optional[str] = None) -> List[Tuple]:
+        """Positions (optionally of one course) sorted by ``key``, built on first use."""
+        entries = self._sorted.get((key, course))
+        if entries is None:
+            positions = range(len(self.assignments)) if course is None else self._by_course.get(course, [])
+            entries = sorted((_sort_value(self.assignments[p], key), p) for p in positions)
+            self._sorted[(key, course)] = entries
+        return entries
+
+    def query(
+        self,
+        course: str = "",
+        status: str = "all",
+        assignment_type: str = "",
+        due_from: str = "",
+        due_to: str = "",
+        sort: str = "due_date",
+        cursor: str = "",
+        limit: int = 50,
+        today: Optional[date] = None,
+    ) -> Dict:
+        """One page of matching assignments plus the cursor of the next page."""
+        descending = sort.startswith("-")
+        key = sort.lstrip("-")
+        if key not in SORT_KEYS:
+            raise QueryError(f"Unknown sort key '{key}' (expected one of {', '.join(SORT_KEYS)})")
+        if status not in STATUSES:
+            raise QueryError(f"Unknown status '{status}' (expected one of {', '.join(STATUSES)})")
+        for value in (due_from, due_to):
+            if value:
+                try:
+                    date.fromisoformat(value)
+                except ValueError:
+                    raise QueryError(f"Invalid date '{value}' (expected YYYY-MM-DD)")
+        limit = max(1, min(limit, MAX_LIMIT))
+        today_str = (today or date.today()).isoformat()
+        wanted_type = assignment_type.lower()
+
+        entries = self.entries(key, course.lower() or None)
+        start, stop = 0, len(entries)
+        if key == "due_date":
+            # The date range is a contiguous slice of the due-date order
+            if due_from:
+                start = bisect_left(entries, (due_from, -1))
+            if due_to:
+                stop = bisect_right(entries, (due_to, len(self.assignments)))
+        if cursor:
+            after = decode_cursor(cursor, key)
+            if descending:
+                stop = min(stop, bisect_left(entries, after))
+            else:
+                start = max(start, bisect_right(entries, after))
+        walk = range(stop - 1, start - 1, -1) if descending else range(start, stop)
+
+        page, next_cursor, last = [], None, None
+        for i in walk:
+            position = entries[i][1]
+            a = self.assignments[position]
+            progress = _number(a.get("progress"))
+            due = a.get("due_date") or ""
+            if status == "pending" and progress >= 100:
+                continue
+            if status == "completed" and progress < 100:
+                continue
+            if status == "overdue" and (progress >= 100 or not due or due >= today_str):
+                continue
+            if wanted_type and str(a.get("type") or "").lower() != wanted_type:
+                continue
+            if key != "due_date" and ((due_from and (not due or due < due_from)) or (due_to and (not due or due > due_to))):
+                continue
+            if len(page) == limit:
+                next_cursor = encode_cursor(entries[last])
+                break
+            page.append({**a, "assignment_index": position})
+            last = i
+        return {"assignments": page, "next_cursor": next_cursor}
+
+
+def assignment_index(snapshot) -> AssignmentIndex:
+    """The index for ``snapshot``: updated from the previous version's, or built on first use."""
+    return snapshot.cached("assignment_index", lambda: AssignmentIndex(snapshot.assignments))
+
+
+@incremental("assignment_index")
+def _carry_index(index: AssignmentIndex, previous, snapshot) -> Optional[AssignmentIndex]:
+    return index.updated(snapshot.assignments)
+
+
+def _benchmark(n: int = 50_000, commits: int = 200):
+    """Per-commit cost of updating the sorted lists versus re-sorting them, after one progress edit."""
+    from .model import Assignment
+
+    assignments = tuple(Assignment.from_dict({
+        "name": f"Assignment {i}", "due_date": f"2026-{i % 12 + 1:02d}-{i % 28 + 1:02d}", "weight": i % 30,
+        "course": f"Course {i % 8}", "progress": 0,
+    }) for i in range(n))
+    index = AssignmentIndex(assignments)
+    for key in SORT_KEYS:
+        index.entries(key)
+    rebuild = update = 0.0
+    for i in range(commits):
+        edited = list(assignments)
+        edited[i] = edited[i].copy()
+        edited[i]["progress"] = 50
+        assignments = tuple(edited)
+        started = time.perf_counter()
+        updated = index.updated(assignments)
+        update += time.perf_counter() - started
+        started = time.perf_counter()
+        rebuilt = AssignmentIndex(assignments)
+        for key in SORT_KEYS:
+            rebuilt.entries(key)
+        rebuild += time.perf_counter() - started
+        assert all(updated.entries(key) == rebuilt.entries(key) for key in SORT_KEYS)
+        index = updated
+    print(f"{n} assignments, {len(SORT_KEYS)} sort keys, {commits} commits")
+    print(f"  rebuild: {1000 * rebuild / commits:8.2f} ms per commit")
+    print(f"  update:  {1000 * update / commits:8.2f} ms per commit")
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
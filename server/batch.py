@@ -0,0 +1,242 @@
+"""Batched state mutations applied in a single transaction.
+
+``apply_batch`` runs an ordered list of operations inside one
+``state.locked()`` block: either every operation applies and the state is
+persisted (and its version bumped) once, or the first failing operation
+raises ``BatchError`` and nothing is written.
+
+Operations are dicts with an ``op`` name, registered with ``@operation``.
+``assignment_index`` values (the same name ``/api/progress`` uses) always
+refer to positions in the state as it was before the batch, so deletes
+earlier in the batch don't shift them. Values are type-checked before
+anything is changed; a bad one fails the batch like any other error.
+"""
+
+import math
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .chat import UPDATABLE_FIELDS, course_copy, remove_assignments
+from .events import PROGRESS, TIME_SPENT, record
+from .state import State
+
+OPERATIONS: Dict[str, Callable[["Batch", Dict], Dict]] = {}
+
+# Setting -> accepted type (as in the /api/settings request model)
+SETTINGS_FIELDS = {
+    "hours_per_day": int, "risk_threshold": int, "notification_lead_days": int, "calendar_filename": str,
+    "email_enabled": bool, "email_to": str, "email_schedule_enabled": bool, "notification_poll_seconds": int,
+}
+# Assignment field -> accepted type, for update_assignment and add_assignment
+FIELD_TYPES = {"name": str, "due_date": str, "type": str, "description": str,
+               "estimated_hours": float, "weight": float, "progress": float, "time_spent": float}
+MAX_OPERATIONS = 1000
+
+
+class BatchError(ValueError):
+    def __init__(self, position: int, message: str):
+        super().__init__(message)
+        self.position = position
+
+
+def operation(*names: str):
+    """Register a batch operation handler under one or more names."""
+    def register(handler):
+        for name in names:
+            OPERATIONS[name] = handler
+        return handler
+    return register
+
+
+def find_course(courses: List[Dict], name: str) -> Optional[Dict]:
+    """Course by exact name or code, falling back to a partial name match."""
+    target = name.lower()
+    for course in courses:
+        if course.get("course_name", "").lower() == target or course.get("course_code", "").lower() == target:
+            return course
+    for course in courses:
+        if target in course.get("course_name", "").lower():
+            return course
+    return None
+
+
+def new_assignment(course: Dict, data: Dict) -> Dict:
+    return {
+        "name": data.get("name", "New Assignment"),
+        "type": data.get("type", "homework"),
+        "due_date": data.get("due_date", datetime.now().strftime("%Y-%m-%d")),
+        "weight": data.get("weight", 0),
+        "estimated_hours": data.get("estimated_hours", 1),
+        "time_spent": data.get("time_spent", 0),
+        "description": data.get("description", ""),
+        "course": course.get("course_name"),
+        "course_code": course.get("course_code"),
+        "progress": 0,
+    }
+
+
+def apply_progress(assignment: Dict, progress: Optional[int] = None, time_spent: Optional[float] = None) -> List[Tuple]:
+    """Set progress (clamped, stamping ``completed_at``) and/or add study time.
+
+    Returns the ``(assignment, kind, value)`` events to ``record`` once the
+    transaction has committed.
+    """
+    events = []
+    if progress is not None:
+        old_progress = assignment.get("progress", 0)
+        new_progress = max(0, min(100, progress))
+        assignment["progress"] = new_progress
+        if new_progress == 100 and old_progress < 100:
+            assignment["completed_at"] = datetime.now().isoformat()
+        elif new_progress < 100:
+            # Remove completion timestamp if getting un-completed
+            assignment.pop("completed_at", None)
+        if new_progress != old_progress:
+            events.append((assignment, PROGRESS, new_progress))
+    if time_spent is not None:
+        assignment["time_spent"] = assignment.get("time_spent", 0) + time_spent
+        if time_spent:
+            events.append((assignment, TIME_SPENT, time_spent))
+    return events
+
+
+class Batch:
+    """Working state of one batch inside ``state.locked()``."""
+
+    def __init__(self, state: State):
+        self.state = state
+        # Positions as of the start of the batch
+        self.base = list(state.all_assignments)
+        self.deleted = set()
+        self.added: List[Dict] = []
+        self.events: List[Tuple] = []
+        self.position = 0
+
+    def fail(self, message: str):
+        raise BatchError(self.position, message)
+
+    def value(self, field: str, value, expected: type):
+        """``value`` if it has the ``expected`` type (any finite number for ``float``), else fail."""
+        if expected is float:
+            ok = isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+        elif expected is int:
+            ok = isinstance(value, int) and not isinstance(value, bool)
+        else:
+            ok = isinstance(value, expected)
+        if not ok:
+            self.fail(f"Invalid {field}: {value!r}")
+        return value
+
+    def assignment(self, op: Dict, edit: bool = False) -> Dict:
+        index = op.get("assignment_index")
+        if not isinstance(index, int) or not 0 <= index < len(self.base):
+            self.fail(f"Invalid assignment index: {index!r}")
+        assignment = self.base[index]
+        if index in self.deleted:
+            self.fail(f"Assignment {index} was deleted earlier in this batch")
+        if edit:
+            # Deletes are only applied in finish(), so base positions are still current
+            assignment = self.base[index] = self.state.edit_assignment(index)
+        return assignment
+
+    def finish(self):
+        """Drop deleted assignments from the flat and per-course lists."""
+        if self.deleted:
+            remove_assignments(self.state, sorted(self.deleted))
+
+
+@operation("progress", "time_spent")
+def progress(batch: Batch, op: Dict) -> Dict:
+    progress, time_spent = (
+        None if op.get(field) is None else batch.value(field, op[field], float) for field in ("progress", "time_spent")
+    )
+    assignment = batch.assignment(op, edit=True)
+    batch.events += apply_progress(assignment, progress, time_spent)
+    return {"assignment_index": op["assignment_index"]}
+
+
+@operation("update_assignment")
+def update_assignment(batch: Batch, op: Dict) -> Dict:
+    changes = op.get("changes") or {}
+    if not isinstance(changes, dict):
+        batch.fail(f"Invalid changes: {changes!r}")
+    unknown = sorted(set(changes) - set(UPDATABLE_FIELDS))
+    if unknown:
+        batch.fail(f"Fields cannot be updated: {', '.join(unknown)}")
+    changes = {field: batch.value(field, value, FIELD_TYPES[field]) for field, value in changes.items()}
+    assignment = batch.assignment(op, edit=True)
+    copy = course_copy(batch.state, op["assignment_index"])
+    progress = changes.pop("progress", None)
+    if copy is not None:
+        apply_progress(copy, progress)
+        copy.update(changes)
+    batch.events += apply_progress(assignment, progress)
+    assignment.update(changes)
+    return {"assignment_index": op["assignment_index"]}
+
+
+@operation("delete_assignment")
+def delete_assignment(batch: Batch, op: Dict) -> Dict:
+    batch.assignment(op)
+    batch.deleted.add(op["assignment_index"])
+    return {"assignment_index": op["assignment_index"]}
+
+
+@operation("add_assignment")
+def add_assignment(batch: Batch, op: Dict) -> Dict:
+    course = find_course(batch.state.courses, batch.value("course_name", op.get("course_name") or "", str))
+    if course is None:
+        batch.fail(f"Course '{op.get('course_name')}' not found")
+    data = op.get("assignment") or {}
+    if not isinstance(data, dict):
+        batch.fail(f"Invalid assignment: {data!r}")
+    if not data.get("name"):
+        batch.fail("Assignment name is required")
+    for field, expected in FIELD_TYPES.items():
+        if field in data:
+            batch.value(field, data[field], expected)
+    assignment = new_assignment(course, data)
+    batch.state.edit_course(course).setdefault("assignments", []).append(assignment)
+    batch.state.all_assignments.append(assignment)
+    batch.added.append(assignment)
+    return {"assignment": assignment}
+
+
+@operation("settings")
+def update_settings(batch: Batch, op: Dict) -> Dict:
+    changes = op.get("changes") or {}
+    if not isinstance(changes, dict):
+        batch.fail(f"Invalid changes: {changes!r}")
+    unknown = sorted(set(changes) - set(SETTINGS_FIELDS))
+    if unknown:
+        batch.fail(f"Unknown settings: {', '.join(unknown)}")
+    for field, value in changes.items():
+        batch.value(field, value, SETTINGS_FIELDS[field])
+    batch.state.settings.update(changes)
+    return {"settings": dict(batch.state.settings)}
+
+
+def apply_batch(state: State, operations: List[Dict]) -> List[Dict]:
+    """Apply ``operations`` atomically; raises ``BatchError`` and writes nothing on failure."""
+    if len(operations) > MAX_OPERATIONS:
+        raise BatchError(MAX_OPERATIONS, f"At most {MAX_OPERATIONS} operations per batch")
+    with state.locked():
+        batch = Batch(state)
+        results = []
+        for position, op in enumerate(operations):
+            batch.position = position
+            handler = OPERATIONS.get(op.get("op"))
+            if handler is None:
+                batch.fail(f"Unknown operation: {op.get('op')!r}")
+            results.append({"op": op["op"], **handler(batch, op)})
+        batch.finish()
+        if batch.added:
+            # Report where added assignments ended up after deletes
+            positions = {id(a): i for i, a in enumerate(state.all_assignments)}
+            for result in results:
+                if "assignment" in result:
+                    result["assignment_index"] = positions[id(result["assignment"])]
+        if operations:
+            state.persist()
+    record(state, batch.events)
+    return results
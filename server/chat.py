@@ -0,0 +1,465 @@
+"""Chat routing and the registered chat actions.
+
+``handle_chat`` classifies each message locally (``agent.intents``) and
+sends it down the cheapest path that can answer it: canned replies for
+small talk, server-side answers for lookups, a compact action-extraction
+prompt for changes, a short answer prompt for plain questions, and the full
+assistant prompt only for open-ended reasoning.
+
+Actions are plain functions registered with ``@action("name")``; each gets
+an ``ActionContext`` and returns the message shown to the student.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from .agent.intents import ACTION, LOOKUP, QUESTION, SMALLTALK, classify
+from .agent.metrics import CHAT_ROUTES, LLM_QUOTA_DEGRADED
+from .agent.quota import soft_limited
+from .agent.resilience import ServiceUnavailable
+from .agent.tracing import span
+from .events import PROGRESS, record
+from .model import due_date_of
+from .name_index import name_index
+from .state import State
+
+logger = logging.getLogger(__name__)
+
+ACTIONS: Dict[str, Callable[["ActionContext"], str]] = {}
+
+
+def action(name: str):
+    """Register a chat action handler under ``name``."""
+    def register(handler):
+        ACTIONS[name] = handler
+        return handler
+    return register
+
+
+class ActionContext:
+    def __init__(self, state: State, agent, content: str, data: Dict):
+        self.state = state
+        self.agent = agent
+        # The model's message to the student; action results are appended to it
+        self.content = content
+        self.data = data or {}
+
+    def reply(self, note: str) -> str:
+        return f"{self.content}\n{note}"
+
+    def done(self, note: str) -> str:
+        return f"{self.content}\n\n{note}"
+
+    def clarify(self, resolution) -> str:
+        """Ask the student to pick one target instead of acting on several matches."""
+        options = "\n".join(f"- {label}" for label in resolution.labels())
+        return self.done(f"🤔 '{resolution.query}' matches several {resolution.kind}s. Which one did you mean?\n{options}")
+
+
+def nested_position(flat: List[Dict], position: int, nested: List[Dict]) -> Optional[int]:
+    """Where ``flat[position]`` sits in its course's ``nested`` list, or None.
+
+    Both lists hold the same records until the state is reloaded and copies
+    after that. Copies are paired in order among entries with the same name
+    and due date, so of two identical weekly labs the second in the flat
+    list is the second in the course, and only that one is touched.
+    """
+    record = flat[position]
+    for i, a in enumerate(nested):
+        if a is record:
+            return i
+    key = (record.get("name"), record.get("due_date"))
+    rank = sum(1 for a in flat[:position] if a.get("course") == record.get("course")
+               and (a.get("name"), a.get("due_date")) == key)
+    for i, a in enumerate(nested):
+        if (a.get("name"), a.get("due_date")) == key:
+            if not rank:
+                return i
+            rank -= 1
+    return None
+
+
+def course_copy(state: State, position: int) -> Optional[Dict]:
+    """The course-list copy of ``state.all_assignments[position]`` (None if it is the same record), to modify."""
+    record = state.all_assignments[position]
+    for course in state.courses:
+        nested = course.get("assignments")
+        if course.get("course_name") != record.get("course") or not isinstance(nested, list):
+            continue
+        i = nested_position(state.all_assignments, position, nested)
+        if i is not None and nested[i] is not record:
+            copy = nested[i]
+            return state.edit_course_assignments(course, lambda a: a is copy)[0]
+    return None
+
+
+def remove_assignments(state: State, positions: List[int]):
+    """Delete ``state.all_assignments[p]`` for each of ``positions`` from the flat and course lists."""
+    doomed = set(positions)
+    for course in state.courses:
+        nested = course.get("assignments")
+        if not isinstance(nested, list):
+            continue
+        drop = {nested_position(state.all_assignments, p, nested) for p in doomed
+                if state.all_assignments[p].get("course") == course.get("course_name")} - {None}
+        if drop:
+            course = state.edit_course(course)
+            course["assignments"] = [a for i, a in enumerate(course["assignments"]) if i not in drop]
+    state.all_assignments = [a for i, a in enumerate(state.all_assignments) if i not in doomed]
+
+
+def resolve_course(state: State, course_name: str):
+    """Resolve a course by name or code. Must run inside ``state.locked()``."""
+    with span("scan"):
+        return name_index(state.snapshot()).course(course_name)
+
+
+def resolve_assignment(state: State, assignment_name: str, course_name: str = ""):
+    """Resolve an assignment, scoped to a course when one is named.
+
+    Must run inside ``state.locked()``. Returns a ``Resolution`` (possibly
+    ambiguous) or an error message when nothing matches.
+    """
+    with span("scan"):
+        index = name_index(state.snapshot())
+        course = None
+        if course_name:
+            found_course = index.course(course_name)
+            if found_course.ambiguous:
+                return found_course
+            if not found_course.match:
+                return f"Course '{course_name}' not found"
+            course = index.course_name(found_course.match.position)
+        found = index.assignment(assignment_name, course)
+    if not found.candidates:
+        return f"Assignment '{assignment_name}' not found"
+    return found
+
+
+@action("add_course")
+def add_course(ctx: ActionContext) -> str:
+    syllabus_text = ctx.data.get("syllabus_text", "")
+    if not syllabus_text:
+        # Check if course_name is provided instead (for simple "add course" commands)
+        syllabus_text = ctx.data.get("course_name", "")
+        if not syllabus_text:
+            logger.warning("Add course action but no syllabus text or course name")
+            return ctx.reply("(No syllabus text found to process)")
+
+    try:
+        if syllabus_text.startswith("http"):
+            logger.info("Scraping URL: %s", syllabus_text)
+            scraped = ctx.agent.scrape_course_page(syllabus_text)
+            if not scraped:
+                logger.error("Scraping failed")
+                return ctx.reply("(Failed to scrape the URL provided)")
+            course_data = ctx.agent.parse_syllabus(scraped, "2025-09-01")  # Default date
+        else:
+            logger.debug("Parsing syllabus text: %s", syllabus_text)
+            # For simple commands like "Add Math 101", parse_syllabus handles the string intelligently
+            course_data = ctx.agent.parse_syllabus(syllabus_text, "2025-09-01")
+
+        logger.debug("Parsed course data: %s", course_data)
+        if not course_data:
+            logger.error("Failed to parse course details")
+            return ctx.reply("(Failed to extract course details)")
+
+        course_data.setdefault("assignments", [])
+        for a in course_data["assignments"]:
+            a["course"] = course_data.get("course_name", "N/A")
+            a["course_code"] = course_data.get("course_code", "")
+            a["progress"] = 0
+        with ctx.state.locked():
+            ctx.state.courses.append(course_data)
+            ctx.state.all_assignments.extend(course_data["assignments"])
+            ctx.state.persist()
+        logger.info("Course persisted (chat action)")
+        return ctx.done(f"✅ Automatically added course: {course_data.get('course_name')}")
+    except ServiceUnavailable:
+        # Surfaces as 503 + Retry-After rather than an error message in the chat
+        raise
+    except Exception as e:
+        logger.exception("Error processing add_course action")
+        return ctx.reply(f"(Error adding course: {str(e)})")
+
+
+@action("add_assignment")
+def add_assignment(ctx: ActionContext) -> str:
+    course_target = ctx.data.get("course_name", "")
+    assignment_data = ctx.data.get("assignment", {})
+    if not course_target or not assignment_data:
+        return ctx.reply("(Missing course name or assignment details)")
+
+    state = ctx.state
+    with state.locked():
+        found = resolve_course(state, course_target)
+        if found.ambiguous:
+            return ctx.clarify(found)
+        if not found.match:
+            return ctx.reply(f"(Course '{course_target}' not found)")
+
+        course = state.edit_course(state.courses[found.match.position])
+        new_assignment = {
+            "name": assignment_data.get("name", "New Assignment"),
+            "type": assignment_data.get("type", "homework"),
+            "due_date": assignment_data.get("due_date", datetime.now().strftime("%Y-%m-%d")),
+            "weight": assignment_data.get("weight", 0),
+            "estimated_hours": assignment_data.get("estimated_hours", 1),
+            "description": assignment_data.get("description", ""),
+            "course": course.get("course_name", ""),
+            "course_code": course.get("course_code", ""),
+            "progress": 0
+        }
+        course.setdefault("assignments", []).append(new_assignment)
+        state.all_assignments.append(new_assignment)
+        state.persist()
+        return ctx.done(f"✅ Added assignment '{new_assignment['name']}' to {course['course_name']}")
+
+
+@action("delete_course")
+def delete_course(ctx: ActionContext) -> str:
+    target = ctx.data.get("course_name", "")
+    logger.info("Deleting course target: %s", target)
+    if not target:
+        return ctx.reply("(No course name specified)")
+
+    state = ctx.state
+    with state.locked():
+        found = resolve_course(state, target)
+        if found.ambiguous:
+            return ctx.clarify(found)
+        if not found.match:
+            logger.warning("Course not found: %s", target)
+            return ctx.reply(f"(Could not find course '{target}' to delete)")
+
+        course = state.courses.pop(found.match.position)
+        state.all_assignments = [a for a in state.all_assignments if a.get("course") != course.get("course_name")]
+        state.persist()
+        logger.info("Deleted course %s", course.get("course_name"))
+        return ctx.done(f"🗑️ Deleted course: {course.get('course_name')}")
+
+
+@action("edit_course")
+def edit_course(ctx: ActionContext) -> str:
+    course_target = ctx.data.get("course_name", "")
+    update_data = ctx.data.get("update_data", {})
+    new_name = update_data.get("course_name")
+    new_code = update_data.get("course_code")
+    if not course_target:
+        return ctx.reply("(Missing course name to edit)")
+
+    state = ctx.state
+    with state.locked():
+        found = resolve_course(state, course_target)
+        if found.ambiguous:
+            return ctx.clarify(found)
+        if not found.match:
+            return ctx.reply(f"(Course '{course_target}' not found)")
+
+        course = state.edit_course(state.courses[found.match.position])
+        old_name = course.get("course_name")
+        changes = {k: v for k, v in (("course", new_name), ("course_code", new_code)) if v}
+        if new_name:
+            course["course_name"] = new_name
+        if new_code:
+            course["course_code"] = new_code
+        if changes:
+            for i, a in enumerate(state.all_assignments):
+                if a.get("course") == old_name:
+                    state.edit_assignment(i).update(changes)
+            for a in state.edit_course_assignments(course, lambda a: True):
+                a.update(changes)
+
+        state.persist()
+        return ctx.done(f"✏️ Updated course: {course.get('course_name')}")
+
+
+@action("delete_assignment")
+def delete_assignment(ctx: ActionContext) -> str:
+    assignment_name = ctx.data.get("assignment_name", "")
+    if not assignment_name:
+        return ctx.reply("(Missing assignment name)")
+
+    state = ctx.state
+    with state.locked():
+        found = resolve_assignment(state, assignment_name, ctx.data.get("course_name", ""))
+        if isinstance(found, str):
+            return ctx.reply(f"({found})")
+        if found.ambiguous:
+            return ctx.clarify(found)
+
+        removed = state.all_assignments[found.match.position]
+        remove_assignments(state, [found.match.position])
+        state.persist()
+        return ctx.done(f"🗑️ Deleted assignment: {removed.get('name')}")
+
+
+UPDATABLE_FIELDS = ("name", "due_date", "type", "description", "estimated_hours", "weight", "progress")
+
+
+@action("update_assignment")
+def update_assignment(ctx: ActionContext) -> str:
+    assignment_target = ctx.data.get("assignment_name", "")
+    if not assignment_target:
+        return ctx.reply("(Missing assignment name)")
+    changes = {k: v for k, v in ctx.data.get("update_data", {}).items() if v is not None and k in UPDATABLE_FIELDS}
+
+    state = ctx.state
+    with state.locked():
+        found = resolve_assignment(state, assignment_target, ctx.data.get("course_name", ""))
+        if isinstance(found, str):
+            return ctx.reply(f"({found})")
+        if found.ambiguous:
+            return ctx.clarify(found)
+        if not changes:
+            return ctx.reply("(Nothing to update)")
+
+        target = state.edit_assignment(found.match.position)
+        copy = course_copy(state, found.match.position)
+        original = dict(target)
+        target.update(changes)
+        if copy is not None:
+            copy.update(changes)
+        state.persist()
+    if "progress" in changes and changes["progress"] != original.get("progress"):
+        record(state, [(target, PROGRESS, changes["progress"])])
+    return ctx.done(f"✅ Updated assignment: {target.get('name')}")
+
+
+# Settings the student may change from chat
+CHAT_SETTINGS = ("hours_per_day", "notification_lead_days", "risk_threshold")
+
+
+@action("update_settings")
+def update_settings(ctx: ActionContext) -> str:
+    changes = {}
+    for key, value in (ctx.data.get("settings") or {}).items():
+        if key not in CHAT_SETTINGS or value is None:
+            continue
+        try:
+            changes[key] = int(value)
+        except (TypeError, ValueError):
+            return ctx.reply(f"(Invalid value for {key}: {value!r})")
+    if not changes:
+        return ctx.reply("(Nothing to update)")
+
+    state = ctx.state
+    with state.locked():
+        state.settings.update(changes)
+        state.persist()
+    summary = ", ".join(f"{key.replace('_', ' ')} = {value}" for key, value in changes.items())
+    return ctx.done(f"⚙️ Updated settings: {summary}")
+
+
+@action("chat")
+def plain_chat(ctx: ActionContext) -> str:
+    return ctx.content
+
+
+def dispatch(result, state: State, agent) -> str:
+    """Run the action an LLM reply asks for; plain replies are returned as is."""
+    if not isinstance(result, dict) or "action" not in result:
+        return str(result)
+    name = result["action"]
+    logger.info("Action detected: %s", name)
+    handler = ACTIONS.get(name, plain_chat)
+    with span("dispatch"):
+        return handler(ActionContext(state, agent, result.get("content", ""), result.get("data", {})))
+
+
+SMALLTALK_REPLY = "Hi! 👋 Ask me what's due, how you're doing, or tell me to add, edit or remove a course or assignment."
+
+
+BUDGET_REPLY = "⚠️ You've reached your AI usage budget for now, so here is what I can tell you without it:"
+
+
+def _answer_due(snap, days: int) -> str:
+    today = datetime.now().date()
+    until = today + timedelta(days=days)
+    due = []
+    for a in snap.assignments:
+        if a.get("progress", 0) >= 100:
+            continue
+        when = due_date_of(a)
+        if when is None:
+            continue
+        if today <= when <= until:
+            due.append((when, a))
+    window = "today" if days == 0 else "by tomorrow" if days == 1 else f"in the next {days} days"
+    if not due:
+        return f"🎉 Nothing is due {window}."
+    due.sort(key=lambda item: item[0])
+    lines = [f"📅 Due {window}:"]
+    for when, a in due:
+        lines.append(f"- {a.get('name')} ({a.get('course', '')}) — {when.strftime('%a %b %d')}, {a.get('progress', 0)}% done")
+    return "\n".join(lines)
+
+
+def _answer_courses(snap) -> str:
+    if not snap.courses:
+        return "You haven't added any courses yet."
+    lines = [f"📚 You have {len(snap.courses)} course(s):"]
+    for c in snap.courses:
+        code = f" ({c.get('course_code')})" if c.get("course_code") else ""
+        lines.append(f"- {c.get('course_name', '')}{code}")
+    return "\n".join(lines)
+
+
+def _answer_progress(snap) -> str:
+    if not snap.assignments:
+        return "You don't have any assignments yet."
+    done = sum(1 for a in snap.assignments if a.get("progress", 0) >= 100)
+    average = sum(a.get("progress", 0) for a in snap.assignments) / len(snap.assignments)
+    lines = [f"📈 {done} of {len(snap.assignments)} assignments complete (average progress {average:.0f}%)."]
+    for c in snap.courses:
+        items = [a for a in snap.assignments if a.get("course") == c.get("course_name")]
+        if items:
+            course_done = sum(1 for a in items if a.get("progress", 0) >= 100)
+            lines.append(f"- {c.get('course_name')}: {course_done}/{len(items)}")
+    return "\n".join(lines)
+
+
+def _answer_count(snap, what: str) -> str:
+    if what in ("courses", "classes"):
+        return f"You have {len(snap.courses)} course(s)."
+    pending = sum(1 for a in snap.assignments if a.get("progress", 0) < 100)
+    return f"You have {len(snap.assignments)} assignment(s), {pending} still open."
+
+
+def answer_lookup(intent, snap) -> str:
+    if intent.lookup == "due":
+        return _answer_due(snap, intent.params.get("days", 7))
+    if intent.lookup == "courses":
+        return _answer_courses(snap)
+    if intent.lookup == "progress":
+        return _answer_progress(snap)
+    return _answer_count(snap, intent.params.get("what", "assignments"))
+
+
+def handle_chat(question: str, history: List[Dict], state: State, agent) -> Dict:
+    """Route one chat message and return the API response."""
+    snap = state.snapshot()
+    with span("classify"):
+        intent = classify(question, name_index(snap))
+    CHAT_ROUTES.inc(route=intent.kind)
+    logger.info("Chat intent: %s", intent)
+
+    if intent.kind == SMALLTALK:
+        return {"success": True, "response": SMALLTALK_REPLY}
+    if intent.kind == LOOKUP:
+        return {"success": True, "response": answer_lookup(intent, snap)}
+
+    if intent.kind != ACTION and soft_limited():
+        # Past the soft token budget questions get the local summary; actions still use the LLM
+        LLM_QUOTA_DEGRADED.inc(operation="chat")
+        return {"success": True, "response": f"{BUDGET_REPLY}\n\n{_answer_due(snap, 7)}", "degraded": True}
+
+    if intent.kind == ACTION:
+        result = agent.extract_action(question, list(snap.courses), list(snap.assignments), history)
+    elif intent.kind == QUESTION:
+        result = agent.answer(question, list(snap.courses), list(snap.assignments), history)
+    else:
+        result = agent.chat(question, list(snap.courses), list(snap.assignments), history)
+    logger.debug("Agent response: %s", result)
+    return {"success": True, "response": dispatch(result, state, agent)}
@@ -0,0 +1,146 @@
+"""Negotiated gzip/brotli compression for API responses.
+
+Pure ASGI middleware: a response is compressed when it has a compressible
+content type, isn't encoded already (precompressed static files pass
+through untouched) and its body is at least
+``COMPRESS_MIN_BYTES`` long. Bodies sent in several chunks (everything
+behind ``@app.middleware`` arrives that way) are buffered up to
+``COMPRESS_MAX_BYTES``; larger ones are streamed uncompressed. Brotli is
+used when the ``brotli`` package is installed and the client prefers it;
+otherwise gzip. ``brotli`` is optional and not in requirements.txt: without
+it ``br`` is never offered.
+"""
+
+import gzip
+import os
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+# Bodies streamed in several chunks are buffered up to this size, then sent uncompressed
+COMPRESS_MAX_BYTES = int(os.getenv("COMPRESS_MAX_BYTES", str(8 * 1024 * 1024)))
+# Dynamic responses favor speed over ratio
+GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """``{"gzip": 1.0, "br": 0.8}`` from an ``Accept-Encoding`` header."""
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    accepted = accepted_encodings(header)
+    wildcard = accepted.get("*", 0.0)
+    options = []
+    if brotli is not None:
+        options.append(("br", accepted.get("br", wildcard)))
+    options.append(("gzip", accepted.get("gzip", wildcard)))
+    # Highest q wins; on ties brotli goes first
+    best = max(options, key=lambda option: option[1])
+    return best[0] if best[1] > 0 else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def vary(headers) -> bytes:
+    """One ``Vary`` value: the response's own fields plus ``Accept-Encoding``."""
+    fields = [f.strip() for k, v in headers if k.lower() == b"vary" for f in v.split(b",") if f.strip()]
+    if not any(f.lower() == b"accept-encoding" for f in fields):
+        fields.append(b"Accept-Encoding")
+    return b", ".join(fields)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES, maximum_size: int = COMPRESS_MAX_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.maximum_size = maximum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        chunks = []
+        buffered = 0
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, buffered, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                headers = {k.lower(): v for k, v in start.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if b"content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    passthrough = True
+                    await send(start)
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            buffered += len(chunks[-1])
+            if message.get("more_body", False):
+                if buffered > self.maximum_size:
+                    # Too big to hold in memory: stream it as is
+                    passthrough = True
+                    await send(start)
+                    for chunk in chunks:
+                        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                return
+
+            body = b"".join(chunks)
+            if len(body) < self.minimum_size:
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+            compressed = compress(body, encoding)
+            raw_headers = [(k, v) for k, v in start.get("headers", []) if k.lower() not in (b"content-length", b"vary")]
+            raw_headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", vary(start.get("headers", []))),
+            ]
+            await send({**start, "headers": raw_headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,185 @@
+"""Response encoding: fast JSON and the compact state format.
+
+``FastJSONResponse`` serializes with orjson when it is installed (falling
+back to compact ``json.dumps``, which gives the same JSON; orjson is an
+optional speed-up and not in requirements.txt). Routes that build large payloads return it
+directly, which also skips FastAPI's ``jsonable_encoder`` pass.
+
+The compact state format sends every course once and has assignments refer
+to it by ``course_id`` instead of repeating the course name and code on
+every row and again inside each course. ``expandState`` in
+``client/src/services/api.js`` restores the regular shape.
+
+The summary format is what the dashboard shows: courses without their
+assignments, totals, and the days something was completed on.
+"""
+
+import json
+from datetime import date
+from typing import Any, Dict, List
+
+from fastapi.responses import JSONResponse
+
+from .model import json_default
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+COMPACT_FORMAT = "compact-v1"
+
+
+def _default(value):
+    try:
+        return json_default(value)
+    except TypeError:
+        return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(JSONResponse):
+    """A JSON response whose body was already encoded (e.g. cached per snapshot)."""
+
+    def render(self, content: bytes) -> bytes:
+        return content
+
+
+def course_progress(assignments: List[Dict]) -> int:
+    if not assignments:
+        return 0
+    completed = sum(1 for a in assignments if a.get("progress", 0) == 100)
+    return round((completed / len(assignments)) * 100)
+
+
+def state_stats(snap) -> Dict:
+    completed = sum(1 for a in snap.assignments if a.get("progress", 0) == 100)
+    return {
+        "total_courses": len(snap.courses),
+        "total_assignments": len(snap.assignments),
+        "completed_assignments": completed,
+        "pending_assignments": sum(1 for a in snap.assignments if a.get("progress", 0) < 100),
+    }
+
+
+def full_state(snap) -> Dict:
+    """The ``/api/state`` payload: courses with their assignments plus the flat list."""
+    by_course: Dict[str, List[Dict]] = {}
+    for a in snap.assignments:
+        by_course.setdefault(a.get("course"), []).append(a)
+    courses = []
+    for course in snap.courses:
+        course_assignments = by_course.get(course.get("course_name", ""), [])
+        course_copy = course.copy()
+        course_copy["progress"] = course_progress(course_assignments)
+        course_copy["assignments"] = course_assignments
+        courses.append(course_copy)
+    return {
+        "courses": courses,
+        "assignments": snap.assignments,
+        "settings": snap.settings,
+        "stats": state_stats(snap),
+    }
+
+
+def compact_state(snap) -> Dict:
+    """The same state with each course sent once and referenced by position."""
+    course_ids: Dict[str, int] = {}
+    courses = []
+    for i, course in enumerate(snap.courses):
+        course_ids.setdefault(course.get("course_name", ""), i)
+        courses.append({k: v for k, v in course.items() if k != "assignments"})
+
+    by_course: Dict[int, List[Dict]] = {}
+    assignments = []
+    for a in snap.assignments:
+        course_id = course_ids.get(a.get("course"))
+        if course_id is None:
+            # Orphaned assignment: keep its course strings
+            row = dict(a)
+        else:
+            row = {k: v for k, v in a.items() if k != "course"}
+            if row.get("course_code", "") == (snap.courses[course_id].get("course_code") or ""):
+                # Only dropped when the course supplies the same code
+                row.pop("course_code", None)
+            row["course_id"] = course_id
+            by_course.setdefault(course_id, []).append(a)
+        assignments.append(row)
+    for course_id, course in enumerate(courses):
+        course["progress"] = course_progress(by_course.get(course_id, []))
+
+    return {
+        "format": COMPACT_FORMAT,
+        "courses": courses,
+        "assignments": assignments,
+        "settings": snap.settings,
+        "stats": state_stats(snap),
+    }
+
+
+def _number(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def summary_state(snap, today: str) -> Dict:
+    """Courses with progress and assignment counts plus dashboard totals, without the assignments."""
+    by_course: Dict[str, List[Dict]] = {}
+    for a in snap.assignments:
+        by_course.setdefault(a.get("course"), []).append(a)
+    courses = []
+    for course in snap.courses:
+        course_assignments = by_course.get(course.get("course_name", ""), [])
+        summary = {k: v for k, v in course.items() if k != "assignments"}
+        summary["progress"] = course_progress(course_assignments)
+        summary["assignment_count"] = len(course_assignments)
+        courses.append(summary)
+
+    completion_dates = set()
+    overdue = progress = hours = 0
+    for a in snap.assignments:
+        done = _number(a.get("progress"))
+        due = a.get("due_date") or ""
+        progress += done
+        hours += _number(a.get("estimated_hours") or 1) * done / 100
+        if done < 100 and due and due < today:
+            overdue += 1
+        # Pre-existing completions without a timestamp count on their due date
+        completed_on = a.get("completed_at") or (due if done == 100 else "")
+        if completed_on:
+            completion_dates.add(str(completed_on)[:10])
+    total = len(snap.assignments)
+    return {
+        "courses": courses,
+        "settings": snap.settings,
+        "stats": {
+            **state_stats(snap),
+            "overdue_assignments": overdue,
+            "average_progress": round(progress / total) if total else 0,
+            "hours_tracked": round(hours),
+        },
+        "completion_dates": sorted(completion_dates),
+    }
+
+
+def encoded_state(snap, compact: bool = False, summary: bool = False) -> bytes:
+    """The serialized state payload, encoded once per snapshot version."""
+    if summary:
+        # Overdue counts change at midnight, so the cached body is per day too
+        today = date.today().isoformat()
+        return snap.cached(f"state_json_summary:{today}", lambda: dumps(summary_state(snap, today)))
+    if compact:
+        return snap.cached("state_json_compact", lambda: dumps(compact_state(snap)))
+    return snap.cached("state_json", lambda: dumps(full_state(snap)))
@@ -0,0 +1,141 @@
+"""Append-only progress and study-time event log.
+
+Every progress change and every study session is appended to
+``events.bin`` in the tenant's data directory as a fixed-width record
+(timestamp, assignment key, value, kind). A whole batch of records goes
+out in one ``O_APPEND`` write, so workers sharing a data directory never
+interleave partial records.
+
+Readers get the log as columns (one typed array per field), loaded
+incrementally: only bytes appended since the last read are decoded. With
+numpy installed the columns are numpy arrays; otherwise ``array.array``.
+numpy is an optional speed-up and not in requirements.txt; everything
+works without it.
+
+Assignments are keyed by a CRC32 of course and name, so the log needs no
+id table; ``assignment_key`` maps a current assignment to its events.
+
+Open logs (with their decoded columns) are kept for at most
+``MAX_TENANTS_IN_MEMORY`` tenants, least recently used first out, like the
+tenant registry; an evicted log is read from disk again when needed.
+"""
+
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional: pip install numpy
+    np = None
+
+logger = logging.getLogger(__name__)
+
+PROGRESS = 0
+TIME_SPENT = 1
+
+# timestamp (epoch seconds), assignment key, value (progress % or hours), kind
+RECORD = struct.Struct("<dIfB3x")
+COLUMNS = (("ts", "d"), ("key", "I"), ("value", "f"), ("kind", "B"))
+
+if np is not None:
+    DTYPE = np.dtype({
+        "names": ["ts", "key", "value", "kind"],
+        "formats": ["<f8", "<u4", "<f4", "u1"],
+        "offsets": [0, 8, 12, 16],
+        "itemsize": RECORD.size,
+    })
+
+
+def assignment_key(assignment: Dict) -> int:
+    return zlib.crc32(f"{assignment.get('course') or ''}\x00{assignment.get('name') or ''}".encode("utf-8"))
+
+
+class EventLog:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._offset = 0
+        self._columns = self._empty()
+
+    @staticmethod
+    def _empty():
+        if np is not None:
+            return {name: np.empty(0, dtype=DTYPE[name]) for name, _ in COLUMNS}
+        return {name: array(code) for name, code in COLUMNS}
+
+    def append(self, events: Iterable[Tuple[Dict, int, float]]):
+        """Record ``(assignment, kind, value)`` events, stamped now."""
+        now = time.time()
+        data = b"".join(RECORD.pack(now, assignment_key(a), value, kind) for a, kind, value in events)
+        if not data:
+            return
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def columns(self) -> Dict:
+        """All events so far as ``{"ts", "key", "value", "kind"}`` column arrays."""
+        with self._lock:
+            try:
+                with open(self.path, "rb") as f:
+                    f.seek(self._offset)
+                    data = f.read()
+            except FileNotFoundError:
+                return self._columns
+            # Ignore a record that is still being written
+            data = data[: len(data) - len(data) % RECORD.size]
+            if data:
+                self._offset += len(data)
+                if np is not None:
+                    rows = np.frombuffer(data, dtype=DTYPE)
+                    self._columns = {
+                        name: np.concatenate([self._columns[name], rows[name]]) for name, _ in COLUMNS
+                    }
+                else:
+                    # Extend copies so arrays handed to earlier readers never change under them
+                    columns = {name: array(code, self._columns[name]) for name, code in COLUMNS}
+                    for ts, key, value, kind in RECORD.iter_unpack(data):
+                        columns["ts"].append(ts)
+                        columns["key"].append(key)
+                        columns["value"].append(value)
+                        columns["kind"].append(kind)
+                    self._columns = columns
+            return self._columns
+
+
+MAX_LOGS = max(1, int(os.getenv("MAX_TENANTS_IN_MEMORY", "1000")))
+_logs: "OrderedDict[str, EventLog]" = OrderedDict()
+_logs_lock = threading.Lock()
+
+
+def event_log(state) -> EventLog:
+    """The event log for a tenant's ``State``."""
+    path = os.path.join(state.data_dir, "events.bin")
+    with _logs_lock:
+        log = _logs.get(path)
+        if log is None:
+            log = _logs[path] = EventLog(path)
+            while len(_logs) > MAX_LOGS:
+                _logs.popitem(last=False)
+        else:
+            _logs.move_to_end(path)
+        return log
+
+
+def record(state, events: List[Tuple[Dict, int, float]]):
+    """Append events after their transaction committed; never fails the request."""
+    if not events:
+        return
+    try:
+        event_log(state).append(events)
+    except Exception:
+        logger.exception("Error recording progress events")
@@ -0,0 +1,157 @@
+"""Logging setup for the web server.
+
+Request handlers only put records on an in-memory queue; a background
+``QueueListener`` thread does the formatting-to-disk work on a size-rotated
+file, so log I/O never shows up in request latency.
+
+Size rotation renames files, which is only safe with one writer. With
+several workers (``WEB_CONCURRENCY`` > 1) each one writes its own file,
+named with its PID (``server_debug.1234.log``). ``LOG_ROTATION=external``
+instead keeps one shared file and reopens it when it's rotated by an
+outside tool such as logrotate.
+
+Records dropped because the queue was full are counted in
+``coursesync_log_records_dropped_total``, and a warning with the count is
+logged once the queue has room again.
+
+Environment variables:
+    COURSESYNC_ENV          development (default) or production
+    LOG_LEVEL               overrides the per-environment level (DEBUG in development, INFO in production)
+    LOG_FILE                log file path (default server_debug.log; per worker with several workers)
+    LOG_ROTATION            size (default) or external
+    LOG_MAX_BYTES           rotate after this many bytes (default 10 MB)
+    LOG_BACKUP_COUNT        rotated files to keep (default 5)
+    LOG_MAX_PAYLOAD         truncate messages longer than this many characters (default 2000)
+    LOG_DEBUG_SAMPLE_RATE   fraction of DEBUG records kept (default 1.0 in development, 0.1 in production)
+    LOG_QUEUE_SIZE          records buffered before new ones are dropped (default 10000)
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+
+from .agent.metrics import LOG_RECORDS_DROPPED
+
+ENV_DEFAULTS = {
+    "development": {"level": "DEBUG", "debug_sample_rate": 1.0},
+    "production": {"level": "INFO", "debug_sample_rate": 0.1},
+}
+
+_listener = None
+
+
+class TruncatingFilter(logging.Filter):
+    """Cap the rendered message size so huge payloads don't bloat the log."""
+
+    def __init__(self, max_chars: int):
+        super().__init__()
+        self.max_chars = max_chars
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.max_chars <= 0:
+            return True
+        message = record.getMessage()
+        if len(message) > self.max_chars:
+            record.msg = f"{message[:self.max_chars]}... [truncated {len(message) - self.max_chars} chars]"
+            record.args = None
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep only a random fraction of DEBUG records; other levels always pass."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    dropped = 0
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        # Drops not yet reported in the log
+        self._unreported = 0
+
+    def enqueue(self, record):
+        try:
+            if self._unreported:
+                self._report_drops()
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+            self._unreported += 1
+            LOG_RECORDS_DROPPED.inc()
+
+    def _report_drops(self):
+        count, self._unreported = self._unreported, 0
+        warning = logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0, "Dropped %d log records: the log queue was full", (count,), None,
+        )
+        try:
+            self.queue.put_nowait(self.prepare(warning))
+        except queue.Full:
+            self._unreported += count
+            raise
+
+
+def log_path(path: str, workers: int) -> str:
+    """``path`` with the process ID before the extension when several workers share it."""
+    if workers <= 1:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{os.getpid()}{ext}"
+
+
+def configure_logging() -> logging.handlers.QueueListener:
+    """Install the queue handler on the root logger and start the writer thread.
+
+    Safe to call more than once; later calls return the running listener.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    env = os.getenv("COURSESYNC_ENV", "development").lower()
+    defaults = ENV_DEFAULTS.get(env, ENV_DEFAULTS["development"])
+    level = getattr(logging, os.getenv("LOG_LEVEL", defaults["level"]).upper(), logging.INFO)
+    sample_rate = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", defaults["debug_sample_rate"]))
+    max_payload = int(os.getenv("LOG_MAX_PAYLOAD", "2000"))
+
+    path = os.getenv("LOG_FILE", "server_debug.log")
+    if os.getenv("LOG_ROTATION", "size").lower() == "external":
+        file_handler = logging.handlers.WatchedFileHandler(path, encoding="utf-8", delay=True)
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_path(path, int(os.getenv("WEB_CONCURRENCY", "1"))),
+            maxBytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            backupCount=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+            encoding="utf-8",
+            delay=True,
+        )
+    file_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+
+    log_queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+    queue_handler = DroppingQueueHandler(log_queue)
+    # Sampling runs first so dropped records are never formatted
+    queue_handler.addFilter(DebugSamplingFilter(sample_rate))
+    queue_handler.addFilter(TruncatingFilter(max_payload))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
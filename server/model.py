@@ -0,0 +1,261 @@
+"""Compact in-memory records for assignments.
+
+Assignments loaded from the store (or added by handlers as plain dicts) are
+turned into ``Assignment`` records when a ``Snapshot`` is built:
+
+- one slot per known field instead of a dict per assignment; unknown keys
+  (extra fields from the LLM) go to a small side dict
+- ``type``, ``course`` and ``course_code`` are interned, so thousands of rows
+  share one string per course
+- a ``"YYYY-MM-DD"`` ``due_date`` is kept as a date ordinal
+  (``due_ordinal``); date math needs no ``strptime``, and the string is
+  rebuilt on access. Any other value (``"TBA"``, a legacy ``0``) is kept
+  as it is
+- a dict that appears in both ``course["assignments"]`` and the flat list
+  becomes one shared record. Records are matched by identity only: two
+  assignments with the same name and due date stay separate
+
+Records are mutable mappings, so code written against dicts (``a.get(...)``,
+``a["progress"] = ...``, ``a.update(...)``) keeps working. ``json_default``
+converts them back to dicts at the API and storage boundaries.
+
+``python -m server.model`` compares the memory of 100k assignments as
+dicts and as records.
+"""
+
+import sys
+from collections.abc import MutableMapping
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+# Mapping key -> slot
+_SLOTS = {
+    "name": "name",
+    "type": "type",
+    "due_date": "due",
+    "weight": "weight",
+    "estimated_hours": "estimated_hours",
+    "time_spent": "time_spent",
+    "description": "description",
+    "course": "course",
+    "course_code": "course_code",
+    "progress": "progress",
+    "completed_at": "completed_at",
+}
+_INTERNED = frozenset(("type", "course", "course_code"))
+
+
+class _Missing:
+    """Marks a field the assignment doesn't have (as opposed to one set to None)."""
+
+    def __repr__(self):
+        return "<missing>"
+
+    def __reduce__(self):
+        # Stays a singleton through pickle/deepcopy
+        return "_MISSING"
+
+
+_MISSING = _Missing()
+
+
+def _ordinal(value) -> Optional[int]:
+    """``"YYYY-MM-DD"`` as a date ordinal; None for anything else."""
+    if type(value) is str and len(value) == 10:
+        try:
+            return date.fromisoformat(value).toordinal()
+        except ValueError:
+            pass
+    return None
+
+
+def _due_slot(value):
+    # An int is always an ordinal we parsed; other values are boxed so a raw
+    # int (a legacy ``due_date: 0``) is never mistaken for one
+    ordinal = _ordinal(value)
+    return ordinal if ordinal is not None else (value,)
+
+
+class Assignment(MutableMapping):
+    __slots__ = tuple(_SLOTS.values()) + ("_extra",)
+
+    @classmethod
+    def from_dict(cls, data) -> "Assignment":
+        record = cls.__new__(cls)
+        matched = 0
+        for key, slot in _SLOTS.items():
+            value = data.get(key, _MISSING)
+            if value is not _MISSING:
+                matched += 1
+                if slot == "due":
+                    value = _due_slot(value)
+                elif key in _INTERNED and type(value) is str:
+                    value = sys.intern(value)
+            object.__setattr__(record, slot, value)
+        record._extra = {k: v for k, v in data.items() if k not in _SLOTS} if matched < len(data) else None
+        return record
+
+    @property
+    def due_ordinal(self) -> Optional[int]:
+        return self.due if type(self.due) is int else None
+
+    def get(self, key, default=None):
+        slot = _SLOTS.get(key)
+        if slot is None:
+            return self._extra.get(key, default) if self._extra else default
+        value = getattr(self, slot)
+        if value is _MISSING:
+            return default
+        if slot == "due":
+            return date.fromordinal(value).isoformat() if type(value) is int else value[0]
+        return value
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        slot = _SLOTS.get(key)
+        if slot is None:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+            return
+        if slot == "due":
+            value = _due_slot(value)
+        elif key in _INTERNED and type(value) is str:
+            value = sys.intern(value)
+        setattr(self, slot, value)
+
+    def __delitem__(self, key):
+        slot = _SLOTS.get(key)
+        if slot is None:
+            if not self._extra or key not in self._extra:
+                raise KeyError(key)
+            del self._extra[key]
+            return
+        if getattr(self, slot) is _MISSING:
+            raise KeyError(key)
+        setattr(self, slot, _MISSING)
+
+    def __contains__(self, key):
+        slot = _SLOTS.get(key)
+        if slot is None:
+            return bool(self._extra) and key in self._extra
+        return getattr(self, slot) is not _MISSING
+
+    def __iter__(self):
+        for key, slot in _SLOTS.items():
+            if getattr(self, slot) is not _MISSING:
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for slot in _SLOTS.values() if getattr(self, slot) is not _MISSING) + len(self._extra or ())
+
+    def copy(self) -> "Assignment":
+        record = Assignment.__new__(Assignment)
+        for slot in _SLOTS.values():
+            object.__setattr__(record, slot, getattr(self, slot))
+        record._extra = dict(self._extra) if self._extra else None
+        return record
+
+    def to_dict(self) -> Dict:
+        return {key: self.get(key) for key in self}
+
+    def __repr__(self):
+        return f"Assignment({self.to_dict()!r})"
+
+
+def due_date_of(assignment) -> Optional[date]:
+    """An assignment's due date, without parsing when it is a record."""
+    if type(assignment) is Assignment:
+        ordinal = assignment.due_ordinal
+        return date.fromordinal(ordinal) if ordinal is not None else None
+    ordinal = _ordinal(assignment.get("due_date"))
+    return date.fromordinal(ordinal) if ordinal is not None else None
+
+
+def json_default(value):
+    """``default=`` hook for json/orjson: records serialize as plain dicts."""
+    if isinstance(value, Assignment):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def compact_records(courses, assignments) -> Tuple[List[Dict], List[Assignment]]:
+    """Convert the flat and per-course assignment lists to records.
+
+    A dict found in several lists becomes one record, so sharing between
+    ``course["assignments"]`` and the flat list survives; separate dicts stay
+    separate records even when their contents are equal. Input dicts are never
+    modified: a course whose nested list changes is copied.
+    """
+    memo: Dict[int, Assignment] = {}
+
+    def record(a) -> Assignment:
+        if type(a) is Assignment:
+            return a
+        r = memo.get(id(a))
+        if r is None:
+            r = memo[id(a)] = Assignment.from_dict(a)
+        return r
+
+    records = [record(a) for a in assignments]
+    compacted = []
+    for course in courses:
+        nested = course.get("assignments")
+        if isinstance(nested, list) and any(type(a) is not Assignment for a in nested):
+            course = {**course, "assignments": [record(a) for a in nested]}
+        compacted.append(course)
+    return compacted, records
+
+
+def _benchmark(n: int = 100_000):
+    import json
+    import random
+    import tracemalloc
+
+    rng = random.Random(0)
+    courses = [(f"Course {i}", f"C{100 + i}") for i in range(8)]
+    flat = []
+    for i in range(n):
+        name, code = courses[i % len(courses)]
+        flat.append({
+            "name": f"Assignment {i}", "type": rng.choice(["homework", "exam", "project", "quiz"]),
+            "due_date": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", "weight": rng.randint(1, 30),
+            "estimated_hours": rng.randint(1, 20), "time_spent": 0, "description": "",
+            "course": name, "course_code": code, "progress": rng.choice([0, 25, 50, 100]),
+        })
+    # What the store hands over: the flat list plus a separate nested copy per course
+    payload = json.dumps({
+        "courses": [{"course_name": name, "course_code": code, "assignments": [a for a in flat if a["course"] == name]}
+                    for name, code in courses],
+        "assignments": flat,
+    })
+    del flat
+
+    def retained(build) -> int:
+        """Bytes still allocated once the loaded JSON is dropped and only ``build``'s result is kept."""
+        tracemalloc.start()
+        data = json.loads(payload)
+        kept = build(data)
+        del data
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del kept
+        return size
+
+    dict_bytes = retained(lambda data: (data["courses"], data["assignments"]))
+    record_bytes = retained(lambda data: compact_records(data["courses"], data["assignments"]))
+    print(f"{n} assignments")
+    print(f"  dicts:   {dict_bytes / 1e6:8.1f} MB")
+    print(f"  records: {record_bytes / 1e6:8.1f} MB")
+    print(f"  reduction: {dict_bytes / record_bytes:.1f}x")
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
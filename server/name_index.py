@@ -0,0 +1,219 @@
+"""Fuzzy name resolution for chat actions.
+
+Chat actions name their target loosely ("math", "CS 101", "quiz 2"). The
+``NameIndex`` maps query tokens to courses and assignments through an
+inverted index, scores only the candidates that share a token (or a close
+spelling of one) with the query, and reports ambiguity instead of picking
+the first substring match.
+
+Build one per committed snapshot with ``name_index(snapshot)``; results are
+positions into ``snapshot.courses`` / ``snapshot.assignments``, which are
+also the positions in a transaction's working copy.
+"""
+
+import heapq
+import re
+from bisect import bisect_left
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Set, Tuple
+
+MIN_SCORE = 0.5
+# Two candidates closer than this are reported as ambiguous
+AMBIGUITY_MARGIN = 0.1
+
+_TOKEN = re.compile(r"[a-z]+|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word and number tokens; "CS101" yields "cs", "101" and "cs101"."""
+    text = (text or "").lower()
+    tokens = _TOKEN.findall(text)
+    compact = re.sub(r"[^a-z0-9]", "", text)
+    if len(tokens) > 1 and len(compact) <= 10:
+        # Course codes are written "CS101", "CS 101" and "cs-101"
+        tokens.append(compact)
+    return tokens
+
+
+class Match:
+    """A scored candidate: ``position`` into the snapshot list plus a display label."""
+
+    __slots__ = ("position", "score", "label")
+
+    def __init__(self, position: int, score: float, label: str):
+        self.position = position
+        self.score = score
+        self.label = label
+
+
+class Resolution:
+    """Outcome of a lookup: one ``match``, several ambiguous ``candidates``, or nothing."""
+
+    def __init__(self, kind: str, query: str, candidates: List[Match]):
+        self.kind = kind
+        self.query = query
+        self.candidates = candidates
+
+    @property
+    def match(self) -> Optional[Match]:
+        if not self.candidates or self.ambiguous:
+            return None
+        return self.candidates[0]
+
+    @property
+    def ambiguous(self) -> bool:
+        if len(self.candidates) < 2:
+            return False
+        best, second = self.candidates[0], self.candidates[1]
+        if best.score >= 1.0 > second.score:
+            return False
+        close = [m for m in self.candidates[1:] if best.score - m.score < AMBIGUITY_MARGIN]
+        # Duplicates (same name, course and due date) can't be told apart, so asking won't help
+        return any(m.label != best.label for m in close)
+
+    def labels(self, limit: int = 5) -> List[str]:
+        return [m.label for m in self.candidates[:limit]]
+
+
+class _Table:
+    """Inverted index over one kind of entity."""
+
+    def __init__(self):
+        self.labels: List[str] = []
+        self.exact: Dict[str, List[int]] = {}
+        self.tokens: List[Set[str]] = []
+        self.postings: Dict[str, Set[int]] = {}
+        # Word vocabulary bucketed by first letter and kept sorted, to bound prefix and typo matching
+        self.vocab: Dict[str, List[str]] = {}
+
+    def add(self, position: int, label: str, *names: str):
+        while len(self.labels) <= position:
+            self.labels.append("")
+            self.tokens.append(set())
+        self.labels[position] = label
+        for name in names:
+            key = " ".join(tokenize(name))
+            if key:
+                self.exact.setdefault(key, []).append(position)
+            for token in tokenize(name):
+                self.tokens[position].add(token)
+                if token not in self.postings and token.isalpha():
+                    self.vocab.setdefault(token[0], []).append(token)
+                self.postings.setdefault(token, set()).add(position)
+
+    def finish(self):
+        for words in self.vocab.values():
+            words.sort()
+        self.token_counts = [max(1, len(tokens)) for tokens in self.tokens]
+
+    def _similar_tokens(self, token: str) -> List[Tuple[str, float]]:
+        """Vocabulary tokens matching ``token`` exactly, by prefix or with a small typo.
+
+        Numbers and codes only match exactly: "15" must not match "150".
+        """
+        found = [(token, 1.0)] if token in self.postings else []
+        if not token.isalpha() or len(token) < 2:
+            return found
+        words = self.vocab.get(token[0], [])
+        i = bisect_left(words, token)
+        while i < len(words) and words[i].startswith(token):
+            if words[i] != token:
+                found.append((words[i], 0.8))
+            i += 1
+        if not found and len(token) >= 4:
+            for candidate in words:
+                if abs(len(candidate) - len(token)) > 2:
+                    continue
+                matcher = SequenceMatcher(None, token, candidate)
+                if matcher.real_quick_ratio() >= 0.8 and matcher.quick_ratio() >= 0.8 and matcher.ratio() >= 0.8:
+                    found.append((candidate, 0.7))
+        return found
+
+    def lookup(self, query: str, allowed: Optional[Set[int]] = None, limit: int = 10) -> List[Match]:
+        """The ``limit`` best-scoring positions for ``query``, best first."""
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+        exact = [p for p in self.exact.get(" ".join(query_tokens), []) if allowed is None or p in allowed]
+        scores: Dict[int, float] = {p: 1.0 for p in exact}
+
+        # Drop the compact "cs101" token from coverage so "CS 101" isn't penalized for it
+        words = query_tokens[:-1] if len(query_tokens) > 1 and query_tokens[-1] == "".join(query_tokens[:-1]) else query_tokens
+        weights: Dict[int, float] = {}
+        for token in query_tokens:
+            similar = self._similar_tokens(token)
+            if len(similar) == 1:
+                # Common case: one vocabulary token, no per-position maximum needed
+                candidate, weight = similar[0]
+                postings = self.postings[candidate]
+                if allowed is not None:
+                    postings = postings & allowed
+                for position in postings:
+                    weights[position] = weights.get(position, 0.0) + weight
+                continue
+            best: Dict[int, float] = {}
+            for candidate, weight in similar:
+                for position in self.postings.get(candidate, ()):
+                    if allowed is not None and position not in allowed:
+                        continue
+                    if weight > best.get(position, 0.0):
+                        best[position] = weight
+            for position, weight in best.items():
+                weights[position] = weights.get(position, 0.0) + weight
+
+        words_count = len(words)
+        token_counts = self.token_counts
+        for position, total in weights.items():
+            if position in scores:
+                continue
+            coverage = min(1.0, total / words_count)
+            # Prefer names the query covers more completely ("math" -> "Math" over "Math Methods")
+            precision = min(1.0, total / token_counts[position])
+            score = 0.95 * (0.85 * coverage + 0.15 * precision)
+            if score >= MIN_SCORE:
+                scores[position] = score
+
+        best_positions = heapq.nsmallest(limit, scores, key=lambda p: (-scores[p], p))
+        return [Match(p, scores[p], self.labels[p]) for p in best_positions]
+
+
+class NameIndex:
+    """Courses (by name and code) and assignments (by name) of one snapshot."""
+
+    def __init__(self, courses, assignments):
+        self.courses = _Table()
+        self.assignments = _Table()
+        self._course_names: List[str] = []
+        self._by_course: Dict[str, Set[int]] = {}
+        for i, course in enumerate(courses):
+            name = course.get("course_name", "")
+            code = course.get("course_code", "")
+            self.courses.add(i, f"{name} ({code})" if code else name, name, code)
+            self._course_names.append(name)
+        for j, a in enumerate(assignments):
+            course = a.get("course", "")
+            details = ", ".join(x for x in (course, f"due {a['due_date']}" if a.get("due_date") else "") if x)
+            self.assignments.add(j, f"{a.get('name', '')} ({details})" if details else a.get("name", ""), a.get("name", ""))
+            self._by_course.setdefault(course, set()).add(j)
+        self.courses.finish()
+        self.assignments.finish()
+
+    def course(self, query: str) -> Resolution:
+        return Resolution("course", query, self.courses.lookup(query))
+
+    def course_name(self, position: int) -> str:
+        return self._course_names[position]
+
+    def mentions(self, tokens) -> bool:
+        """Whether any of ``tokens`` is a word of a course name or code, or of an assignment name."""
+        return any(t in self.courses.postings or t in self.assignments.postings for t in tokens)
+
+    def assignment(self, query: str, course: Optional[str] = None) -> Resolution:
+        """Resolve an assignment, optionally only among those of the course named ``course``."""
+        allowed = self._by_course.get(course, set()) if course is not None else None
+        return Resolution("assignment", query, self.assignments.lookup(query, allowed))
+
+
+def name_index(snapshot) -> NameIndex:
+    """The index for ``snapshot``, built once per committed version."""
+    return snapshot.cached("name_index", lambda: NameIndex(snapshot.courses, snapshot.assignments))
@@ -0,0 +1,352 @@
+"""Local stand-ins for the Groq and Firecrawl APIs.
+
+Lets CourseSync run (and be load-tested) without real API keys. Point the
+agent at the stand-ins with:
+
+    GROQ_API_URL=http://localhost:8101/openai/v1/chat/completions
+    FIRECRAWL_API_URL=http://localhost:8102/v0/scrape
+    GROQ_API_KEY=standin FIRECRAWL_API_KEY=standin
+
+Usage:
+    python -m server.standins                     # both servers, no faults
+    python -m server.standins --latency lognormal:-0.5,0.6 --rate-429 0.1
+
+Every knob can also be set through ``STANDIN_*`` environment variables (see
+``FaultProfile.from_env``).
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from string import Template
+from typing import Callable, Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from .agent.prompts import (
+    SYLLABUS_PARSER_PROMPT,
+    SYLLABUS_PATCH_PROMPT,
+    WORKLOAD_ANALYZER_PROMPT,
+    SCHEDULE_OPTIMIZER_PROMPT,
+    NOTIFICATION_PROMPT,
+    AI_ASSISTANT_PROMPT,
+    CHAT_ACTION_PROMPT,
+    QUICK_ANSWER_PROMPT,
+)
+
+# Map system prompts to the agent operation that sends them
+PROMPT_TYPES = {
+    SYLLABUS_PARSER_PROMPT: "parse_syllabus",
+    SYLLABUS_PATCH_PROMPT: "parse_syllabus",
+    WORKLOAD_ANALYZER_PROMPT: "analyze_workload",
+    SCHEDULE_OPTIMIZER_PROMPT: "create_schedule",
+    NOTIFICATION_PROMPT: "generate_notifications",
+    AI_ASSISTANT_PROMPT: "chat",
+    CHAT_ACTION_PROMPT: "chat_action",
+    QUICK_ANSWER_PROMPT: "chat_answer",
+}
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Build a latency sampler (seconds) from a spec string.
+
+    Supported forms: ``fixed:S``, ``uniform:LO,HI``, ``normal:MEAN,STD``,
+    ``lognormal:MU,SIGMA`` and ``exp:MEAN``. An empty spec means no delay.
+    """
+    if not spec:
+        return lambda: 0.0
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()]
+    kind = kind.strip().lower()
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(values[0], values[1])
+    if kind == "exp":
+        return lambda: random.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class FaultProfile:
+    """Latency and failure injection settings for one stand-in server."""
+
+    def __init__(self, latency: str = "", rate_429: float = 0.0, retry_after: float = 1.0,
+                 rate_5xx: float = 0.0, rate_truncate: float = 0.0, rpm: int = 0):
+        self.latency_spec = latency
+        self.sample_latency = parse_latency(latency)
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.rate_5xx = rate_5xx
+        self.rate_truncate = rate_truncate
+        self.rpm = rpm
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    @classmethod
+    def from_env(cls, prefix: str) -> "FaultProfile":
+        """Read ``STANDIN_<PREFIX>_*`` variables, falling back to ``STANDIN_*``."""
+        def get(name, default):
+            return os.getenv(f"STANDIN_{prefix}_{name}", os.getenv(f"STANDIN_{name}", default))
+
+        return cls(
+            latency=get("LATENCY", ""),
+            rate_429=float(get("429_RATE", "0")),
+            retry_after=float(get("RETRY_AFTER", "1")),
+            rate_5xx=float(get("5XX_RATE", "0")),
+            rate_truncate=float(get("TRUNCATE_RATE", "0")),
+            rpm=int(get("RPM", "0")),
+        )
+
+    def rate_limited(self) -> Optional[float]:
+        """Return a Retry-After value if this request should get a 429."""
+        if self.rpm:
+            now = time.monotonic()
+            if now - self._window_start >= 60:
+                self._window_start = now
+                self._window_count = 0
+            self._window_count += 1
+            if self._window_count > self.rpm:
+                return max(1.0, math.ceil(60 - (now - self._window_start)))
+        if self.rate_429 and random.random() < self.rate_429:
+            return self.retry_after
+        return None
+
+    def server_error(self) -> bool:
+        return bool(self.rate_5xx) and random.random() < self.rate_5xx
+
+    def truncated(self) -> bool:
+        return bool(self.rate_truncate) and random.random() < self.rate_truncate
+
+
+def _estimate_tokens(text: str) -> int:
+    # Rough rule of thumb for English text: ~4 characters per token
+    return max(1, len(text) // 4)
+
+
+def _fenced(data) -> str:
+    # Models usually wrap JSON answers in a ```json block
+    return "```json\n" + json.dumps(data, indent=2) + "\n```"
+
+
+def _default_responses() -> Dict[str, str]:
+    """Built-in canned responses per prompt type (``string.Template`` syntax)."""
+    return {
+        "parse_syllabus": _fenced({
+            "course_name": "Stand-in Course",
+            "course_code": "STD101",
+            "instructor": "Dr. Stand-in",
+            "assignments": [
+                {"name": "Homework 1", "type": "homework", "due_date": "$in_7_days",
+                 "weight": 10, "estimated_hours": 5, "description": "Canned homework"},
+                {"name": "Quiz 1", "type": "quiz", "due_date": "$in_14_days",
+                 "weight": 5, "estimated_hours": 2, "description": "Canned quiz"},
+                {"name": "Midterm Exam", "type": "exam", "due_date": "$in_30_days",
+                 "weight": 25, "estimated_hours": 8, "description": "Canned exam"},
+            ],
+        }),
+        "analyze_workload": _fenced({
+            "total_hours": 15,
+            "weekly_breakdown": {"$today": 7, "$in_7_days": 8},
+            "risk_weeks": [],
+            "recommendations": ["Start the homework early."],
+            "priority_assignments": ["Homework 1"],
+        }),
+        "create_schedule": _fenced({
+            "daily_schedule": {
+                "$today": [{"assignment": "Homework 1", "task": "Read the brief",
+                            "hours": 2, "priority": "high"}],
+            },
+            "warnings": [],
+            "total_scheduled_hours": 2,
+        }),
+        "generate_notifications": _fenced([
+            {"message": "Homework 1 is due soon", "urgency": "medium", "action": "Start today",
+             "send_at": "$today 09:00", "type": "reminder"},
+        ]),
+        "chat": "This is a stand-in answer from the local Groq server.",
+        "chat_action": _fenced({"action": "chat", "content": "This is a stand-in action reply.", "data": {}}),
+        "chat_answer": "This is a stand-in quick answer.",
+        "default": "{}",
+    }
+
+
+class GroqStandin:
+    """OpenAI/Groq-compatible ``/chat/completions`` stand-in."""
+
+    def __init__(self, faults: FaultProfile, responses_dir: str = ""):
+        self.faults = faults
+        self.responses = _default_responses()
+        if responses_dir:
+            self._load_responses(responses_dir)
+
+    def _load_responses(self, path: str):
+        """Override canned responses with ``<prompt_type>.json``/``.txt`` files."""
+        for name in os.listdir(path):
+            stem, ext = os.path.splitext(name)
+            if ext in (".json", ".txt", ".md"):
+                with open(os.path.join(path, name), "r", encoding="utf-8") as f:
+                    self.responses[stem] = f.read()
+
+    def render(self, prompt_type: str, user_prompt: str, model: str) -> str:
+        template = self.responses.get(prompt_type, self.responses["default"])
+        today = datetime.now()
+        return Template(template).safe_substitute(
+            today=today.strftime("%Y-%m-%d"),
+            in_7_days=(today + timedelta(days=7)).strftime("%Y-%m-%d"),
+            in_14_days=(today + timedelta(days=14)).strftime("%Y-%m-%d"),
+            in_30_days=(today + timedelta(days=30)).strftime("%Y-%m-%d"),
+            model=model,
+            prompt_type=prompt_type,
+            # JSON-escaped so it can be embedded inside JSON string templates
+            user_prompt=json.dumps(user_prompt[:200])[1:-1],
+        )
+
+    def build_app(self) -> FastAPI:
+        app = FastAPI(title="Groq stand-in")
+
+        @app.post("/openai/v1/chat/completions")
+        async def chat_completions(request: Request):
+            body = await request.json()
+            messages = body.get("messages", [])
+            system_prompt = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+            user_prompt = next((m.get("content", "") for m in messages if m.get("role") == "user"), "")
+            model = body.get("model", "standin")
+            prompt_type = PROMPT_TYPES.get(system_prompt, "default")
+
+            await asyncio.sleep(self.faults.sample_latency())
+
+            retry_after = self.faults.rate_limited()
+            if retry_after is not None:
+                return JSONResponse(
+                    {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                    status_code=429,
+                    headers={"Retry-After": str(int(math.ceil(retry_after)))},
+                )
+            if self.faults.server_error():
+                return JSONResponse({"error": {"message": "Stand-in server error"}},
+                                    status_code=random.choice([500, 502, 503]))
+
+            content = self.render(prompt_type, user_prompt, model)
+            finish_reason = "stop"
+            if self.faults.truncated() and len(content) > 1:
+                content = content[:random.randint(1, len(content) - 1)]
+                finish_reason = "length"
+
+            prompt_tokens = sum(_estimate_tokens(m.get("content", "")) for m in messages)
+            completion_tokens = _estimate_tokens(content)
+            return {
+                "id": f"standin-{int(time.time() * 1000)}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": finish_reason,
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+
+        return app
+
+
+class FirecrawlStandin:
+    """Firecrawl-compatible ``/v0/scrape`` stand-in."""
+
+    def __init__(self, faults: FaultProfile, scrape_file: str = ""):
+        self.faults = faults
+        self.markdown = ""
+        if scrape_file:
+            with open(scrape_file, "r", encoding="utf-8") as f:
+                self.markdown = f.read()
+
+    def render(self, url: str) -> str:
+        if self.markdown:
+            return Template(self.markdown).safe_substitute(url=url)
+        return f"# Course page\n\nSource: {url}\n\n## Assignments\n\n- Homework 1 - Due: Week 2 - Weight: 10%\n"
+
+    def build_app(self) -> FastAPI:
+        app = FastAPI(title="Firecrawl stand-in")
+
+        @app.post("/v0/scrape")
+        async def scrape(request: Request):
+            body = await request.json()
+            url = body.get("url", "")
+
+            await asyncio.sleep(self.faults.sample_latency())
+
+            retry_after = self.faults.rate_limited()
+            if retry_after is not None:
+                return JSONResponse({"success": False, "error": "Rate limit exceeded"}, status_code=429,
+                                    headers={"Retry-After": str(int(math.ceil(retry_after)))})
+            if self.faults.server_error():
+                return JSONResponse({"success": False, "error": "Stand-in server error"}, status_code=500)
+
+            markdown = self.render(url)
+            if self.faults.truncated() and len(markdown) > 1:
+                markdown = markdown[:random.randint(1, len(markdown) - 1)]
+            return {"success": True, "data": {"markdown": markdown, "metadata": {"sourceURL": url}}}
+
+        return app
+
+
+async def _serve(apps, host: str):
+    import uvicorn
+
+    servers = [uvicorn.Server(uvicorn.Config(a, host=host, port=port, log_level="warning")) for a, port in apps]
+    await asyncio.gather(*(s.serve() for s in servers))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run local Groq and Firecrawl stand-in servers.")
+    parser.add_argument("--host", default=os.getenv("STANDIN_HOST", "127.0.0.1"))
+    parser.add_argument("--groq-port", type=int, default=int(os.getenv("STANDIN_GROQ_PORT", "8101")))
+    parser.add_argument("--firecrawl-port", type=int, default=int(os.getenv("STANDIN_FIRECRAWL_PORT", "8102")))
+    parser.add_argument("--responses-dir", default=os.getenv("STANDIN_RESPONSES_DIR", ""),
+                        help="Directory of <prompt_type>.json/.txt templates overriding canned responses")
+    parser.add_argument("--scrape-file", default=os.getenv("STANDIN_SCRAPE_FILE", ""),
+                        help="Markdown/text file returned for every scrape")
+    parser.add_argument("--latency", help="Latency distribution for both servers, e.g. lognormal:-0.5,0.6")
+    parser.add_argument("--rate-429", type=float, help="Probability of answering 429")
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--rate-5xx", type=float, help="Probability of answering 5xx")
+    parser.add_argument("--rate-truncate", type=float, help="Probability of truncating the output")
+    parser.add_argument("--rpm", type=int, help="Hard requests-per-minute limit before 429s")
+    args = parser.parse_args(argv)
+
+    profiles = {"GROQ": FaultProfile.from_env("GROQ"), "FIRECRAWL": FaultProfile.from_env("FIRECRAWL")}
+    for profile in profiles.values():
+        if args.latency is not None:
+            profile.latency_spec = args.latency
+            profile.sample_latency = parse_latency(args.latency)
+        for attr in ("rate_429", "retry_after", "rate_5xx", "rate_truncate", "rpm"):
+            if getattr(args, attr) is not None:
+                setattr(profile, attr, getattr(args, attr))
+
+    groq_app = GroqStandin(profiles["GROQ"], args.responses_dir).build_app()
+    firecrawl_app = FirecrawlStandin(profiles["FIRECRAWL"], args.scrape_file).build_app()
+
+    print(f"Groq stand-in:      http://{args.host}:{args.groq_port}/openai/v1/chat/completions")
+    print(f"Firecrawl stand-in: http://{args.host}:{args.firecrawl_port}/v0/scrape")
+    try:
+        asyncio.run(_serve([(groq_app, args.groq_port), (firecrawl_app, args.firecrawl_port)], args.host))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
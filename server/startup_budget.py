@@ -0,0 +1,77 @@
+"""Cold-start budget check for the web server.
+
+Imports ``server.app`` in fresh interpreters and fails (exit status 1) when
+the median import time exceeds the budget, or when a subsystem that should
+load lazily was imported at startup::
+
+    python -m server.startup_budget --budget-ms 800 --runs 5
+
+Run it from the repository root. The probes run in a temporary directory,
+since the app creates ``data/`` in the working directory;
+``tests/test_startup_budget.py`` runs the same check.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Loaded on first use, never by importing the app
+LAZY_MODULES = (
+    "server.agent.agent",
+    "server.agent.clients",
+    "requests",
+    "rich",
+    "pdfminer",
+    "smtplib",
+)
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import server.app
+elapsed = (time.perf_counter() - started) * 1000
+print(json.dumps({"ms": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+
+def measure(runs: int):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])))
+    results = []
+    with tempfile.TemporaryDirectory(prefix="coursesync-startup-") as scratch:
+        for _ in range(runs):
+            out = subprocess.run(
+                [sys.executable, "-c", PROBE], env=env, cwd=scratch, capture_output=True, text=True, check=True,
+            )
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", "800")))
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results = measure(args.runs)
+    median = statistics.median(r["ms"] for r in results)
+    loaded = sorted({m for r in results for m in r["loaded"]})
+    print(f"import server.app: median {median:.0f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    failed = False
+    if median > args.budget_ms:
+        print(f"FAIL: over budget by {median - args.budget_ms:.0f} ms")
+        failed = True
+    if loaded:
+        print(f"FAIL: imported at startup instead of on first use: {', '.join(loaded)}")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
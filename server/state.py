@@ -0,0 +1,358 @@
+"""In-memory application state backed by a ``server.store`` backend."""
+
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from .agent.metrics import TENANTS_IN_MEMORY, TENANT_EVICTIONS
+from .agent.utils import load_settings, save_settings
+from .model import Assignment, compact_records
+from .store import DEFAULT_TENANT, tenant_dir
+
+logger = logging.getLogger(__name__)
+
+# Cache name -> update(value, previous snapshot, new snapshot), see ``incremental``
+_INCREMENTAL: Dict[str, Callable] = {}
+
+
+def incremental(name: str):
+    """Register how derived data ``name`` is brought forward to the next committed version.
+
+    The update gets the previous version's value and both snapshots and
+    returns the new value, or None to have it rebuilt on first use.
+    """
+    def register(update):
+        _INCREMENTAL[name] = update
+        return update
+    return register
+
+
+class Snapshot:
+    """Immutable view of one committed version of a ``State``.
+
+    Published by reference after every commit, so readers never take a lock
+    and never observe a half-applied mutation. The containers are tuples and
+    the dicts inside are never mutated again (writers work on copies); treat
+    them as read-only.
+    """
+
+    __slots__ = ("version", "courses", "assignments", "settings", "sent_notifications", "_cache")
+
+    def __init__(self, version: int, courses, assignments, settings: Dict, sent_notifications):
+        self.version = version
+        # Assignments become compact records shared with their course's list (see ``model``)
+        courses, assignments = compact_records(courses, assignments)
+        self.courses = tuple(courses)
+        self.assignments = tuple(assignments)
+        self.settings = dict(settings)
+        self.sent_notifications = tuple(sent_notifications)
+        self._cache: Dict[str, object] = {}
+
+    def cached(self, name: str, build: Callable[[], object]):
+        """Return derived data (indexes, aggregates) for this version, building it once."""
+        value = self._cache.get(name)
+        if value is None:
+            value = self._cache[name] = build()
+        return value
+
+    def carry_over(self, previous: "Snapshot"):
+        """Update ``previous``'s incremental derived data for this version instead of rebuilding it."""
+        for name, update in _INCREMENTAL.items():
+            value = previous._cache.get(name)
+            if value is not None:
+                value = update(value, previous, self)
+                if value is not None:
+                    self._cache[name] = value
+
+
+class State:
+    """Courses, assignments and settings for one student (one tenant).
+
+    Readers call ``snapshot()`` and get the last committed version without
+    locking. Writers run inside ``with state.locked():`` - a single-writer
+    transaction that takes the process lock plus the store's write lock
+    (cross-process in shared mode), reloads if another worker committed, and
+    exposes a private working set as ``state.courses``,
+    ``state.all_assignments``, ``state.settings`` and
+    ``state.sent_notifications``. Calling ``persist()`` marks the transaction
+    for commit; the write and the new snapshot are published once when the
+    block exits, and an exception discards the working set. Changed settings
+    are written to settings.json after the state is saved, so callers just
+    update ``state.settings`` and ``persist()``.
+
+    The working lists are private, but the course and assignment records in
+    them are the snapshot's until the transaction writes to one:
+    ``edit_course``, ``edit_assignment`` and ``edit_course_assignments``
+    copy a record on first write and swap the copy in, so untouched records
+    stay shared with the snapshot. Never modify a record obtained any other
+    way; records added in the transaction are its own already.
+    """
+
+    def __init__(self, store, data_dir: str, key: str = DEFAULT_TENANT):
+        self.store = store
+        self.key = key
+        self.data_dir = tenant_dir(data_dir, key)
+        self._lock = threading.RLock()
+        self._tx = None
+        self._dirty = False
+        # Records copied by the running transaction, by id
+        self._owned: Dict[int, object] = {}
+        self.settings = self._load_settings()
+        self.scheduler_thread = None
+        self.scheduler_stop_event = threading.Event()
+        self._load_state()
+
+    def _load_settings(self):
+        base = {
+            "hours_per_day": 4,
+            "risk_threshold": 20,
+            "notification_lead_days": 3,
+            "calendar_filename": os.path.join(self.data_dir, "coursesync_calendar.ics"),
+            "email_enabled": False,
+            "email_to": "",
+            "email_schedule_enabled": False,
+            "notification_poll_seconds": 60,
+        }
+        loaded = load_settings(self.settings_path)
+        settings = {**base, **loaded}
+        if settings != loaded:
+            save_settings(settings, self.settings_path)
+        return settings
+
+    @property
+    def settings_path(self) -> str:
+        return os.path.join(self.data_dir, "settings.json")
+
+    def save_settings(self):
+        save_settings(self.settings, self.settings_path)
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def snapshot(self) -> Snapshot:
+        """The latest committed state; safe to read from any thread without locking."""
+        return self._snapshot
+
+    def _load_state(self):
+        data, version = self.store.load(self.key)
+        self._apply(data, version)
+
+    def _apply(self, data: Dict, version: int):
+        settings = self.settings
+        if self.store.shared and data.get("settings"):
+            # Workers share settings through the store rather than settings.json
+            settings = {**settings, **data["settings"]}
+        self._publish(Snapshot(
+            version,
+            data.get("courses", []),
+            data.get("assignments", []),
+            settings,
+            data.get("sent_notifications", []),
+        ))
+
+    def _publish(self, snapshot: Snapshot):
+        # A single reference assignment: readers see either the old or the new version
+        self._snapshot = snapshot
+        self.courses = list(snapshot.courses)
+        self.all_assignments = list(snapshot.assignments)
+        self.settings = dict(snapshot.settings)
+        self.sent_notifications = list(snapshot.sent_notifications)
+        self._owned = {}
+
+    def _own(self, record):
+        self._owned[id(record)] = record
+        return record
+
+    def edit_course(self, course: Dict) -> Dict:
+        """The transaction's own copy of ``course`` (an item of ``state.courses``), to modify.
+
+        The copy replaces ``course`` in ``state.courses``; its ``assignments``
+        list is copied too, but not the records in it.
+        """
+        if id(course) in self._owned or not any(c is course for c in self._snapshot.courses):
+            return course
+        position = next(i for i, c in enumerate(self.courses) if c is course)
+        draft = dict(course)
+        if isinstance(draft.get("assignments"), list):
+            draft["assignments"] = list(draft["assignments"])
+        self.courses[position] = self._own(draft)
+        return draft
+
+    def edit_assignment(self, position: int) -> Dict:
+        """The transaction's own copy of ``state.all_assignments[position]``, to modify.
+
+        The copy replaces the record in the flat list and in its course's
+        list when that list holds the same record.
+        """
+        record = self.all_assignments[position]
+        if id(record) in self._owned or type(record) is not Assignment:
+            # Already copied, or added by this transaction
+            return record
+        draft = self.all_assignments[position] = self._own(record.copy())
+        for course in self.courses:
+            nested = course.get("assignments")
+            if course.get("course_name") == record.get("course") and isinstance(nested, list) and any(a is record for a in nested):
+                course = self.edit_course(course)
+                course["assignments"] = [draft if a is record else a for a in course["assignments"]]
+        return draft
+
+    def edit_course_assignments(self, course: Dict, match: Callable[[Dict], bool]) -> List[Dict]:
+        """The transaction's own copies of the records in ``course["assignments"]`` that ``match``."""
+        course = self.edit_course(course)
+        nested = course.get("assignments")
+        edited = []
+        for i, record in enumerate(nested if isinstance(nested, list) else ()):
+            if match(record):
+                if id(record) not in self._owned and type(record) is Assignment:
+                    record = nested[i] = self._own(record.copy())
+                edited.append(record)
+        return edited
+
+    def refresh(self) -> bool:
+        """Reload if another worker committed a newer version; returns True if reloaded.
+
+        Never waits for a writer: if a transaction is running it will leave a
+        fresh snapshot behind anyway.
+        """
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            latest = self.store.version(self.key)
+            if latest == self.version:
+                return False
+            data, version = self.store.load(self.key)
+            self._apply(data, version)
+            logger.debug("State %s reloaded at version %s", self.key, version)
+            return True
+        finally:
+            self._lock.release()
+
+    @contextmanager
+    def locked(self):
+        """Run a single-writer transaction against other threads and workers."""
+        with self._lock:
+            if self._tx is not None:
+                # Re-entrant use joins the outer transaction
+                yield self
+                return
+            with self.store.transaction(self.key) as tx:
+                if tx.version() != self.version:
+                    data, version = tx.load()
+                    self._apply(data, version)
+                self._publish(self._snapshot)
+                self._tx = tx
+                self._dirty = False
+                try:
+                    yield self
+                    if self._dirty:
+                        self._commit(tx)
+                finally:
+                    self._tx = None
+                    self._dirty = False
+                    # Drop the working set (committed or not); readers use the snapshot
+                    self._publish(self._snapshot)
+
+    def _payload(self) -> Dict:
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "courses": self.courses,
+            "assignments": self.all_assignments,
+            "settings": self.settings,
+            "sent_notifications": self.sent_notifications,
+        }
+
+    def _commit(self, tx):
+        settings_changed = self.settings != self._snapshot.settings
+        version = tx.save(self._payload(), expected_version=self.version)
+        if settings_changed:
+            # settings.json follows the committed state, never a rolled-back one
+            self.save_settings()
+        snapshot = Snapshot(version, self.courses, self.all_assignments, self.settings, self.sent_notifications)
+        snapshot.carry_over(self._snapshot)
+        self._snapshot = snapshot
+
+    def persist(self):
+        """Mark the current transaction for commit (or write immediately outside one)."""
+        with self._lock:
+            if self._tx is not None:
+                self._dirty = True
+                return
+            try:
+                # Outside locked() there is no consistent base to check against: last writer wins
+                with self.store.transaction(self.key) as tx:
+                    if tx.version() != self.version:
+                        logger.warning("Persisting state %s over a newer version written by another worker", self.key)
+                    version = tx.save(self._payload())
+                if self.settings != self._snapshot.settings:
+                    self.save_settings()
+                snapshot = Snapshot(version, self.courses, self.all_assignments, self.settings, self.sent_notifications)
+                snapshot.carry_over(self._snapshot)
+                self._publish(snapshot)
+            except Exception as e:
+                print(f"Error persisting state: {e}")
+
+
+USER_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+class TenantRegistry:
+    """Lazily loaded per-user ``State`` partitions with LRU eviction.
+
+    At most ``max_in_memory`` tenants are kept loaded; the least recently
+    used idle tenant is dropped when a new one is loaded. Everything a
+    tenant owns is already persisted, so eviction only frees memory.
+    """
+
+    def __init__(self, store, data_dir: str, max_in_memory: int = 1000):
+        self.store = store
+        self.data_dir = data_dir
+        self.max_in_memory = max(1, max_in_memory)
+        self._tenants: "OrderedDict[str, State]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str = DEFAULT_TENANT) -> State:
+        if not USER_ID_PATTERN.match(user_id or "") or user_id.startswith("."):
+            raise ValueError(f"Invalid user id: {user_id!r}")
+        with self._lock:
+            tenant = self._tenants.get(user_id)
+            if tenant is not None:
+                self._tenants.move_to_end(user_id)
+                return tenant
+        # Load outside the registry lock so a slow load doesn't block other users
+        tenant = State(self.store, self.data_dir, user_id)
+        with self._lock:
+            existing = self._tenants.get(user_id)
+            if existing is not None:
+                self._tenants.move_to_end(user_id)
+                return existing
+            self._tenants[user_id] = tenant
+            self._evict()
+            TENANTS_IN_MEMORY.set(len(self._tenants))
+        return tenant
+
+    def _evict(self):
+        """Drop least recently used tenants that are not mid-transaction."""
+        if len(self._tenants) <= self.max_in_memory:
+            return
+        for user_id in list(self._tenants):
+            if len(self._tenants) <= self.max_in_memory:
+                break
+            tenant = self._tenants[user_id]
+            if tenant._tx is not None:
+                continue
+            del self._tenants[user_id]
+            self.store.forget(user_id)
+            TENANT_EVICTIONS.inc()
+
+    def loaded(self):
+        with self._lock:
+            return list(self._tenants.values())
+
+    def __len__(self):
+        return len(self._tenants)
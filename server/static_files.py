@@ -0,0 +1,175 @@
+"""Serving the built React app from an in-memory manifest.
+
+``StaticManifest`` walks ``server/static`` once at startup and records each
+file's type, stat, ETag, cache policy and precompressed ``.br``/``.gz``
+siblings, so requests never touch the filesystem to find a file.
+``index.html`` (and its compressed forms) is held in memory: every SPA route
+is answered without a filesystem call.
+
+Files with a content hash in their name (Vite's ``assets/index-3f9c2a1b.js``)
+get ``Cache-Control: immutable`` for a year; ``index.html`` must be
+revalidated, which its ETag makes cheap (``304``). Rebuilding the client
+while the server runs needs a restart to be picked up; until then a build
+that was missing at startup is served straight from disk.
+
+``python -m server.static_files`` writes the ``.gz`` (and, with the
+``brotli`` package, ``.br``) files after ``npm run build``.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import sys
+from typing import Dict, Optional
+
+from fastapi.responses import FileResponse, JSONResponse, Response
+
+from .compression import COMPRESSIBLE_TYPES, accepted_encodings, brotli
+
+# Vite puts bundled files in assets/ as "<name>-<hash>.<ext>"
+HASHED_NAME = re.compile(r"[-.][A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Unhashed files (favicon, vite.svg) may change with the next build
+SHORT_LIVED = "public, max-age=3600"
+REVALIDATE = "no-cache"
+
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+PRECOMPRESS_MIN_BYTES = 256
+
+
+class StaticFile:
+    __slots__ = ("path", "stat", "media_type", "etag", "cache_control", "variants", "body")
+
+    def __init__(self, path: str, media_type: str, etag: str, cache_control: str):
+        self.path = path
+        self.stat = os.stat(path)
+        self.media_type = media_type
+        self.etag = etag
+        self.cache_control = cache_control
+        # Encoding -> (path, stat) of a precompressed sibling
+        self.variants: Dict[str, tuple] = {}
+        # Encoding ("identity", "br", "gzip") -> bytes, for files kept in memory
+        self.body: Dict[str, bytes] = {}
+
+
+def _etag(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:20]
+
+
+class StaticManifest:
+    def __init__(self, root: str):
+        self.root = root
+        self.files: Dict[str, StaticFile] = {}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if name.endswith((".br", ".gz")):
+                    continue
+                path = os.path.join(directory, name)
+                rel = os.path.relpath(path, root).replace(os.sep, "/")
+                media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                if rel == "index.html":
+                    cache_control = REVALIDATE
+                elif rel.startswith("assets/") and HASHED_NAME.search(name):
+                    cache_control = IMMUTABLE
+                else:
+                    cache_control = SHORT_LIVED
+                entry = StaticFile(path, media_type, _etag(path), cache_control)
+                for encoding, suffix in ENCODINGS:
+                    if os.path.isfile(path + suffix):
+                        entry.variants[encoding] = (path + suffix, os.stat(path + suffix))
+                self.files[rel] = entry
+        self.index = self.files.get("index.html")
+        if self.index is not None:
+            self._load_index()
+
+    def _load_index(self):
+        """Keep index.html and its compressed forms in memory."""
+        index = self.index
+        with open(index.path, "rb") as f:
+            index.body["identity"] = f.read()
+        for encoding, (path, _) in index.variants.items():
+            with open(path, "rb") as f:
+                index.body[encoding] = f.read()
+        if "gzip" not in index.body:
+            index.body["gzip"] = gzip.compress(index.body["identity"], compresslevel=9, mtime=0)
+        if "br" not in index.body and brotli is not None:
+            index.body["br"] = brotli.compress(index.body["identity"], quality=11)
+
+    def get(self, path: str) -> Optional[StaticFile]:
+        return self.files.get(path.lstrip("/"))
+
+    def serve(self, path: str, accept_encoding: str = "", if_none_match: str = "") -> Response:
+        """The built file at ``path``, otherwise index.html for client-side routes."""
+        entry = self.get(path) or self.index
+        if entry is not None:
+            return self.response(entry, accept_encoding, if_none_match)
+        index = os.path.join(self.root, "index.html")
+        if not os.path.isfile(index):
+            return JSONResponse({"message": "Frontend not found. Please run 'npm run build' in client directory."},
+                                status_code=404)
+        # index.html appeared after startup: no manifest entry, so no ETag or variants
+        return FileResponse(index, media_type="text/html", headers={"Cache-Control": REVALIDATE})
+
+    def response(self, entry: StaticFile, accept_encoding: str = "", if_none_match: str = "") -> Response:
+        available = entry.body.keys() if entry.body else entry.variants.keys()
+        encoding = _negotiate(accept_encoding, available)
+        etag = f'"{entry.etag}-{encoding}"' if encoding else f'"{entry.etag}"'
+        headers = {"ETag": etag, "Cache-Control": entry.cache_control, "Vary": "Accept-Encoding"}
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        if entry.body:
+            return Response(entry.body[encoding or "identity"], media_type=entry.media_type, headers=headers)
+        if encoding:
+            path, stat = entry.variants[encoding]
+            return FileResponse(path, stat_result=stat, media_type=entry.media_type, headers=headers)
+        return FileResponse(entry.path, stat_result=entry.stat, media_type=entry.media_type, headers=headers)
+
+
+def _negotiate(header: str, available) -> Optional[str]:
+    if not header or not available:
+        return None
+    accepted = accepted_encodings(header)
+    wildcard = accepted.get("*", 0.0)
+    options = [(encoding, accepted.get(encoding, wildcard)) for encoding, _ in ENCODINGS if encoding in available]
+    if not options:
+        return None
+    # Highest q wins; on ties brotli goes first
+    best = max(options, key=lambda option: option[1])
+    return best[0] if best[1] > 0 else None
+
+
+def precompress(root: str) -> int:
+    """Write ``.gz`` (and ``.br`` when brotli is installed) next to every compressible file."""
+    written = 0
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if name.endswith((".br", ".gz")):
+                continue
+            media_type = mimetypes.guess_type(name)[0] or ""
+            path = os.path.join(directory, name)
+            if not media_type.startswith(COMPRESSIBLE_TYPES) or os.path.getsize(path) < PRECOMPRESS_MIN_BYTES:
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            outputs = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                outputs[".br"] = brotli.compress(data, quality=11)
+            for suffix, compressed in outputs.items():
+                if len(compressed) < len(data):
+                    with open(path + suffix, "wb") as f:
+                        f.write(compressed)
+                    written += 1
+    return written
+
+
+if __name__ == "__main__":
+    root = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), "static")
+    print(f"Wrote {precompress(root)} precompressed files under {root}")
@@ -0,0 +1,244 @@
+"""Persistence backends for the server state.
+
+``JsonFileStore`` is the default single-process backend (``data/data.json``).
+``SqliteStore`` is the shared-state mode for running several uvicorn workers:
+every worker reads and writes one SQLite database, each user's state is a
+row carrying a version number, and writers hold the database write lock for the whole
+read-modify-write so no update is lost.
+
+Select the backend with ``STATE_BACKEND=json|sqlite``.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from .agent.metrics import STATE_PERSIST_DURATION, STATE_SIZE_BYTES
+from .agent.tracing import span
+from .model import json_default
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_TENANT = "default"
+
+
+def tenant_dir(data_dir: str, key: str) -> str:
+    """Directory holding one user's files; the default user keeps the legacy layout."""
+    if key == DEFAULT_TENANT:
+        return data_dir
+    path = os.path.join(data_dir, "users", key)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class StaleStateError(RuntimeError):
+    """Raised when a write is based on a version another worker already replaced."""
+
+
+class JsonFileStore:
+    """Single-process store: ``data/data.json`` for the default user and
+    ``data/users/<id>/data.json`` for every other user."""
+
+    shared = False
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self._lock = threading.RLock()
+        self._versions: Dict[str, int] = {}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(tenant_dir(self.data_dir, key), "data.json")
+
+    def load(self, key: str = DEFAULT_TENANT) -> Tuple[Dict, int]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            STATE_SIZE_BYTES.set(os.path.getsize(path))
+        except Exception:
+            data = {}
+        version = data.get("version", 0)
+        self._versions[key] = version
+        return data, version
+
+    def version(self, key: str = DEFAULT_TENANT) -> int:
+        # Only this process writes the file, so the in-memory version is authoritative
+        return self._versions.get(key, 0)
+
+    def forget(self, key: str):
+        """Drop bookkeeping for a user evicted from memory."""
+        self._versions.pop(key, None)
+
+    @contextmanager
+    def transaction(self, key: str = DEFAULT_TENANT):
+        with self._lock:
+            yield _JsonTransaction(self, key)
+
+    def _write(self, key: str, data: Dict, expected_version: Optional[int]) -> int:
+        current = self._versions.get(key, 0)
+        if expected_version is not None and expected_version != current:
+            raise StaleStateError(f"State '{key}' is at version {current}, expected {expected_version}")
+        version = current + 1
+        payload = json.dumps({**data, "version": version}, indent=2, default=json_default)
+        started = time.perf_counter()
+        with span("persist"):
+            path = self._path(key)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            # Atomic replace so readers never see a half-written file
+            os.replace(tmp_path, path)
+        STATE_PERSIST_DURATION.observe(time.perf_counter() - started)
+        STATE_SIZE_BYTES.set(len(payload))
+        self._versions[key] = version
+        return version
+
+
+class _JsonTransaction:
+    def __init__(self, store: JsonFileStore, key: str):
+        self.store = store
+        self.key = key
+
+    def load(self) -> Tuple[Dict, int]:
+        return self.store.load(self.key)
+
+    def version(self) -> int:
+        return self.store.version(self.key)
+
+    def save(self, data: Dict, expected_version: Optional[int] = None) -> int:
+        return self.store._write(self.key, data, expected_version)
+
+
+class SqliteStore:
+    """Shared store for multi-worker deployments.
+
+    Rows are keyed by state key and versioned. ``transaction`` opens a
+    ``BEGIN IMMEDIATE`` transaction, which takes SQLite's write lock across
+    processes until commit, so a worker can re-read, mutate and write back
+    without another worker interleaving.
+    """
+
+    shared = True
+
+    def __init__(self, path: str, legacy_json_path: Optional[str] = None):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS state ("
+                " key TEXT PRIMARY KEY,"
+                " version INTEGER NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " updated_at TEXT NOT NULL)"
+            )
+        finally:
+            conn.close()
+        if legacy_json_path:
+            self._import_legacy(legacy_json_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread for reads; transactions open their own
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _import_legacy(self, json_path: str):
+        """Seed the default row from an existing data.json on first start."""
+        if not os.path.exists(json_path):
+            return
+        with self.transaction(DEFAULT_TENANT) as tx:
+            if tx.version() > 0:
+                return
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception:
+                return
+            tx.save(data, expected_version=0)
+
+    def load(self, key: str = DEFAULT_TENANT) -> Tuple[Dict, int]:
+        row = self._conn().execute("SELECT version, payload FROM state WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return {}, 0
+        STATE_SIZE_BYTES.set(len(row[1]))
+        return json.loads(row[1]), row[0]
+
+    def version(self, key: str = DEFAULT_TENANT) -> int:
+        row = self._conn().execute("SELECT version FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def forget(self, key: str):
+        pass
+
+    @contextmanager
+    def transaction(self, key: str = DEFAULT_TENANT):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield _SqliteTransaction(conn, key)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+
+class _SqliteTransaction:
+    def __init__(self, conn: sqlite3.Connection, key: str):
+        self.conn = conn
+        self.key = key
+
+    def load(self) -> Tuple[Dict, int]:
+        row = self.conn.execute("SELECT version, payload FROM state WHERE key = ?", (self.key,)).fetchone()
+        return (json.loads(row[1]), row[0]) if row else ({}, 0)
+
+    def version(self) -> int:
+        row = self.conn.execute("SELECT version FROM state WHERE key = ?", (self.key,)).fetchone()
+        return row[0] if row else 0
+
+    def save(self, data: Dict, expected_version: Optional[int] = None) -> int:
+        current = self.version()
+        if expected_version is not None and expected_version != current:
+            raise StaleStateError(f"State '{self.key}' is at version {current}, expected {expected_version}")
+        version = current + 1
+        payload = json.dumps({**data, "version": version}, default=json_default)
+        started = time.perf_counter()
+        with span("persist"):
+            self.conn.execute(
+                "INSERT INTO state (key, version, payload, updated_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET version = excluded.version,"
+                " payload = excluded.payload, updated_at = excluded.updated_at",
+                (self.key, version, payload, datetime.now().isoformat()),
+            )
+        STATE_PERSIST_DURATION.observe(time.perf_counter() - started)
+        STATE_SIZE_BYTES.set(len(payload))
+        return version
+
+
+def create_store(data_dir: str):
+    """Build the store selected by ``STATE_BACKEND`` (default ``json``)."""
+    backend = os.getenv("STATE_BACKEND", "json").lower()
+    if backend == "sqlite":
+        path = os.getenv("STATE_DB_PATH", os.path.join(data_dir, "coursesync.db"))
+        return SqliteStore(path, legacy_json_path=os.path.join(data_dir, "data.json"))
+    if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+        # e.g. "uvicorn --workers 4" without STATE_BACKEND=sqlite; main.py refuses this
+        logger.warning("STATE_BACKEND=json is single-process: with several workers concurrent edits are lost")
+    return JsonFileStore(data_dir)
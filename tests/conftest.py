@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The server keeps its files in ./data (resolved when server.app is imported)
+os.chdir(tempfile.mkdtemp(prefix="coursesync-tests-"))
+
+
+@pytest.fixture
+def groq(monkeypatch):
+    """Answer Groq calls with the local stand-in.
+
+    ``groq.responses`` overrides the canned reply per prompt type and
+    ``groq.sent`` collects the request payloads.
+    """
+    from fastapi.testclient import TestClient
+
+    from server.agent import clients
+    from server.standins import FaultProfile, GroqStandin
+
+    standin = GroqStandin(FaultProfile())
+    transport = TestClient(standin.build_app())
+    sent = []
+
+    def post(url, headers=None, json=None, timeout=None):
+        sent.append(json)
+        return transport.post("/openai/v1/chat/completions", json=json)
+
+    monkeypatch.setattr(clients, "GROQ_API_KEY", "standin")
+    monkeypatch.setattr(clients.requests, "post", post)
+    return SimpleNamespace(responses=standin.responses, sent=sent)
+
+
+@pytest.fixture
+def user_id():
+    return f"test-{uuid.uuid4().hex[:12]}"
+
+
+@pytest.fixture
+def client(user_id):
+    """An API client for a fresh, empty user partition."""
+    from fastapi.testclient import TestClient
+
+    from server.app import app
+
+    return TestClient(app, headers={"X-User-Id": user_id})
+
+
+@pytest.fixture
+def add_course(client):
+    def add(name="Calculus", code="MATH101", assignments=()):
+        response = client.post("/api/course/manual", json={
+            "course_name": name, "course_code": code, "assignments": list(assignments),
+        })
+        assert response.status_code == 200, response.text
+        return response.json()["course"]
+    return add
@@ -0,0 +1,43 @@
+import os
+from types import SimpleNamespace
+
+from server import events
+
+
+def test_progress_events_feed_analytics(client, add_course):
+    # Runs the numpy path when numpy is installed and the plain Python one otherwise
+    add_course(assignments=[{"name": "Essay", "due_date": "2026-03-02", "estimated_hours": 4}])
+    client.post("/api/progress", json={"assignment_index": 0, "progress": 50, "time_spent": 1.5})
+    client.post("/api/progress", json={"assignment_index": 0, "progress": 100, "time_spent": 2})
+
+    body = client.get("/api/analytics", params={"days": 7}).json()
+
+    assert body["events"] == 4
+    today = body["velocity"]["daily"][-1]
+    assert (today["hours_studied"], today["work_completed_hours"]) == (3.5, 4.0)
+    burn_down = body["courses"][0]["burn_down"]
+    assert (burn_down[0]["remaining_hours"], burn_down[-1]["remaining_hours"]) == (4.0, 0.0)
+    assert body["estimate_accuracy"]["homework"]["actual_hours"] == 3.5
+
+
+def test_event_logs_are_bounded(monkeypatch, tmp_path):
+    monkeypatch.setattr(events, "MAX_LOGS", 2)
+    monkeypatch.setattr(events, "_logs", events.OrderedDict())
+    states = [SimpleNamespace(data_dir=str(tmp_path / str(i))) for i in range(3)]
+    for state in states:
+        os.mkdir(state.data_dir)
+    events.record(states[0], [({"course": "Calculus", "name": "Essay"}, events.PROGRESS, 50)])
+    first = events.event_log(states[0])
+    events.event_log(states[1])
+    events.event_log(states[0])
+    events.event_log(states[2])
+
+    assert len(events._logs) == 2
+    # The least recently used one went; the others were kept
+    assert events.event_log(states[0]) is first
+    # An evicted log reads its events back from disk
+    events.event_log(states[1])
+    events.event_log(states[2])
+    reloaded = events.event_log(states[0])
+    assert reloaded is not first
+    assert list(reloaded.columns()["value"]) == [50.0]
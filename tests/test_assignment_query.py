@@ -0,0 +1,99 @@
+import pytest
+
+from server.assignment_query import SORT_KEYS, AssignmentIndex, assignment_index, encode_cursor
+from server.state import State
+from server.store import create_store
+
+
+@pytest.fixture
+def assignments(add_course):
+    add_course(assignments=[
+        {"name": f"Task {i:02}", "due_date": f"2026-03-{i + 1:02}", "weight": i % 3} for i in range(7)
+    ])
+
+
+def pages(client, **params):
+    names, cursor = [], ""
+    while True:
+        body = client.get("/api/assignments", params={**params, "limit": 3, "cursor": cursor}).json()
+        names.append([a["name"] for a in body["assignments"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return names
+
+
+@pytest.mark.parametrize("sort", ["due_date", "-due_date", "weight", "-weight", "name"])
+def test_cursors_walk_every_row_once(client, assignments, sort):
+    walked = [name for page in pages(client, sort=sort) for name in page]
+
+    assert sorted(walked) == [f"Task {i:02}" for i in range(7)]
+    assert [len(page) for page in pages(client, sort=sort)] == [3, 3, 1]
+
+
+def test_cursor_respects_the_due_date_window(client, assignments):
+    walked = pages(client, due_from="2026-03-02", due_to="2026-03-06")
+
+    assert walked == [["Task 01", "Task 02", "Task 03"], ["Task 04", "Task 05"]]
+
+
+@pytest.mark.parametrize("sort, cursor", [
+    ("weight", encode_cursor(("2026-03-01", 0))),   # from a due_date query
+    ("due_date", encode_cursor((1.0, 0))),
+    ("name", encode_cursor((None, 0))),
+    ("weight", encode_cursor((True, 0))),
+    ("due_date", encode_cursor(("2026-03-01", "0"))),
+    ("due_date", "not-a-cursor"),
+])
+def test_mismatched_cursor_is_a_bad_request(client, assignments, sort, cursor):
+    response = client.get("/api/assignments", params={"sort": sort, "cursor": cursor})
+
+    assert response.status_code == 400, response.text
+    assert "cursor" in response.json()["detail"]
+
+
+def test_summary_state_has_totals_without_assignments(client, assignments):
+    client.post("/api/progress", json={"assignment_index": 0, "progress": 100})
+
+    summary = client.get("/api/state", params={"summary": True}).json()
+
+    assert "assignments" not in summary
+    assert summary["courses"][0]["assignment_count"] == 7
+    assert "assignments" not in summary["courses"][0]
+    assert summary["stats"]["completed_assignments"] == 1
+    assert len(summary["completion_dates"]) == 1
+
+
+@pytest.mark.parametrize("change", ["edit", "add", "delete", "move_course"])
+def test_index_is_updated_between_versions(tmp_path, user_id, change):
+    state = State(create_store(str(tmp_path)), str(tmp_path), user_id)
+    with state.locked():
+        for i in range(40):
+            state.all_assignments.append({"name": f"Task {i:02}", "due_date": f"2026-03-{i % 28 + 1:02}",
+                                          "weight": i % 5, "course": "Calculus" if i % 2 else "Physics"})
+        state.persist()
+    previous = assignment_index(state.snapshot())
+    for key in SORT_KEYS:
+        previous.entries(key)
+        previous.entries(key, "physics")
+
+    with state.locked():
+        if change == "edit":
+            state.edit_assignment(7)["due_date"] = "2026-01-01"
+        elif change == "add":
+            state.all_assignments.append({"name": "Final", "due_date": "2026-05-01", "course": "Physics"})
+        elif change == "delete":
+            del state.all_assignments[3]
+        else:
+            state.edit_assignment(7)["course"] = "Physics"
+        state.persist()
+
+    index = assignment_index(state.snapshot())
+    fresh = AssignmentIndex(state.snapshot().assignments)
+    # Deletes shift positions, so that index is rebuilt on first use instead
+    assert (index._sorted == {}) == (change == "delete")
+    for key in SORT_KEYS:
+        assert index.entries(key) == fresh.entries(key)
+        assert index.entries(key, "physics") == fresh.entries(key, "physics")
+        assert index.entries(key, "calculus") == fresh.entries(key, "calculus")
+    # The previous version's index is left as it was
+    assert previous.entries("due_date") == AssignmentIndex(previous.assignments).entries("due_date")
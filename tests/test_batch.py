@@ -0,0 +1,112 @@
+import json
+import os
+
+import pytest
+
+from server.batch import apply_batch
+from server.state import State
+from server.store import create_store
+
+
+@pytest.fixture
+def assignments(client, add_course):
+    add_course(assignments=[
+        {"name": name, "due_date": "2026-03-02", "estimated_hours": 2} for name in ("Essay", "Quiz", "Lab")
+    ])
+    return client.get("/api/state").json()["assignments"]
+
+
+def batch(client, *operations):
+    response = client.post("/api/batch", json={"operations": list(operations)})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def settings_file(user_id):
+    path = next(os.path.join(root, "settings.json") for root, _, files in os.walk("data")
+                if user_id in root and "settings.json" in files)
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_operations_use_assignment_index(client, assignments):
+    result = batch(
+        client,
+        {"op": "progress", "assignment_index": 0, "progress": 100},
+        {"op": "delete_assignment", "assignment_index": 1},
+        {"op": "update_assignment", "assignment_index": 2, "changes": {"estimated_hours": 3}},
+        {"op": "add_assignment", "course_name": "MATH101", "assignment": {"name": "Final"}},
+    )
+
+    assert result["success"], result
+    # Indexes name positions before the batch; the added one's is after the delete
+    assert [r["assignment_index"] for r in result["results"]] == [0, 1, 2, 2]
+    rows = client.get("/api/assignments", params={"sort": "name"}).json()["assignments"]
+    assert [(a["name"], a["assignment_index"]) for a in rows] == [("Essay", 0), ("Final", 2), ("Lab", 1)]
+
+
+@pytest.mark.parametrize("operation", [
+    {"op": "progress", "assignment_index": 0, "progress": "lots"},
+    {"op": "progress", "assignment_index": 0, "progress": True},
+    {"op": "time_spent", "assignment_index": 0, "time_spent": [1]},
+    {"op": "update_assignment", "assignment_index": 0, "changes": {"estimated_hours": "2h"}},
+    {"op": "update_assignment", "assignment_index": 0, "changes": ["name"]},
+    {"op": "add_assignment", "course_name": "MATH101", "assignment": {"name": "Final", "weight": "high"}},
+    {"op": "settings", "changes": {"hours_per_day": "six"}},
+    {"op": "progress", "assignment_index": "0", "progress": 10},
+])
+def test_invalid_values_fail_the_batch(client, assignments, operation):
+    result = batch(client, {"op": "progress", "assignment_index": 1, "progress": 50}, operation)
+
+    assert result == {"success": False, "error": result["error"], "operation": 1}
+    assert [a["progress"] for a in client.get("/api/state").json()["assignments"]] == [0, 0, 0]
+
+
+def test_failed_batch_writes_neither_state_nor_settings(client, user_id, assignments):
+    hours = settings_file(user_id)["hours_per_day"]
+
+    result = batch(
+        client,
+        {"op": "settings", "changes": {"hours_per_day": hours + 2}},
+        {"op": "delete_assignment", "assignment_index": 0},
+        {"op": "progress", "assignment_index": 0, "progress": 10},
+    )
+
+    assert result["operation"] == 2
+    state = client.get("/api/state").json()
+    assert state["assignments"] == assignments
+    assert state["settings"]["hours_per_day"] == hours
+    assert settings_file(user_id)["hours_per_day"] == hours
+
+
+def test_settings_are_written_on_commit(client, user_id, assignments):
+    result = batch(client, {"op": "settings", "changes": {"hours_per_day": 7}})
+
+    assert result["success"]
+    assert settings_file(user_id)["hours_per_day"] == 7
+    assert client.get("/api/settings").json()["hours_per_day"] == 7
+
+
+@pytest.fixture
+def weekly_labs(tmp_path, user_id):
+    """A reloaded state (course and flat lists hold separate copies) with two identical labs."""
+    store = create_store(str(tmp_path))
+    labs = [{"name": name, "due_date": "2026-03-02", "course": "Chemistry", "progress": 0}
+            for name in ("Lab", "Lab", "Quiz")]
+    state = State(store, str(tmp_path), user_id)
+    with state.locked():
+        state.courses.append({"course_name": "Chemistry", "assignments": [dict(a) for a in labs]})
+        state.all_assignments.extend(labs)
+        state.persist()
+    return State(store, str(tmp_path), user_id)
+
+
+def test_duplicates_are_deleted_and_updated_one_at_a_time(weekly_labs):
+    apply_batch(weekly_labs, [
+        {"op": "update_assignment", "assignment_index": 1, "changes": {"progress": 50}},
+        {"op": "delete_assignment", "assignment_index": 0},
+    ])
+
+    course = weekly_labs.courses[0]["assignments"]
+    assert [(a["name"], a["progress"]) for a in weekly_labs.all_assignments] == [("Lab", 50), ("Quiz", 0)]
+    assert [(a["name"], a["progress"]) for a in course] == [("Lab", 50), ("Quiz", 0)]
@@ -0,0 +1,68 @@
+from server.chat import ACTIONS, ActionContext
+from server.state import State
+from server.store import create_store
+
+
+def test_free_form_question_reaches_the_assistant(client, groq, add_course):
+    add_course(assignments=[{"name": "Essay", "type": "essay", "due_date": "2026-03-02"}])
+
+    response = client.post("/api/chat", json={"question": "Should I start studying early this semester?"})
+
+    assert response.status_code == 200, response.text
+    assert response.json()["response"] == "This is a stand-in answer from the local Groq server."
+    prompt = groq.sent[-1]["messages"][1]["content"]
+    assert '"name": "Essay"' in prompt
+
+
+def test_lookup_questions_are_answered_locally(client, groq, add_course):
+    add_course(assignments=[{"name": "Essay", "due_date": "2026-03-02"}])
+
+    for question in ("What's due this week?", "How many assignments do I have?", "How am I doing?"):
+        response = client.post("/api/chat", json={"question": question})
+        assert response.status_code == 200, response.text
+    assert groq.sent == []
+
+
+def test_questions_naming_a_course_or_assignment_go_to_the_model(client, groq, add_course):
+    add_course("Math", "MATH201", [{"name": "Final Exam", "due_date": "2026-12-01"}])
+    add_course("Physics", "PHY100", [{"name": "Lab Report", "due_date": "2026-11-01"}])
+
+    for question in (
+        "When is my Math final due?",
+        "What are the deadlines for CS101?",
+        "Is the CS 101 project due before the midterm?",
+        "How many assignments do I have in Physics?",
+    ):
+        sent = len(groq.sent)
+        response = client.post("/api/chat", json={"question": question})
+        assert response.json()["response"] == "This is a stand-in quick answer.", question
+        assert len(groq.sent) == sent + 1
+
+
+def test_settings_change_is_an_action(client, groq):
+    groq.responses["chat_action"] = (
+        '{"action": "update_settings", "content": "Done.", "data": {"settings": {"hours_per_day": 6}}}'
+    )
+
+    response = client.post("/api/chat", json={"question": "set my hours per day to 6"})
+
+    assert "Updated settings" in response.json()["response"]
+    assert client.get("/api/settings").json()["hours_per_day"] == 6
+
+
+def test_deleting_one_of_two_identical_assignments_keeps_the_other(tmp_path, user_id):
+    store = create_store(str(tmp_path))
+    labs = [{"name": "Lab", "due_date": "2026-03-02", "course": "Chemistry"} for _ in range(2)]
+    state = State(store, str(tmp_path), user_id)
+    with state.locked():
+        state.courses.append({"course_name": "Chemistry", "assignments": [dict(a) for a in labs]})
+        state.all_assignments.extend(labs)
+        state.persist()
+    # Reloaded, the course list holds copies of the flat list's records
+    state = State(store, str(tmp_path), user_id)
+
+    reply = ACTIONS["delete_assignment"](ActionContext(state, None, "OK.", {"assignment_name": "Lab"}))
+
+    assert "Deleted assignment: Lab" in reply
+    assert [a["name"] for a in state.all_assignments] == ["Lab"]
+    assert [a["name"] for a in state.courses[0]["assignments"]] == ["Lab"]
@@ -0,0 +1,159 @@
+import json
+import time
+
+import pytest
+import requests
+
+from server.agent import clients
+from server.agent.clients import GroqClient, GroqRequestError
+from server.agent.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, remaining
+
+
+def response(status, body=None, headers=None):
+    r = requests.Response()
+    r.status_code = status
+    r._content = json.dumps(body if body is not None else {}).encode()
+    r.headers.update(headers or {})
+    return r
+
+
+OK = {"choices": [{"message": {"content": "hello"}}], "usage": {"prompt_tokens": 3, "completion_tokens": 2}}
+
+
+@pytest.fixture
+def groq_api(monkeypatch):
+    """Replies to Groq calls from ``groq_api.replies`` (one per POST) and records the sleeps."""
+    api = type("GroqAPI", (), {})()
+    api.replies, api.posts, api.sleeps = [], [], []
+
+    def post(url, headers=None, json=None, timeout=None):
+        api.posts.append(json)
+        reply = api.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    monkeypatch.setattr(clients, "GROQ_API_KEY", "test")
+    monkeypatch.setattr(clients, "GROQ_FALLBACK_MODELS", [])
+    monkeypatch.setattr(clients, "_rate_limited_until", {})
+    monkeypatch.setattr(clients, "groq_breaker", CircuitBreaker("groq", failure_threshold=3, reset_timeout=60))
+    monkeypatch.setattr(clients.requests, "post", post)
+    monkeypatch.setattr(clients.time, "sleep", api.sleeps.append)
+    return api
+
+
+def test_client_errors_fail_fast_without_tripping_the_breaker(groq_api):
+    groq_api.replies = [response(400, {"error": {"code": "context_length_exceeded"}})]
+
+    with pytest.raises(GroqRequestError, match="context_length_exceeded"):
+        GroqClient.call("system", "x" * 10_000, operation="chat")
+
+    assert len(groq_api.posts) == 1
+    assert groq_api.sleeps == []
+    assert clients.groq_breaker.state == CLOSED
+    # Other calls are unaffected
+    groq_api.replies = [response(200, OK)]
+    assert GroqClient.call("system", "hi", operation="parse_syllabus") == "hello"
+
+
+def test_server_errors_are_retried_and_open_the_breaker(groq_api):
+    groq_api.replies = [response(503)] * 3
+
+    with pytest.raises(CircuitOpenError):
+        GroqClient.call("system", "hi", operation="chat")
+
+    # The third failure opened the circuit, so the retry was never sent
+    assert len(groq_api.posts) == 3
+    assert len(groq_api.sleeps) == 2
+    assert clients.groq_breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        GroqClient.call("system", "hi", operation="parse_syllabus")
+    assert len(groq_api.posts) == 3
+
+
+def test_server_error_then_success(groq_api):
+    groq_api.replies = [response(500), requests.exceptions.ConnectionError("reset"), response(200, OK)]
+
+    assert GroqClient.call("system", "hi", operation="chat") == "hello"
+    assert len(groq_api.sleeps) == 2
+    assert clients.groq_breaker.state == CLOSED
+
+
+def test_breaker_opens_then_lets_one_probe_through():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow("chat")
+
+    time.sleep(0.06)
+    assert breaker.allow("chat") is True
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.allow("chat")
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow("chat") is False
+
+
+def test_failed_probe_reopens_the_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    assert breaker.allow("chat") is True
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow("chat")
+
+
+@pytest.fixture
+def seen_by_groq(monkeypatch, groq):
+    """``(timeout, remaining())`` of every Groq request, as seen from the thread sending it."""
+    seen = []
+    post = clients.requests.post
+
+    def record(url, headers=None, json=None, timeout=None):
+        seen.append((timeout, remaining()))
+        return post(url, headers=headers, json=json, timeout=timeout)
+
+    monkeypatch.setattr(clients.requests, "post", record)
+    return seen
+
+
+QUESTION = {"question": "Should I start studying early this semester?"}
+
+
+def test_request_deadline_reaches_the_groq_client(client, seen_by_groq):
+    response = client.post("/api/chat", json=QUESTION, headers={"X-Request-Timeout": "5"})
+
+    assert response.status_code == 200, response.text
+    (timeout, left), = seen_by_groq
+    assert left is not None and 0 < left <= 5
+    assert timeout <= 5
+
+
+def test_default_deadline_applies_without_a_header(client, seen_by_groq, monkeypatch):
+    from server import app as server_app
+
+    monkeypatch.setattr(server_app, "REQUEST_DEADLINE_SECONDS", 12.0)
+    client.post("/api/chat", json=QUESTION)
+
+    (timeout, left), = seen_by_groq
+    assert 0 < left <= 12 and timeout <= 12
+    assert remaining() is None
+
+
+def test_retry_that_would_outlive_the_deadline_is_not_made(client, groq_api):
+    groq_api.replies = [response(503), response(200, OK)]
+
+    client.post("/api/chat", json=QUESTION, headers={"X-Request-Timeout": "0.5"})
+
+    # The backoff before a retry (1s or more) doesn't fit in what is left of 0.5s
+    assert len(groq_api.posts) == 1
+    assert groq_api.sleeps == []
@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+
+from server.agent import crawler, scraping
+from server.agent.crawler import crawl_course_site
+
+START = "https://course.example.edu/"
+
+SITE = {
+    START: "# MATH101\n\n[Schedule](/schedule) [Homework](/homework) [Staff](/staff) [Elsewhere](https://other.edu/hw)",
+    START + "schedule": "# Schedule\n\n- Midterm Exam - Due: Mar 2 - 20%\n\n[Exam details](/exams)",
+    START + "homework": "# Homework\n\n- Homework 1 - Due: Feb 2 - 10%",
+    START + "staff": "# Staff\n\nOffice hours on request.",
+    START + "exams": "# Exams\n\n- Final Exam - Due: May 4 - 40%",
+}
+
+
+@pytest.fixture(autouse=True)
+def allow_site(monkeypatch):
+    monkeypatch.setattr(scraping, "SCRAPE_ALLOW_PRIVATE", True)
+
+
+def test_crawl_stays_on_the_site_and_within_the_page_budget():
+    fetched = []
+    lock = threading.Lock()
+
+    def scrape(url):
+        with lock:
+            fetched.append(url)
+        return SITE.get(url, "")
+
+    combined = crawl_course_site(START, scrape, max_pages=3, max_depth=2)
+
+    assert fetched[0] == START
+    assert len(fetched) == 3
+    assert "https://other.edu/hw" not in fetched
+    # Assignment-looking links go first; the staff page never makes the cut
+    assert set(fetched[1:]) == {START + "schedule", START + "homework"}
+    assert combined.startswith(f"<!-- Page: {START} -->")
+    assert "Midterm Exam" in combined and "Homework 1" in combined
+
+
+def test_failing_pages_are_skipped():
+    def scrape(url):
+        if url != START:
+            raise RuntimeError("timeout")
+        return SITE[url]
+
+    assert crawl_course_site(START, scrape).startswith(f"<!-- Page: {START} -->")
+
+
+def test_pages_of_a_level_are_fetched_concurrently(monkeypatch):
+    monkeypatch.setattr(crawler, "_pool", crawler.ThreadPoolExecutor(max_workers=4))
+    level = threading.Barrier(2, timeout=5)
+
+    def scrape(url):
+        if url in (START + "schedule", START + "homework"):
+            # Both pages of the second level must be in flight at once to pass
+            level.wait()
+        return SITE.get(url, "")
+
+    crawl_course_site(START, scrape, max_pages=3)
+    assert not level.broken
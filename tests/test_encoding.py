@@ -0,0 +1,38 @@
+import gzip
+import json
+
+import pytest
+
+from server import compression, encoding
+from server.model import compact_records
+
+
+@pytest.fixture(params=["orjson", "json"])
+def dumps(request, monkeypatch):
+    if request.param == "orjson":
+        if encoding.orjson is None:
+            pytest.skip("orjson is not installed")
+    else:
+        monkeypatch.setattr(encoding, "orjson", None)
+    return encoding.dumps
+
+
+def test_both_serializers_write_the_same_json(dumps):
+    courses = [{"course_name": "Calculus", "assignments": [
+        {"name": "Essay", "due_date": "2026-03-02", "progress": 50, "note": "ünïcode"},
+        {"name": "Quiz", "due_date": "TBA"},
+    ]}]
+    courses, _ = compact_records(courses, [])
+
+    assert json.loads(dumps({"courses": courses})) == {"courses": [{"course_name": "Calculus", "assignments": [
+        {"name": "Essay", "due_date": "2026-03-02", "progress": 50, "note": "ünïcode"},
+        {"name": "Quiz", "due_date": "TBA"},
+    ]}]}
+
+
+def test_gzip_is_used_without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+    assert compression.choose_encoding("br, gzip") == "gzip"
+    assert compression.choose_encoding("br") is None
+    assert gzip.decompress(compression.compress(b"x" * 2000, "gzip")) == b"x" * 2000
@@ -0,0 +1,99 @@
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from server.agent import hedging
+from server.agent.hedging import HedgeBudget, LatencyTracker, hedged_post
+from server.agent.quota import UsageLedger, use_ledger
+
+
+class Reply(requests.Response):
+    """A 200 Groq reply that notes when it is closed."""
+
+    def __init__(self, tokens=10):
+        super().__init__()
+        self.status_code = 200
+        self._content = json.dumps({"usage": {"prompt_tokens": tokens, "completion_tokens": 0}}).encode()
+        self.closed = threading.Event()
+
+    def close(self):
+        self.closed.set()
+
+
+@pytest.fixture
+def hedge(monkeypatch):
+    """Hedging after 10ms, with 20 tokens of budget for chat."""
+    latencies, budget = LatencyTracker(), HedgeBudget(percent=100)
+    for _ in range(20):
+        latencies.observe("chat", 0.01)
+    budget.record("chat", 20)
+    monkeypatch.setattr(hedging, "latencies", latencies)
+    monkeypatch.setattr(hedging, "budget", budget)
+    return budget
+
+
+def eventually(check, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not check() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return check()
+
+
+def slow(reply, release):
+    def send():
+        release.wait(5)
+        return reply
+    return send
+
+
+def test_first_response_wins_and_the_loser_is_abandoned(hedge, tmp_path):
+    primary, backup, release = Reply(tokens=15), Reply(tokens=12), threading.Event()
+    ledger = UsageLedger(str(tmp_path / "usage.bin"))
+
+    with use_ledger(ledger):
+        response, hedged, won = hedged_post("chat", slow(primary, release), lambda: backup, timeout=5)
+
+    assert (response, hedged, won) == (backup, True, True)
+    assert not primary.closed.is_set()
+    # The primary answers late: nobody reads it, it is closed and charged to the tenant
+    release.set()
+    assert primary.closed.wait(5)
+    assert not backup.closed.is_set()
+    assert eventually(lambda: ledger.totals()["day"] == 15)
+    assert hedge.extra == 15
+
+
+def test_fast_primary_sends_no_hedge(hedge):
+    primary = Reply()
+    hedges = []
+
+    response, hedged, won = hedged_post("chat", lambda: primary, lambda: hedges.append(1) or Reply(), timeout=5)
+
+    assert (response, hedged, won) == (primary, False, False)
+    assert hedges == [] and hedge.extra == 0
+
+
+def test_no_hedge_past_the_budget(hedge):
+    hedge.extra = 20
+    primary, release, hedges = Reply(), threading.Event(), []
+    threading.Timer(0.1, release.set).start()
+
+    response, hedged, _ = hedged_post("chat", slow(primary, release), lambda: hedges.append(1) or Reply(), timeout=5)
+
+    assert (response, hedged) == (primary, False)
+    assert hedges == []
+
+
+def test_failed_hedge_leaves_the_primary_answer(hedge):
+    primary, release = Reply(), threading.Event()
+
+    def failing():
+        raise requests.exceptions.ConnectionError("reset")
+
+    threading.Timer(0.1, release.set).start()
+    response, hedged, won = hedged_post("chat", slow(primary, release), failing, timeout=5)
+
+    assert (response, hedged, won) == (primary, True, False)
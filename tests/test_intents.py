@@ -0,0 +1,30 @@
+import pytest
+
+from server.agent.intents import ACTION, LOOKUP, QUESTION, REASONING, SMALLTALK, classify
+from server.name_index import NameIndex
+
+INDEX = NameIndex(
+    [{"course_name": "Math", "course_code": "MATH201"}, {"course_name": "Physics", "course_code": "PHY100"}],
+    [{"name": "Final Exam", "course": "Math"}, {"name": "Lab Report", "course": "Physics"}],
+)
+
+
+@pytest.mark.parametrize("question, kind, lookup", [
+    ("hi!", SMALLTALK, None),
+    ("What's due this week?", LOOKUP, "due"),
+    ("what do I have due in 3 days?", LOOKUP, "due"),
+    ("How many assignments do I have?", LOOKUP, "count"),
+    ("list my courses", LOOKUP, "courses"),
+    ("When is my Math final due?", QUESTION, None),
+    ("When is the lab report due?", QUESTION, None),
+    ("What are the deadlines for CS101?", QUESTION, None),
+    ("Is the CS 101 project due before the midterm?", QUESTION, None),
+    ("How many assignments do I have in Physics?", QUESTION, None),
+    ("set my hours per day to 6", ACTION, None),
+    ("change the reminder lead days to 2", ACTION, None),
+    ("Add a quiz to Math on Friday", ACTION, None),
+    ("How should I plan my week?", REASONING, None),
+])
+def test_classify(question, kind, lookup):
+    intent = classify(question, INDEX)
+    assert (intent.kind, intent.lookup) == (kind, lookup)
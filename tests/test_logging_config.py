@@ -0,0 +1,34 @@
+import logging
+import os
+import queue
+
+from server.agent.metrics import LOG_RECORDS_DROPPED
+from server.logging_config import DroppingQueueHandler, log_path
+
+
+def test_each_worker_gets_its_own_file():
+    assert log_path("server_debug.log", 1) == "server_debug.log"
+    assert log_path("logs/server_debug.log", 4) == f"logs/server_debug.{os.getpid()}.log"
+
+
+def test_dropped_records_are_counted_and_reported():
+    log_queue = queue.Queue(maxsize=1)
+    handler = DroppingQueueHandler(log_queue)
+    logger = logging.getLogger("tests.logging_config")
+    logger.propagate = False
+    logger.addHandler(handler)
+    before = LOG_RECORDS_DROPPED.value()
+    try:
+        logger.warning("kept")
+        logger.warning("dropped")
+        logger.warning("dropped too")
+        assert LOG_RECORDS_DROPPED.value() == before + 2
+        assert log_queue.get_nowait().getMessage() == "kept"
+
+        logger.warning("after")
+    finally:
+        logger.removeHandler(handler)
+
+    # The count goes out first; "after" found the queue full again and was dropped
+    assert log_queue.get_nowait().getMessage() == "Dropped 2 log records: the log queue was full"
+    assert LOG_RECORDS_DROPPED.value() == before + 3
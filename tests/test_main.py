@@ -0,0 +1,25 @@
+import pytest
+
+from main import state_backend
+
+
+@pytest.mark.parametrize("configured, workers, expected", [
+    (None, 1, "json"),
+    ("sqlite", 1, "sqlite"),
+    (None, 4, "sqlite"),
+    ("SQLite", 4, "sqlite"),
+])
+def test_state_backend(monkeypatch, configured, workers, expected):
+    if configured is None:
+        monkeypatch.delenv("STATE_BACKEND", raising=False)
+    else:
+        monkeypatch.setenv("STATE_BACKEND", configured)
+
+    assert state_backend(workers) == expected
+
+
+def test_several_workers_refuse_the_json_store(monkeypatch):
+    monkeypatch.setenv("STATE_BACKEND", "json")
+
+    with pytest.raises(SystemExit, match="STATE_BACKEND=sqlite"):
+        state_backend(4)
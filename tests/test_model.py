@@ -0,0 +1,85 @@
+import copy
+import json
+import pickle
+from datetime import date
+
+from server.model import Assignment, compact_records, due_date_of, json_default
+
+
+def assignment(**fields):
+    return {"name": "Quiz", "type": "quiz", "due_date": "2026-03-02", "weight": 5, "course": "Calculus",
+            "course_code": "MATH101", "progress": 0, **fields}
+
+
+def test_record_round_trips_to_the_same_dict():
+    data = assignment(notes="extra field")
+    record = Assignment.from_dict(data)
+    assert record.to_dict() == data
+    assert json.loads(json.dumps(record, default=json_default)) == data
+    assert dict(record) == data
+    assert pickle.loads(pickle.dumps(record)) == record
+    assert copy.deepcopy(record) == record
+
+
+def test_record_equals_the_plain_dict():
+    data = assignment(notes="extra field")
+    record = Assignment.from_dict(data)
+    assert record == data and data == record
+    assert record == Assignment.from_dict(data)
+    assert record != assignment(progress=50)
+    assert record != {k: v for k, v in data.items() if k != "notes"}
+    # An unset field differs from one set to None
+    assert Assignment.from_dict({"name": "Essay"}) != {"name": "Essay", "progress": None}
+    assert Assignment.from_dict({"name": "Essay", "progress": None}) == {"name": "Essay", "progress": None}
+
+
+def test_repeated_strings_are_interned():
+    first = Assignment.from_dict(json.loads(json.dumps(assignment())))
+    second = Assignment.from_dict(json.loads(json.dumps(assignment(name="Exam", type="exam"))))
+    assert first["course"] is second["course"]
+    assert first["course_code"] is second["course_code"]
+
+
+def test_due_date_is_stored_as_an_ordinal():
+    record = Assignment.from_dict(assignment())
+    assert record.due_ordinal == date(2026, 3, 2).toordinal()
+    assert record["due_date"] == "2026-03-02"
+    record["due_date"] = "2026-04-01"
+    assert due_date_of(record) == date(2026, 4, 1)
+
+
+def test_non_date_due_values_are_kept_as_is():
+    for value in ("TBA", 0, None, ""):
+        record = Assignment.from_dict(assignment(due_date=value))
+        assert record["due_date"] == value
+        assert record.due_ordinal is None
+        assert due_date_of(record) is None
+        assert due_date_of(assignment(due_date=value)) is None
+
+
+def test_missing_fields_stay_missing():
+    record = Assignment.from_dict({"name": "Essay"})
+    assert "progress" not in record
+    assert record.get("progress", 0) == 0
+    record["progress"] = 50
+    del record["progress"]
+    assert record.to_dict() == {"name": "Essay"}
+
+
+def test_assignments_with_equal_contents_stay_separate():
+    first, second = assignment(), assignment()
+    course = {"course_name": "Calculus", "assignments": [dict(first), dict(second)]}
+    courses, records = compact_records([course], [first, second])
+
+    records[0]["progress"] = 100
+    assert records[1]["progress"] == 0
+    assert [a["progress"] for a in courses[0]["assignments"]] == [0, 0]
+
+
+def test_shared_dicts_become_one_record():
+    shared = assignment()
+    course = {"course_name": "Calculus", "assignments": [shared]}
+    courses, records = compact_records([course], [shared])
+    assert courses[0]["assignments"][0] is records[0]
+    # The input is left alone
+    assert course["assignments"][0] is shared
@@ -0,0 +1,41 @@
+from pathlib import Path
+
+from server.agent.preextract import preextract_syllabus
+
+SAMPLE = Path(__file__).resolve().parent.parent / "sample_syllabus.txt"
+
+
+def test_well_formed_syllabus_is_resolved_locally():
+    pre = preextract_syllabus(SAMPLE.read_text(), "2025-09-01")
+
+    assert pre.complete
+    assert pre.unresolved == []
+    assert [(a["name"], a["type"], a["due_date"], a["weight"]) for a in pre.course["assignments"]] == [
+        ("Homework 1: Search Algorithms", "homework", "2025-09-15", 10),
+        ("Quiz 1: Logic and knowledge Representation", "quiz", "2025-09-25", 5),
+        ("Midterm Exam", "exam", "2025-10-20", 25),
+        ("Project: Chatbot Implementation", "project", "2025-11-15", 30),
+        ("Final Exam", "exam", "2025-12-10", 30),
+    ]
+
+
+def test_dated_lines_without_a_type_go_to_the_llm():
+    text = "\n".join([
+        "Course: Field Studies (GEO210)",
+        "Midterm Exam - Oct 15 - 25%",
+        "Reflection Journal - Nov 2 - 10%",
+        "Field Trip Writeup due Nov 20 (15%)",
+        "  Submit the writeup online by Nov 21",
+        "Final Exam - Dec 12 - 40%",
+        "Participation: 10%",
+    ])
+
+    pre = preextract_syllabus(text, "2025-09-01")
+
+    assert [a["name"] for a in pre.course["assignments"]] == ["Midterm Exam", "Final Exam"]
+    assert pre.unresolved == [
+        "Reflection Journal - Nov 2 - 10%",
+        "Field Trip Writeup due Nov 20 (15%)\n  Submit the writeup online by Nov 21",
+    ]
+    assert not pre.complete
+    assert pre.partial
@@ -0,0 +1,107 @@
+from datetime import date
+
+import pytest
+
+from server.agent import quota
+from server.agent.quota import QuotaExceeded, UsageLedger, budget, check_quota, record_usage, soft_limited, use_ledger
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return UsageLedger(str(tmp_path / "usage.bin"))
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    def set_limits(daily_soft=0, daily_hard=0, monthly_soft=0, monthly_hard=0):
+        monkeypatch.setattr(quota, "DAILY_SOFT", daily_soft)
+        monkeypatch.setattr(quota, "DAILY_HARD", daily_hard)
+        monkeypatch.setattr(quota, "MONTHLY_SOFT", monthly_soft)
+        monkeypatch.setattr(quota, "MONTHLY_HARD", monthly_hard)
+    return set_limits
+
+
+def test_limits_are_off_by_default(ledger, limits):
+    limits()
+    ledger.record("chat", 10_000_000)
+
+    with use_ledger(ledger):
+        assert not soft_limited()
+        check_quota("chat")
+    assert budget(ledger)["status"] == "ok"
+    assert budget(ledger)["day"]["hard_limit"] is None
+
+
+def test_usage_is_summed_per_day_and_operation(ledger):
+    ledger.record("chat", 100)
+    ledger.record("chat", 50)
+    ledger.record("parse_syllabus", 200)
+
+    totals = ledger.totals(date.today())
+    assert (totals["day"], totals["month"]) == (350, 350)
+    assert totals["by_operation"]["chat"] == {"day": 150, "month": 150}
+
+
+def test_soft_and_hard_limits(ledger, limits):
+    limits(daily_soft=100, daily_hard=200)
+
+    with use_ledger(ledger):
+        record_usage("chat", 120)
+        assert soft_limited()
+        check_quota("chat")
+        record_usage("chat", 100)
+        with pytest.raises(QuotaExceeded) as raised:
+            check_quota("chat")
+    assert raised.value.retry_after > 0
+    assert budget(ledger)["status"] == "hard_limit"
+    assert budget(ledger)["day"]["remaining"] == 0
+
+
+def test_soft_limit_is_read_once_per_request(ledger, limits, monkeypatch):
+    limits(daily_soft=100)
+    reads = []
+    totals = ledger.totals
+    monkeypatch.setattr(ledger, "totals", lambda *args: reads.append(1) or totals(*args))
+
+    with use_ledger(ledger):
+        assert not soft_limited()
+        assert not soft_limited()
+        assert len(reads) == 1
+        # Recording usage in the request makes the next check re-read the ledger
+        record_usage("chat", 150)
+        assert soft_limited()
+        assert soft_limited()
+    assert len(reads) == 2
+
+
+def test_chat_past_the_limit_answers_locally(client, groq, limits):
+    limits(daily_hard=1)
+
+    first = client.post("/api/chat", json={"question": "Should I start studying early this semester?"})
+    second = client.post("/api/chat", json={"question": "Should I start studying early this semester?"})
+
+    assert not first.json().get("degraded")
+    assert second.json()["degraded"]
+    assert len(groq.sent) == 1
+    assert client.get("/api/quota").json()["status"] == "hard_limit"
+
+
+def test_ledgers_are_bounded_and_resolve_their_directory_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(quota, "_ledgers", quota.OrderedDict())
+    monkeypatch.setattr(quota, "MAX_LEDGERS", 2)
+    resolved = []
+
+    def data_dir(key):
+        def resolve():
+            resolved.append(key)
+            return str(tmp_path)
+        return resolve
+
+    first = quota.ledger_for("a", data_dir("a"))
+    assert quota.ledger_for("a", data_dir("a")) is first
+    quota.ledger_for("b", data_dir("b"))
+    quota.ledger_for("a", data_dir("a"))
+    quota.ledger_for("c", data_dir("c"))
+
+    assert resolved == ["a", "b", "c"]
+    assert list(quota._ledgers) == ["a", "c"]
@@ -0,0 +1,134 @@
+import io
+import socket
+
+import pytest
+import requests
+
+from server.agent import clients, crawler, scraping
+from server.agent.clients import FirecrawlClient
+from server.agent.scraping import BlockedURL, FetchResult, ScrapeCache, check_url, fetch_page
+
+PUBLIC = "93.184.216.34"
+
+
+def response(status, body=b"", headers=None):
+    r = requests.Response()
+    r.status_code = status
+    r.raw = io.BytesIO(body)
+    r.headers.update(headers or {})
+    return r
+
+
+@pytest.fixture
+def web(monkeypatch):
+    """Resolves ``web.hosts`` names and answers GETs from ``web.pages`` (url -> Response)."""
+    site = type("Web", (), {})()
+    site.hosts = {"course.example.edu": PUBLIC}
+    site.pages, site.requested = {}, []
+    resolve = socket.getaddrinfo
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        if host in site.hosts:
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (site.hosts[host], port))]
+        return resolve(host, port, *args, **kwargs)
+
+    def get(url, headers=None, **kwargs):
+        site.requested.append((url, headers, kwargs))
+        return site.pages[url]
+
+    monkeypatch.setattr(scraping, "SCRAPE_ALLOW_PRIVATE", False)
+    monkeypatch.setattr(scraping.socket, "getaddrinfo", getaddrinfo)
+    monkeypatch.setattr(scraping.requests, "get", get)
+    return site
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1:8000/api/state",
+    "http://localhost/",
+    "http://10.0.0.5/syllabus",
+    "http://192.168.1.1/",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://[::1]/",
+    "http://[::ffff:127.0.0.1]/",
+    "http://internal.example.edu/",
+    "file:///etc/passwd",
+    "ftp://course.example.edu/syllabus.pdf",
+])
+def test_non_public_urls_are_blocked(web, url):
+    web.hosts["internal.example.edu"] = "172.16.0.9"
+
+    with pytest.raises(BlockedURL):
+        fetch_page(url)
+    assert web.requested == []
+
+
+def test_public_url_is_allowed(web):
+    check_url("https://course.example.edu/syllabus")
+
+
+def test_redirect_to_a_private_host_is_blocked(web):
+    web.pages["http://course.example.edu/syllabus"] = response(302, headers={"Location": "http://169.254.169.254/"})
+
+    with pytest.raises(BlockedURL):
+        fetch_page("http://course.example.edu/syllabus")
+    assert [url for url, _, _ in web.requested] == ["http://course.example.edu/syllabus"]
+    assert web.requested[0][2]["allow_redirects"] is False
+
+
+def test_public_redirects_are_followed(web):
+    web.pages["http://course.example.edu/"] = response(301, headers={"Location": "/syllabus"})
+    web.pages["http://course.example.edu/syllabus"] = response(200, b"Homework 1 due Mar 2", {"Content-Type": "text/plain"})
+
+    assert fetch_page("http://course.example.edu/").markdown == "Homework 1 due Mar 2"
+
+
+def test_crawl_refuses_a_blocked_start_url(web):
+    with pytest.raises(BlockedURL):
+        crawler.crawl_course_site("http://127.0.0.1/", lambda url: "# page")
+
+
+def test_blocked_url_is_a_bad_request(client, web):
+    response = client.post("/api/syllabus/url", json={
+        "url": "http://169.254.169.254/latest/meta-data/", "semester_start": "2026-01-12",
+    })
+
+    assert response.status_code == 400, response.text
+
+
+def test_conditional_get_sends_validators(web):
+    web.pages["http://course.example.edu/syllabus"] = response(304, headers={"ETag": '"v1"'})
+
+    fetched = fetch_page("http://course.example.edu/syllabus", etag='"v1"', last_modified="Mon, 02 Mar 2026 10:00:00 GMT")
+
+    assert fetched.not_modified
+    headers = web.requested[0][1]
+    assert headers["If-None-Match"] == '"v1"'
+    assert headers["If-Modified-Since"] == "Mon, 02 Mar 2026 10:00:00 GMT"
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ScrapeCache(ttl=0)
+    monkeypatch.setattr(clients, "scrape_cache", cache)
+    monkeypatch.setattr(clients, "FIRECRAWL_API_KEY", None)
+    return cache
+
+
+def test_not_modified_page_reuses_the_cached_body(web, cache, monkeypatch):
+    url = "http://course.example.edu/syllabus"
+    cache.put(url, "# Cached syllabus", "local", etag='"v1"', body_hash="abc")
+    fetches = []
+    monkeypatch.setattr(clients, "fetch_page", lambda *args: fetches.append(args) or FetchResult(304, etag='"v1"'))
+
+    assert FirecrawlClient.scrape(url) == "# Cached syllabus"
+    assert fetches == [(url, '"v1"', "")]
+
+
+def test_changed_page_replaces_the_cached_body(web, cache, monkeypatch):
+    url = "http://course.example.edu/syllabus"
+    cache.put(url, "# Old syllabus", "local", etag='"v1"', body_hash="abc")
+    monkeypatch.setattr(clients, "fetch_page",
+                        lambda *args: FetchResult(200, markdown="# New syllabus", etag='"v2"', body_hash="def"))
+
+    assert FirecrawlClient.scrape(url) == "# New syllabus"
+    assert cache.get(url)["etag"] == '"v2"'
@@ -0,0 +1,47 @@
+import json
+
+from server.agent.similarity import SyllabusIndex, diff_lines, is_cosmetic
+
+BODY = "\n".join(f"Week {i}: reading on topic {i} and discussion of the material covered in class" for i in range(1, 8))
+SYLLABUS = f"CS 101 Introduction to Programming\nInstructor: Dr. Ada Smith\n{BODY}\nPlease recycle this page."
+PARSED = {"course_name": "Introduction to Programming", "course_code": "CS 101", "instructor": "Ada Smith",
+          "assignments": []}
+
+
+def test_footer_changes_are_cosmetic():
+    diff = diff_lines(SYLLABUS, SYLLABUS.replace("Please recycle this page.", "Thanks for recycling."))
+
+    assert is_cosmetic(diff, PARSED)
+
+
+def test_course_detail_changes_are_not_cosmetic():
+    for old, new in [
+        ("CS 101 Introduction", "CS 102 Introduction"),
+        ("Instructor: Dr. Ada Smith", "Instructor: Dr. Grace Jones"),
+        ("Introduction to Programming", "Introduction to Data Structures"),
+    ]:
+        diff = diff_lines(SYLLABUS, SYLLABUS.replace(old, new))
+        assert not is_cosmetic(diff, PARSED), new
+
+    # A line naming the earlier instructor without any label
+    text = SYLLABUS.replace("Please recycle this page.", "Questions go to Ada Smith.")
+    assert not is_cosmetic(diff_lines(text, SYLLABUS), PARSED)
+
+
+def test_index_appends_and_compacts(tmp_path):
+    path = tmp_path / "syllabus_index.jsonl"
+    index = SyllabusIndex(str(path), max_entries=2)
+    texts = [f"{SYLLABUS}\nVersion {i}" for i in range(5)]
+
+    index.add(texts[0], "2026-01-12", PARSED)
+    index.add(texts[1], "2026-01-12", PARSED)
+    assert len(path.read_text().splitlines()) == 2
+    for text in texts[2:]:
+        index.add(text, "2026-01-12", PARSED)
+
+    # Rewritten with just the live entries once the file doubled
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(lines) <= 4
+    reloaded = SyllabusIndex(str(path), max_entries=2)
+    assert reloaded.lookup(texts[4], "2026-01-12")[1] == 1.0
+    assert len(reloaded._entries) == 2
@@ -0,0 +1,12 @@
+import os
+import statistics
+
+from server.startup_budget import measure
+
+
+def test_app_imports_within_budget_and_lazily():
+    results = measure(runs=3)
+
+    budget = float(os.getenv("STARTUP_BUDGET_MS", "800"))
+    assert statistics.median(r["ms"] for r in results) <= budget
+    assert [r["loaded"] for r in results] == [[], [], []]
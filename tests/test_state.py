@@ -0,0 +1,86 @@
+import pytest
+
+from server.state import State, TenantRegistry
+from server.store import JsonFileStore, SqliteStore, create_store
+
+
+@pytest.fixture
+def state(tmp_path, user_id):
+    state = State(create_store(str(tmp_path)), str(tmp_path), user_id)
+    assignments = [{"name": name, "due_date": "2026-03-02", "course": "Calculus", "progress": 0}
+                   for name in ("Essay", "Quiz", "Lab")]
+    with state.locked():
+        state.courses.append({"course_name": "Calculus", "assignments": list(assignments)})
+        state.all_assignments.extend(assignments)
+        state.persist()
+    return state
+
+
+def test_transaction_copies_only_the_records_it_writes(state):
+    before = state.snapshot()
+    with state.locked():
+        state.edit_assignment(1)["progress"] = 50
+        state.persist()
+    after = state.snapshot()
+
+    assert [a["progress"] for a in before.assignments] == [0, 0, 0]
+    assert [a["progress"] for a in after.assignments] == [0, 50, 0]
+    assert after.assignments[0] is before.assignments[0]
+    assert after.assignments[2] is before.assignments[2]
+    assert after.assignments[1] is not before.assignments[1]
+    # The course's list follows the edited record
+    assert after.courses[0]["assignments"][1] is after.assignments[1]
+    assert before.courses[0]["assignments"][1]["progress"] == 0
+
+
+def test_failed_transaction_leaves_the_snapshot_alone(state):
+    before = state.snapshot()
+    with pytest.raises(RuntimeError):
+        with state.locked():
+            state.edit_assignment(0)["progress"] = 100
+            state.edit_course(state.courses[0])["course_name"] = "Renamed"
+            state.persist()
+            raise RuntimeError("abort")
+
+    assert state.snapshot() is before
+    assert before.assignments[0]["progress"] == 0
+    assert before.courses[0]["course_name"] == "Calculus"
+
+
+def test_untouched_transaction_copies_nothing(state):
+    before = state.snapshot()
+    with state.locked():
+        assert all(a is b for a, b in zip(state.all_assignments, before.assignments))
+        assert all(a is b for a, b in zip(state.courses, before.courses))
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def registry(request, tmp_path):
+    store = JsonFileStore(str(tmp_path)) if request.param == "json" else SqliteStore(str(tmp_path / "state.db"))
+    return TenantRegistry(store, str(tmp_path), max_in_memory=2)
+
+
+def test_evicted_tenant_reloads_with_its_data(registry):
+    alice = registry.get("alice")
+    with alice.locked():
+        alice.courses.append({"course_name": "Calculus", "assignments": []})
+        alice.persist()
+    registry.get("bob")
+    registry.get("carol")
+
+    assert alice not in registry.loaded()
+    reloaded = registry.get("alice")
+    assert reloaded is not alice
+    assert [c["course_name"] for c in reloaded.courses] == ["Calculus"]
+    assert reloaded.version == alice.version
+    # bob was least recently used and made room for alice
+    assert [t.key for t in registry.loaded()] == ["carol", "alice"]
+
+
+def test_tenant_in_a_transaction_is_not_evicted(registry):
+    alice = registry.get("alice")
+    with alice.locked():
+        registry.get("bob")
+        registry.get("carol")
+        assert alice in registry.loaded()
+        assert registry.get("alice") is alice
@@ -0,0 +1,87 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from server.compression import CompressionMiddleware
+from server.static_files import StaticManifest, precompress
+
+SCRIPT = b"console.log('CourseSync');\n" * 200
+PAGE = b"<!doctype html><html><body><div id=root></div></body></html>" + b" " * 2000
+
+
+def site(root, index=True):
+    (root / "assets").mkdir(parents=True)
+    (root / "assets" / "index-3f9c2a1b.js").write_bytes(SCRIPT)
+    if index:
+        (root / "index.html").write_bytes(PAGE)
+    precompress(str(root))
+    return root
+
+
+def serve(root):
+    """A client for ``root`` behind the compression middleware, as the app serves it."""
+    manifest = StaticManifest(str(root))
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/{full_path:path}")
+    async def static(full_path: str, request: Request):
+        return manifest.serve(full_path, request.headers.get("accept-encoding", ""),
+                              request.headers.get("if-none-match", ""))
+
+    return TestClient(app)
+
+
+def raw(client, path, **headers):
+    """Status, headers and undecoded body."""
+    with client.stream("GET", path, headers=headers) as response:
+        return response.status_code, response.headers, b"".join(response.iter_raw())
+
+
+@pytest.mark.parametrize("path", ["/assets/index-3f9c2a1b.js", "/", "/courses/42"])
+def test_precompressed_files_are_sent_once_encoded(tmp_path, path):
+    client = serve(site(tmp_path))
+
+    status, headers, body = raw(client, path, **{"Accept-Encoding": "gzip"})
+
+    assert status == 200
+    assert headers.get_list("content-encoding") == ["gzip"]
+    assert headers.get_list("vary") == ["Accept-Encoding"]
+    assert gzip.decompress(body) in (SCRIPT, PAGE)
+
+
+def test_uncompressed_file_gets_a_single_vary(tmp_path):
+    (tmp_path / "notes.txt").write_bytes(b"plain text " * 500)
+    client = serve(tmp_path)
+
+    status, headers, body = raw(client, "/notes.txt", **{"Accept-Encoding": "gzip"})
+
+    # No .gz sibling: the middleware compresses it and keeps the manifest's Vary
+    assert headers.get_list("content-encoding") == ["gzip"]
+    assert headers.get_list("vary") == ["Accept-Encoding"]
+    assert gzip.decompress(body) == b"plain text " * 500
+
+
+def test_etag_revalidation(tmp_path):
+    client = serve(site(tmp_path))
+
+    first = client.get("/assets/index-3f9c2a1b.js", headers={"Accept-Encoding": "gzip"})
+    again = client.get("/assets/index-3f9c2a1b.js",
+                       headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+
+    assert first.headers["cache-control"].endswith("immutable")
+    assert again.status_code == 304
+
+
+def test_index_built_after_startup_is_served_from_disk(tmp_path):
+    client = serve(site(tmp_path, index=False))
+    assert client.get("/").status_code == 404
+
+    (tmp_path / "index.html").write_bytes(PAGE)
+    response = client.get("/courses/42")
+
+    assert response.status_code == 200
+    assert response.content == PAGE
+    assert response.headers["cache-control"] == "no-cache"
@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+from server.state import State
+from server.store import SqliteStore, StaleStateError
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SqliteStore(str(tmp_path / "state.db"))
+
+
+def workers(store, tmp_path, count=2):
+    """``State`` copies of one user, as separate uvicorn workers would hold them."""
+    return [State(store, str(tmp_path), "alice") for _ in range(count)]
+
+
+def test_stale_write_is_rejected(store):
+    with store.transaction("alice") as tx:
+        tx.save({"courses": []}, expected_version=0)
+    with store.transaction("alice") as tx:
+        with pytest.raises(StaleStateError):
+            tx.save({"courses": [{"course_name": "Lost"}]}, expected_version=0)
+
+    data, version = store.load("alice")
+    assert (data["courses"], version) == ([], 1)
+
+
+def test_concurrent_edits_from_two_workers_both_land(store, tmp_path):
+    first, second = workers(store, tmp_path)
+
+    with first.locked():
+        first.courses.append({"course_name": "Calculus", "assignments": []})
+        first.persist()
+    # second still holds version 0; the transaction reloads before editing
+    assert second.version == 0
+    with second.locked():
+        second.courses.append({"course_name": "Physics", "assignments": []})
+        second.persist()
+
+    data, version = store.load("alice")
+    assert [c["course_name"] for c in data["courses"]] == ["Calculus", "Physics"]
+    assert version == 2
+    assert first.refresh() and [c["course_name"] for c in first.courses] == ["Calculus", "Physics"]
+
+
+def test_transaction_holds_the_write_lock_until_commit(store, tmp_path):
+    first, second = workers(store, tmp_path)
+    entered, done = threading.Event(), threading.Event()
+
+    def other_worker():
+        with second.locked():
+            entered.set()
+            second.courses.append({"course_name": "Physics", "assignments": []})
+            second.persist()
+        done.set()
+
+    with first.locked():
+        first.courses.append({"course_name": "Calculus", "assignments": []})
+        first.persist()
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        # BEGIN IMMEDIATE keeps the other worker out until this one commits
+        assert not entered.wait(0.3)
+    assert done.wait(10)
+    thread.join()
+
+    data, version = store.load("alice")
+    assert [c["course_name"] for c in data["courses"]] == ["Calculus", "Physics"]
+    assert version == 2
+
+
+def test_failed_transaction_rolls_back(store, tmp_path):
+    (state,) = workers(store, tmp_path, 1)
+    with pytest.raises(RuntimeError):
+        with state.locked():
+            state.courses.append({"course_name": "Calculus", "assignments": []})
+            state.persist()
+            raise RuntimeError("abort")
+
+    assert store.load("alice") == ({}, 0)
+    assert state.courses == []